@@ -215,6 +215,16 @@ PARALLEL_EXECUTION = True
 # This option is ignored if PARALLEL_EXECUTION = False
 N_PROCESSES = cpu_count()
 
+# Number of processes across which the workload of each experiment is split,
+# if its strategy routes the requests for each content through a distinct set
+# of caches, as basic and hybrid hash-routing strategies do, and all its data
+# collectors can merge their measurements. This allows a single experiment to
+# take advantage of multicore CPUs.
+# This option is ignored if PARALLEL_EXECUTION = True, and experiments split
+# across processes do not use warmup snapshots.
+# Uncomment to enable
+# N_SHARD_PROCESSES = cpu_count()
+
 # Granularity of caching.
 # Currently, only OBJECT is supported
 CACHING_GRANULARITY = 'OBJECT'
@@ -224,6 +234,13 @@ CACHING_GRANULARITY = 'OBJECT'
 # Currently only PICKLE is supported 
 RESULTS_FORMAT = 'PICKLE'
 
+# Directory in which snapshots of the network state at the end of the warmup
+# phase are saved, so that they can be reused by experiments which differ
+# only in the number of measured requests.
+# Snapshots are only shared by experiments whose workload specifies a seed.
+# Uncomment to enable
+# WARMUP_SNAPSHOT_DIR = 'snapshots'
+
 # Number of times each experiment is replicated
 # This is necessary for extracting confidence interval of selected metrics
 N_REPLICATIONS = 3
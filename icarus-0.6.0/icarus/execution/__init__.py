@@ -1,5 +1,7 @@
 """This package contains the code for the execution of a single experiment.
 """
+from .matrices import *
 from .network import *
 from .collectors import *
+from .snapshot import *
 from .engine import *
@@ -8,6 +8,11 @@ latency, path stretch and link load.
 
 To create a new data collector, it is sufficient to create a new class
 inheriting from the `DataCollector` class and override all required methods.
+Collectors can either be notified of each event of a session, e.g. each hop
+traversed by a request, or receive a summary of the whole session once the
+session is closed by implementing the `report_session` method. Collectors
+implementing the `merge` method can also be used by experiments whose
+workload is split in shards processed in parallel.
 """
 from __future__ import division
 import collections
@@ -27,6 +32,10 @@ __all__ = [
     'TestCollector'
            ]
 
+# Events of a session, which are also summarized by report_session
+SESSION_EVENTS = ('start_session', 'end_session', 'cache_hit', 'cache_miss',
+                  'server_hit', 'request_hop', 'content_hop')
+
 
 class DataCollector(object):
     """Object collecting notifications about simulation events and measuring
@@ -140,6 +149,36 @@ class DataCollector(object):
         """
         pass
 
+    def report_session(self, session):
+        """Reports the summary of a closed session.
+
+        This is an alternative to the notification of each individual event
+        of a session, which is convenient for collectors that need to inspect
+        all hops of a session. A collector implementing this method receives
+        a single call per session and it is not notified of the other events
+        of the session, even if it implements the related methods.
+
+        Parameters
+        ----------
+        session : dict
+            Summary of the session, with the following keys:
+             * timestamp: the timestamp of the session
+             * receiver: the receiver node requesting the content
+             * content: the content requested by the receiver
+             * request_hops: list of links (u, v) traversed by requests
+             * request_main_path: list of bools, one per request hop, telling
+               whether the hop is on the main path
+             * content_hops: list of links (u, v) traversed by contents
+             * content_main_path: list of bools, one per content hop, telling
+               whether the hop is on the main path
+             * cache_hits: list of nodes whose cache served the content
+             * cache_misses: list of nodes whose cache was looked up without
+               success
+             * server_hits: list of server nodes which served the content
+             * success: *True* if the session was completed successfully
+        """
+        pass
+
     def results(self):
         """Returns the aggregated results measured by the collector.
 
@@ -150,6 +189,44 @@ class DataCollector(object):
         """
         pass
 
+    def merge(self, other):
+        """Add to the measurements of this collector those of another
+        collector of the same type and with the same parameters, which
+        observed a disjoint set of sessions.
+
+        After merging, the results of this collector are those it would have
+        returned if it had observed the sessions of both collectors.
+
+        Parameters
+        ----------
+        other : DataCollector
+            The collector whose measurements are added
+        """
+        raise NotImplementedError('Collector %s does not support merging '
+                                  'measurements' % type(self).__name__)
+
+    def handles(self, event):
+        """Return whether the collector needs to be notified of an event.
+
+        A collector needs to be notified of all events whose methods it
+        implements, except for the events of a session if it implements
+        `report_session`.
+
+        Parameters
+        ----------
+        event : str
+            The name of the method notifying the event
+
+        Returns
+        -------
+        handles : bool
+            *True* if the collector needs to be notified of the event
+        """
+        methods = type(self).__dict__
+        if event in SESSION_EVENTS and 'report_session' in methods:
+            return False
+        return event in methods
+
 # Note: The implementation of CollectorProxy could be improved to avoid having
 # to rewrite almost identical methods, for example by playing with __dict__
 # attribute. However, it was implemented this way to make it more readable and
@@ -161,10 +238,15 @@ class CollectorProxy(DataCollector):
     An instance of this class registers itself with the network controller and
     it receives notifications for all events. This class is responsible for
     dispatching events of interests to concrete collectors.
+
+    The collectors handling each event are looked up once at construction
+    time, so that events are only dispatched to collectors implementing them.
+    Events handled by a single collector are dispatched to it directly and
+    the controller does not notify events not handled by any collector.
     """
 
     EVENTS = ('start_session', 'end_session', 'cache_hit', 'cache_miss', 'server_hit',
-              'request_hop', 'content_hop', 'results')
+              'request_hop', 'content_hop', 'report_session', 'results')
 
     def __init__(self, view, collectors):
         """Constructor
@@ -177,48 +259,63 @@ class CollectorProxy(DataCollector):
             List of instances of DataCollector that will be notified of events
         """
         self.view = view
-        self.collectors = {e: [c for c in collectors if e in type(c).__dict__]
+        self.collectors = {e: [c for c in collectors if c.handles(e)]
                            for e in self.EVENTS}
+        # Bound methods of the collectors handling each event
+        self.handlers = {e: [getattr(c, e) for c in self.collectors[e]]
+                         for e in self.EVENTS}
+        for e in SESSION_EVENTS + ('report_session',):
+            if len(self.handlers[e]) == 1:
+                setattr(self, e, self.handlers[e][0])
 
     @inheritdoc(DataCollector)
     def start_session(self, timestamp, receiver, content):
-        for c in self.collectors['start_session']:
-            c.start_session(timestamp, receiver, content)
+        for handler in self.handlers['start_session']:
+            handler(timestamp, receiver, content)
 
     @inheritdoc(DataCollector)
     def cache_hit(self, node):
-        for c in self.collectors['cache_hit']:
-            c.cache_hit(node)
+        for handler in self.handlers['cache_hit']:
+            handler(node)
 
     @inheritdoc(DataCollector)
     def cache_miss(self, node):
-        for c in self.collectors['cache_miss']:
-            c.cache_miss(node)
+        for handler in self.handlers['cache_miss']:
+            handler(node)
 
     @inheritdoc(DataCollector)
     def server_hit(self, node):
-        for c in self.collectors['server_hit']:
-            c.server_hit(node)
+        for handler in self.handlers['server_hit']:
+            handler(node)
 
     @inheritdoc(DataCollector)
     def request_hop(self, u, v, main_path=True):
-        for c in self.collectors['request_hop']:
-            c.request_hop(u, v, main_path)
+        for handler in self.handlers['request_hop']:
+            handler(u, v, main_path)
 
     @inheritdoc(DataCollector)
     def content_hop(self, u, v, main_path=True):
-        for c in self.collectors['content_hop']:
-            c.content_hop(u, v, main_path)
+        for handler in self.handlers['content_hop']:
+            handler(u, v, main_path)
 
     @inheritdoc(DataCollector)
     def end_session(self, success=True):
-        for c in self.collectors['end_session']:
-            c.end_session(success)
+        for handler in self.handlers['end_session']:
+            handler(success)
+
+    @inheritdoc(DataCollector)
+    def report_session(self, session):
+        for handler in self.handlers['report_session']:
+            handler(session)
 
     @inheritdoc(DataCollector)
     def results(self):
         return Tree(**{c.name: c.results() for c in self.collectors['results']})
 
+    @inheritdoc(DataCollector)
+    def handles(self, event):
+        return len(self.collectors[event]) > 0
+
 
 @register_data_collector('LINK_LOAD')
 class LinkLoadCollector(DataCollector):
@@ -261,6 +358,32 @@ class LinkLoadCollector(DataCollector):
     def content_hop(self, u, v, main_path=True):
         self.cont_count[(u, v)] += 1
 
+    @inheritdoc(DataCollector)
+    def report_session(self, session):
+        if self.t_start < 0:
+            self.t_start = session['timestamp']
+        self.t_end = session['timestamp']
+        req_count = self.req_count
+        for link in session['request_hops']:
+            req_count[link] += 1
+        cont_count = self.cont_count
+        for link in session['content_hops']:
+            cont_count[link] += 1
+
+    @inheritdoc(DataCollector)
+    def merge(self, other):
+        for link, count in other.req_count.items():
+            self.req_count[link] += count
+        for link, count in other.cont_count.items():
+            self.cont_count[link] += count
+        if other.t_start < 0:
+            return
+        if self.t_start < 0:
+            self.t_start, self.t_end = other.t_start, other.t_end
+        else:
+            self.t_start = min(self.t_start, other.t_start)
+            self.t_end = max(self.t_end, other.t_end)
+
     @inheritdoc(DataCollector)
     def results(self):
         duration = self.t_end - self.t_start
@@ -331,6 +454,32 @@ class LatencyCollector(DataCollector):
             self.latency_data.append(self.sess_latency)
         self.latency += self.sess_latency
 
+    @inheritdoc(DataCollector)
+    def report_session(self, session):
+        self.sess_count += 1
+        if not session['success']:
+            return
+        link_delay = self.view.link_delay
+        sess_latency = 0.0
+        for (u, v), main_path in zip(session['request_hops'],
+                                     session['request_main_path']):
+            if main_path:
+                sess_latency += link_delay(u, v)
+        for (u, v), main_path in zip(session['content_hops'],
+                                     session['content_main_path']):
+            if main_path:
+                sess_latency += link_delay(u, v)
+        if self.cdf:
+            self.latency_data.append(sess_latency)
+        self.latency += sess_latency
+
+    @inheritdoc(DataCollector)
+    def merge(self, other):
+        self.sess_count += other.sess_count
+        self.latency += other.latency
+        if self.cdf:
+            self.latency_data.extend(other.latency_data)
+
     @inheritdoc(DataCollector)
     def results(self):
         results = Tree({'MEAN': self.latency / self.sess_count})
@@ -403,6 +552,33 @@ class CacheHitRatioCollector(DataCollector):
         if self.per_node:
             self.per_node_server_hits[node] += 1
 
+    @inheritdoc(DataCollector)
+    def report_session(self, session):
+        self.start_session(session['timestamp'], session['receiver'],
+                           session['content'])
+        for node in session['cache_hits']:
+            self.cache_hit(node)
+        for node in session['server_hits']:
+            self.server_hit(node)
+
+    @inheritdoc(DataCollector)
+    def merge(self, other):
+        self.sess_count += other.sess_count
+        self.cache_hits += other.cache_hits
+        self.serv_hits += other.serv_hits
+        if self.off_path_hits:
+            self.off_path_hit_count += other.off_path_hit_count
+        if self.per_node:
+            for v, hits in other.per_node_cache_hits.items():
+                self.per_node_cache_hits[v] += hits
+            for v, hits in other.per_node_server_hits.items():
+                self.per_node_server_hits[v] += hits
+        if self.cont_hits:
+            for content, hits in other.cont_cache_hits.items():
+                self.cont_cache_hits[content] += hits
+            for content, hits in other.cont_serv_hits.items():
+                self.cont_serv_hits[content] += hits
+
     @inheritdoc(DataCollector)
     def results(self):
         n_sess = self.cache_hits + self.serv_hits
@@ -488,6 +664,25 @@ class PathStretchCollector(DataCollector):
             self.cont_stretch_data.append(cont_stretch)
             self.stretch_data.append(stretch)
 
+    @inheritdoc(DataCollector)
+    def report_session(self, session):
+        self.start_session(session['timestamp'], session['receiver'],
+                           session['content'])
+        self.req_path_len = len(session['request_hops'])
+        self.cont_path_len = len(session['content_hops'])
+        self.end_session(session['success'])
+
+    @inheritdoc(DataCollector)
+    def merge(self, other):
+        self.sess_count += other.sess_count
+        self.mean_req_stretch += other.mean_req_stretch
+        self.mean_cont_stretch += other.mean_cont_stretch
+        self.mean_stretch += other.mean_stretch
+        if self.cdf:
+            self.req_stretch_data.extend(other.req_stretch_data)
+            self.cont_stretch_data.extend(other.cont_stretch_data)
+            self.stretch_data.extend(other.stretch_data)
+
     @inheritdoc(DataCollector)
     def results(self):
         results = Tree({'MEAN': self.mean_stretch / self.sess_count,
@@ -4,15 +4,27 @@ The simulation engine, given the parameters according to which a single
 experiments needs to be run, instantiates all the required classes and executes
 the experiment by iterating through the event provided by an event generator
 and providing them to a strategy instance.
+
+The workload of experiments whose strategy routes the requests for each
+content through a distinct set of caches, e.g. hash-routing strategies, can
+also be split in shards which are executed in parallel by multiple processes.
 """
-from icarus.execution import NetworkModel, NetworkView, NetworkController, CollectorProxy
+import os
+import multiprocessing as mp
+
+from icarus.execution import NetworkModel, NetworkView, NetworkController, CollectorProxy, \
+                             save_snapshot, load_snapshot
 from icarus.registry import DATA_COLLECTOR, STRATEGY
 
 
-__all__ = ['exec_experiment']
+__all__ = [
+    'exec_experiment',
+    'exec_sharded_experiment'
+          ]
 
 
-def exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors):
+def exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors,
+                    warmup_snapshot=None):
     """Execute the simulation of a specific scenario.
 
     Parameters
@@ -37,12 +49,141 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
         The collectors to be used. It is a dictionary in which keys are the
         names of collectors to use and values are dictionaries of attributes
         for the collector they refer to.
+    warmup_snapshot : str, optional
+        Path of the snapshot of the network state at the end of the warmup
+        phase. If the file exists, the snapshot is restored and warmup
+        requests are not processed. Otherwise, the snapshot is saved to the
+        file as soon as the first request to be logged is received. Snapshots
+        can only be shared by experiments with identical parameters, except
+        the number of measured requests, and whose workload is generated from
+        the same seed.
+
+    Returns
+    -------
+    results : Tree
+        A tree with the aggregated simulation results from all collectors
+    """
+    model, strategy_inst, collectors_inst, collector = \
+        _setup(topology, workload, netconf, strategy, cache_policy, collectors)
+    _run(workload, model, strategy_inst, warmup_snapshot)
+    return collector.results()
+
+
+def exec_sharded_experiment(topology, workload, netconf, strategy,
+                            cache_policy, collectors, n_processes):
+    """Execute the simulation of a specific scenario, splitting its workload
+    in shards executed in parallel by multiple processes.
+
+    Requests are assigned to shards according to the `shard` method of the
+    strategy, so that requests of different shards never access the same
+    caches. Shards are then distributed among processes, each executing its
+    own shards on its own network model, and the measurements of the data
+    collectors of all processes are merged.
+
+    Caches evolve exactly as in a sequential execution, hence results are
+    the same, except for rounding errors, as long as neither the strategy nor
+    the cache policy draw random numbers. Otherwise, they are statistically
+    equivalent.
+
+    Parameters
+    ----------
+    topology : Topology
+        The FNSS Topology object modelling the network topology on which
+        experiments are run.
+    workload : iterable
+        An iterable object whose elements are (time, event) tuples, as in
+        `exec_experiment`
+    netconf : dict
+        Dictionary of attributes to inizialize the network model
+    strategy : tree
+        Strategy definition. The strategy must support sharding
+    cache_policy : tree
+        Cache policy definition
+    collectors: dict
+        The collectors to be used, which must support merging measurements.
+    n_processes : int
+        The number of processes
 
     Returns
     -------
     results : Tree
         A tree with the aggregated simulation results from all collectors
     """
+    if n_processes < 1:
+        raise ValueError('n_processes must be positive')
+    # The parent process only maps requests to shards and merges the
+    # measurements of its collectors, so its model does not compute paths
+    # unless they are queried
+    _, strategy_inst, collectors_inst, collector = \
+        _setup(topology, workload, dict(netconf, lazy_paths=True), strategy,
+               cache_policy, collectors)
+    # Shards are assigned to processes in turn, in the order their first
+    # request is seen, to balance the load of processes
+    process = {}
+    workloads = [[] for _ in range(n_processes)]
+    for time, event in workload:
+        shard = strategy_inst.shard(event['content'])
+        if shard is None:
+            raise ValueError('Strategy %s does not support sharding'
+                             % strategy['name'])
+        if shard not in process:
+            process[shard] = len(process) % n_processes
+        workloads[process[shard]].append((time, event))
+    args = [(topology, process_workload, netconf, strategy, cache_policy,
+             collectors) for process_workload in workloads if process_workload]
+    if args:
+        pool = mp.Pool(len(args))
+        try:
+            process_collectors = pool.map(_exec_shards, args)
+        finally:
+            pool.close()
+            pool.join()
+        for process_collectors_inst in process_collectors:
+            for c, process_c in zip(collectors_inst, process_collectors_inst):
+                c.merge(process_c)
+    return collector.results()
+
+
+def _exec_shards(args):
+    """Execute some shards of the workload of an experiment.
+
+    Parameters
+    ----------
+    args : tuple
+        The topology, the requests of the shards, the network configuration,
+        the strategy, the cache policy and the collectors of the experiment
+
+    Returns
+    -------
+    collectors : list
+        The collectors of the shards, without their network view
+    """
+    topology, workload, netconf, strategy, cache_policy, collectors = args
+    model, strategy_inst, collectors_inst, _ = \
+        _setup(topology, workload, netconf, strategy, cache_policy, collectors)
+    _run(workload, model, strategy_inst)
+    # The view is not sent back to the parent process, which merges the
+    # measurements of all shards into its own collectors
+    for c in collectors_inst:
+        c.view = None
+    return collectors_inst
+
+
+def _setup(topology, workload, netconf, strategy, cache_policy, collectors):
+    """Instantiate the network model, the strategy and the data collectors of
+    an experiment, given the parameters of `exec_experiment`.
+
+    Returns
+    -------
+    model : NetworkModel
+        The network model
+    strategy : Strategy
+        The strategy
+    collectors : list
+        The data collectors, in the order of the collectors dictionary
+    collector : CollectorProxy
+        The proxy dispatching events to the data collectors
+    """
     model = NetworkModel(topology, cache_policy, **netconf)
     view = NetworkView(model)
     controller = NetworkController(model)
@@ -59,8 +200,44 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
         strategy_args['zipf'] = workload.zipf
         strategy_args['average'] = workload.average_content_num
     strategy_inst = STRATEGY[strategy_name](view, controller, **strategy_args)
+    return model, strategy_inst, collectors_inst, collector
+
 
+def _run(workload, model, strategy_inst, warmup_snapshot=None):
+    """Process all events of a workload.
+
+    Parameters
+    ----------
+    workload : iterable
+        The (time, event) tuples of the workload
+    model : NetworkModel
+        The network model
+    strategy_inst : Strategy
+        The strategy processing events
+    warmup_snapshot : str, optional
+        Path of the snapshot of the network state at the end of the warmup
+        phase, as in `exec_experiment`
+    """
+    restore = warmup_snapshot is not None and os.path.exists(warmup_snapshot)
+    warmup = True
     for time, event in workload:
-        strategy_inst.process_event(time, **event)
-    return collector.results()
+        if warmup and event.get('log', True):
+            warmup = False
+            if restore:
+                # The workload generated this event before the random number
+                # generators were restored, so the event generated when the
+                # snapshot was saved is processed instead
+                time, event = load_snapshot(warmup_snapshot, model,
+                                            strategy_inst)
+            elif warmup_snapshot is not None:
+                save_snapshot(warmup_snapshot, model, strategy_inst,
+                              (time, event))
+        if warmup and restore:
+            # The state of caches at the end of warmup is in the snapshot
+            continue
+        if event.get('log') is False:
+            # Requests not logged only need to update the state of caches
+            strategy_inst.warmup(time, event['receiver'], event['content'])
+        else:
+            strategy_inst.process_event(time, **event)
 
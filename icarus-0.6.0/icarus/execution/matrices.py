@@ -0,0 +1,303 @@
+"""Matrices indexed by node ID
+
+This module contains data structures storing the shortest paths between the
+nodes of a network in NumPy matrices. Nodes are mapped to contiguous integer
+IDs by a `NodeIndex`, while the structures are still accessed by node label,
+so that network views and controllers only ever see original node labels.
+"""
+import collections
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+import numpy as np
+import networkx as nx
+
+__all__ = [
+    'NodeIndex',
+    'PredecessorPaths'
+          ]
+
+
+class NodeIndex(object):
+    """Bidirectional mapping between node labels and contiguous integer IDs.
+
+    IDs are assigned in order of insertion, starting from 0, and are never
+    reassigned, so that nodes removed and later restored keep their ID.
+    """
+
+    def __init__(self, labels=()):
+        """Constructor
+
+        Parameters
+        ----------
+        labels : iterable, optional
+            The labels of the nodes to index
+        """
+        # Label of each node, indexed by ID
+        self.labels = []
+        # ID of each node, keyed by label
+        self.ids = {}
+        for v in labels:
+            self.add(v)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, v):
+        return v in self.ids
+
+    def add(self, v):
+        """Index a node, if not already indexed.
+
+        Parameters
+        ----------
+        v : any hashable type
+            The node label
+
+        Returns
+        -------
+        id : int
+            The ID of the node
+        """
+        if v not in self.ids:
+            self.ids[v] = len(self.labels)
+            self.labels.append(v)
+        return self.ids[v]
+
+
+class PredecessorPaths(Mapping):
+    """Read-only dict of dicts of the shortest paths of a topology, stored as
+    a matrix of predecessors.
+
+    The entry *(i, j)* of the matrix is the ID of the node preceding node *j*
+    on the shortest path from node *i*, i.e. row *i* is the shortest path
+    tree rooted at node *i*. Paths are reconstructed walking back a tree when
+    accessed and the most recently accessed ones are kept in an LRU cache.
+    A matrix of distances is also kept, so that only the trees which may
+    change are recomputed after topology changes.
+
+    Paths are symmetric and are the same as those returned by
+    `symmetrify_paths(nx.all_pairs_dijkstra_path(topology))`. In fact, the
+    path between two nodes is always taken from the tree rooted at the node
+    which comes later in the iteration order of the topology.
+    """
+
+    def __init__(self, index, topology, maxlen=4096):
+        """Constructor
+
+        Parameters
+        ----------
+        index : NodeIndex
+            The index of the nodes of the network. Nodes not indexed are
+            added to the index
+        topology : fnss.Topology
+            The topology whose shortest paths are computed
+        maxlen : int, optional
+            The maximum number of reconstructed paths kept in memory
+        """
+        nodes = topology.nodes()
+        for v in nodes:
+            index.add(v)
+        n = len(index)
+        self.index = index
+        # Rank of each node in the iteration order of the topology, -1 for
+        # nodes not in the topology
+        self.rank = np.full(n, -1, dtype=np.int32)
+        # -1 marks pairs of nodes not connected, while the predecessor of
+        # the root of a tree is the root itself
+        self.pred = np.full((n, n), -1, dtype=np.int32)
+        # Distances are kept to repair trees after topology changes
+        self.dist = np.full((n, n), np.inf)
+        for rank, v in enumerate(nodes):
+            self.rank[index.ids[v]] = rank
+            self._compute(topology, v)
+        self.maxlen = maxlen
+        self._hot = collections.OrderedDict()
+        self._rows = {v: _PathRow(self, index.ids[v]) for v in nodes}
+
+    def _compute(self, topology, root):
+        """Compute the shortest path tree rooted at a node
+
+        Parameters
+        ----------
+        topology : fnss.Topology
+            The topology
+        root : any hashable type
+            The root of the tree
+        """
+        ids = self.index.ids
+        i = ids[root]
+        self.pred[i] = -1
+        self.dist[i] = np.inf
+        dist, paths = nx.single_source_dijkstra(topology, root)
+        for v, path in paths.items():
+            j = ids[v]
+            self.pred[i, j] = ids[path[-2]] if len(path) > 1 else i
+            self.dist[i, j] = dist[v]
+
+    def repair(self, topology, removed, added):
+        """Update shortest paths after links have been removed and added
+
+        Only the trees crossing a removed link or possibly improved by an
+        added one are recomputed, as in `stale_trees`.
+
+        Parameters
+        ----------
+        topology : fnss.Topology
+            The topology, after the changes
+        removed : list
+            Links *(u, v)* removed
+        added : list
+            Links *(u, v)* added
+        """
+        nodes = topology.nodes()
+        for v in nodes:
+            self.index.add(v)
+        n, m = len(self.index), len(self.rank)
+        if n > m:
+            # Make room for new nodes
+            pred = np.full((n, n), -1, dtype=np.int32)
+            pred[:m, :m] = self.pred
+            dist = np.full((n, n), np.inf)
+            dist[:m, :m] = self.dist
+            self.pred, self.dist = pred, dist
+            self.rank = np.concatenate((self.rank, np.full(n - m, -1, dtype=np.int32)))
+        ids = self.index.ids
+        rank = np.full(n, -1, dtype=np.int32)
+        for r, v in enumerate(nodes):
+            rank[ids[v]] = r
+        stale = np.zeros(n, dtype=bool)
+        for u, v in removed:
+            i, j = ids[u], ids[v]
+            stale |= (self.pred[:, j] == i) | (self.pred[:, i] == j)
+        for u, v in added:
+            if not topology.has_edge(u, v):
+                continue
+            weight = topology.edge[u][v].get('weight', 1)
+            du, dv = self.dist[:, ids[u]], self.dist[:, ids[v]]
+            stale |= (np.isfinite(du) | np.isfinite(dv)) & \
+                     ((du + weight <= dv) | (dv + weight <= du))
+        # Trees of removed nodes are dropped and those of new nodes computed
+        stale &= self.rank >= 0
+        for i in np.flatnonzero((rank < 0) & (self.rank >= 0)):
+            self.pred[i] = -1
+            self.dist[i] = np.inf
+        stale &= rank >= 0
+        stale |= (rank >= 0) & (self.rank < 0)
+        self.rank = rank
+        labels = self.index.labels
+        for i in np.flatnonzero(stale):
+            self._compute(topology, labels[i])
+        self._hot.clear()
+        self._rows = {v: _PathRow(self, ids[v]) for v in nodes}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __getitem__(self, s):
+        return self._rows[s]
+
+    def path(self, i, j):
+        """Return the shortest path between two nodes as an array of IDs
+
+        Parameters
+        ----------
+        i : int
+            The ID of the origin node
+        j : int
+            The ID of the destination node
+
+        Returns
+        -------
+        path : array
+            The IDs of the nodes of the path, origin and destination included.
+            The array is empty if the nodes are not connected
+        """
+        pred = self.pred
+        if self.rank[i] >= self.rank[j]:
+            root, k = i, j
+        else:
+            root, k = j, i
+        if pred.item(root, k) < 0:
+            return np.zeros(0, dtype=np.int32)
+        path = [k]
+        while k != root:
+            k = pred.item(root, k)
+            path.append(k)
+        if root == i:
+            path.reverse()
+        return np.array(path, dtype=np.int32)
+
+    def targets(self, i):
+        """Return the IDs of all nodes connected to a node
+
+        Parameters
+        ----------
+        i : int
+            The ID of the node
+
+        Returns
+        -------
+        targets : array
+            The IDs of the nodes
+        """
+        return np.flatnonzero(self.pred[i] >= 0)
+
+    def label_path(self, i, j):
+        """Return the shortest path between two nodes as a list of labels
+
+        Parameters
+        ----------
+        i : int
+            The ID of the origin node
+        j : int
+            The ID of the destination node
+
+        Returns
+        -------
+        path : list
+            The labels of the nodes of the path, origin and destination
+            included, or *None* if the nodes are not connected
+        """
+        try:
+            path = self._hot.pop((i, j))
+        except KeyError:
+            path = self.path(i, j)
+            if len(path) == 0:
+                return None
+            labels = self.index.labels
+            path = [labels[x] for x in path.tolist()]
+            if len(self._hot) >= self.maxlen:
+                self._hot.popitem(last=False)
+        self._hot[(i, j)] = path
+        return path
+
+
+class _PathRow(Mapping):
+    """Shortest paths from a single origin node"""
+
+    def __init__(self, paths, i):
+        self._paths = paths
+        self._i = i
+
+    def __len__(self):
+        return len(self._paths.targets(self._i))
+
+    def __iter__(self):
+        labels = self._paths.index.labels
+        return (labels[j] for j in self._paths.targets(self._i).tolist())
+
+    def __getitem__(self, t):
+        try:
+            path = self._paths.label_path(self._i, self._paths.index.ids[t])
+        except (KeyError, IndexError):
+            # Nodes indexed after the paths were stored are not connected
+            path = None
+        if path is None:
+            raise KeyError(t)
+        return path
@@ -13,11 +13,18 @@ The `NetworkController` is also responsible to notify a `DataCollectorProxy`
 of all relevant events.
 """
 import logging
+from collections import namedtuple, defaultdict
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 
 import networkx as nx
 import fnss
 
 from icarus.registry import CACHE_POLICY
+from icarus.execution.collectors import SESSION_EVENTS
+from icarus.execution.matrices import NodeIndex, PredecessorPaths
 from icarus.util import path_links, iround
 
 __all__ = [
@@ -28,6 +35,19 @@ __all__ = [
 
 logger = logging.getLogger('orchestration')
 
+# Caching nodes on a shortest path. Fields are: the path, the path reversed,
+# the nodes of the path with a cache, their offsets in the path and the
+# cumulative size of these caches, i.e. the i-th entry is the overall size of
+# the first i + 1 caches of the path
+PathCaches = namedtuple('PathCaches',
+                        ['path', 'reversed_path', 'caches', 'hops', 'capacity'])
+
+# Delivery of a content from a source to both a receiver and a cache. Fields
+# are: whether the cache is on the shortest path from the source to the
+# receiver, the node where the multicast tree to receiver and cache forks and
+# the number of hops from that node to the cache
+MulticastFork = namedtuple('MulticastFork', ['on_path', 'fork_node', 'hops'])
+
 def symmetrify_paths(shortest_paths):
     """Make paths symmetric
 
@@ -54,6 +74,282 @@ def symmetrify_paths(shortest_paths):
     return shortest_paths
 
 
+def stale_trees(roots, pred, dist, removed, added):
+    """Return the roots of the shortest path trees of a topology which may
+    change after removing and adding links.
+
+    A tree may change after removing a link only if the link belongs to the
+    tree and after adding a link only if the path through the link to one of
+    its endpoints is not longer than the current one. All other trees are
+    exactly those returned by Dijkstra's algorithm on the new topology,
+    including the choice among paths of equal length.
+
+    Parameters
+    ----------
+    roots : iterable
+        The roots of the trees
+    pred : callable
+        Function returning, given the root of a tree and a node, the
+        predecessor of the node in the tree or *None* if the node is the root
+        or is not reachable from it
+    dist : callable
+        Function returning, given the root of a tree and a node, the distance
+        of the node from the root or infinity if it is not reachable
+    removed : list
+        Links *(u, v)* removed
+    added : list
+        Links *(u, v, weight)* added
+
+    Returns
+    -------
+    stale : set
+        The roots of the trees which must be recomputed
+    """
+    inf = float('inf')
+    stale = set()
+    for r in roots:
+        if any(pred(r, v) == u or pred(r, u) == v for u, v in removed):
+            stale.add(r)
+            continue
+        for u, v, weight in added:
+            du, dv = dist(r, u), dist(r, v)
+            if du == dv == inf:
+                continue
+            if du + weight <= dv or dv + weight <= du:
+                stale.add(r)
+                break
+    return stale
+
+
+def added_links(topology, links):
+    """Return the links added to a topology which are still part of it, with
+    their weight
+
+    Parameters
+    ----------
+    topology : fnss.Topology
+        The topology
+    links : list
+        Links *(u, v)* added
+
+    Returns
+    -------
+    added : list
+        Links *(u, v, weight)* still part of the topology
+    """
+    return [(u, v, topology.edge[u][v].get('weight', 1))
+            for u, v in links if topology.has_edge(u, v)]
+
+
+class ShortestPathTrees(object):
+    """Shortest path trees rooted at all nodes of a topology.
+
+    Trees are used to repair the all-pair shortest paths of a network model
+    after topology changes, recomputing only the trees which may have changed
+    rather than all of them.
+    """
+
+    def __init__(self, topology):
+        """Constructor
+
+        Parameters
+        ----------
+        topology : fnss.Topology
+            The topology
+        """
+        # Distance and predecessor of each node, keyed by root of the tree
+        self.dist = {}
+        self.pred = {}
+        # All-pair shortest paths, made symmetric
+        self.paths = {v: self._compute(topology, v)
+                      for v in topology.nodes_iter()}
+        symmetrify_paths(self.paths)
+
+    def _compute(self, topology, root):
+        """Compute the shortest path tree rooted at a node
+
+        Parameters
+        ----------
+        topology : fnss.Topology
+            The topology
+        root : any hashable type
+            The root of the tree
+
+        Returns
+        -------
+        paths : dict
+            Shortest paths from the root, keyed by destination
+        """
+        self.dist[root], paths = nx.single_source_dijkstra(topology, root)
+        self.pred[root] = {v: path[-2] for v, path in paths.items()
+                           if len(path) > 1}
+        return paths
+
+    def repair(self, topology, removed, added):
+        """Update shortest paths after links have been removed and added
+
+        Parameters
+        ----------
+        topology : fnss.Topology
+            The topology, after the changes
+        removed : list
+            Links *(u, v)* removed
+        added : list
+            Links *(u, v)* added
+        """
+        nodes = topology.nodes()
+        rank = {v: i for i, v in enumerate(nodes)}
+        for v in [v for v in self.pred if v not in rank]:
+            del self.dist[v]
+            del self.pred[v]
+            for u in self.paths.pop(v):
+                if u != v:
+                    self.paths[u].pop(v, None)
+        inf = float('inf')
+        stale = stale_trees(list(self.pred),
+                            lambda r, v: self.pred[r].get(v),
+                            lambda r, v: self.dist[r].get(v, inf),
+                            removed, added_links(topology, added))
+        stale.update(v for v in nodes if v not in self.pred)
+        # The path between two nodes is taken from the tree rooted at the
+        # node coming later in the order of the topology, as symmetrify_paths
+        # does. Hence only the paths taken from stale trees change
+        for r in stale:
+            tree = self._compute(topology, r)
+            row = self.paths.setdefault(r, {})
+            for v in [v for v in row if rank[v] <= rank[r] and v not in tree]:
+                del row[v]
+                self.paths[v].pop(r, None)
+            for v, path in tree.items():
+                if rank[v] <= rank[r]:
+                    row[v] = path
+                    self.paths.setdefault(v, {})[r] = list(reversed(path))
+
+
+class LazyPaths(Mapping):
+    """Read-only dict of dicts of the shortest paths of a topology, computed
+    on demand.
+
+    Shortest paths are computed running single-source Dijkstra from a node
+    the first time a path from or to that node is queried, so that the cost
+    of computing paths scales with the number of nodes actually used as
+    endpoints, e.g. receivers, sources and caches, rather than with the
+    square of the number of nodes of the topology.
+
+    Paths are symmetric and are the same as those returned by
+    `symmetrify_paths(nx.all_pairs_dijkstra_path(topology))`. In fact, the
+    path between two nodes is always taken from the shortest path tree
+    rooted at the node which comes later in the iteration order of the
+    topology.
+
+    Notes
+    -----
+    Paths are computed on the topology as it is when they are first queried.
+    Hence, after changing the topology, paths must be repaired.
+    """
+
+    def __init__(self, topology):
+        """Constructor
+
+        Parameters
+        ----------
+        topology : fnss.Topology
+            The topology whose shortest paths are computed
+        """
+        self.topology = topology
+        # Rank of each node in the iteration order of the topology
+        self.rank = {v: i for i, v in enumerate(topology.nodes_iter())}
+        # Shortest paths and distances from each node from which they have
+        # been computed
+        self.trees = {}
+        self.dist = {}
+        self._rows = {v: _LazyPathRow(self, v) for v in self.rank}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __getitem__(self, s):
+        return self._rows[s]
+
+    def tree(self, v):
+        """Return the shortest paths from a node to all nodes reachable from
+        it, computing them if not computed yet.
+
+        Parameters
+        ----------
+        v : any hashable type
+            The origin node
+
+        Returns
+        -------
+        tree : dict
+            Dictionary of shortest paths keyed by destination node
+        """
+        if v not in self.trees:
+            self.dist[v], self.trees[v] = nx.single_source_dijkstra(self.topology, v)
+        return self.trees[v]
+
+    def repair(self, topology, removed, added):
+        """Discard the paths which may have changed after links have been
+        removed and added, so that they are computed again when queried
+
+        Parameters
+        ----------
+        topology : fnss.Topology
+            The topology, after the changes
+        removed : list
+            Links *(u, v)* removed
+        added : list
+            Links *(u, v)* added
+        """
+        def pred(r, v):
+            path = self.trees[r].get(v)
+            return path[-2] if path is not None and len(path) > 1 else None
+        inf = float('inf')
+        self.topology = topology
+        self.rank = {v: i for i, v in enumerate(topology.nodes_iter())}
+        stale = stale_trees([v for v in self.trees if v in self.rank], pred,
+                            lambda r, v: self.dist[r].get(v, inf),
+                            removed, added_links(topology, added))
+        stale.update(v for v in self.trees if v not in self.rank)
+        for v in stale:
+            del self.trees[v]
+            del self.dist[v]
+        self._rows = {v: _LazyPathRow(self, v) for v in self.rank}
+
+
+class _LazyPathRow(Mapping):
+    """Shortest paths from a single origin node, computed on demand"""
+
+    def __init__(self, paths, s):
+        self._paths = paths
+        self._s = s
+        # Paths queried so far, keyed by destination
+        self._path = {}
+
+    def __len__(self):
+        return len(self._paths.tree(self._s))
+
+    def __iter__(self):
+        return iter(self._paths.tree(self._s))
+
+    def __getitem__(self, t):
+        if t in self._path:
+            return self._path[t]
+        paths = self._paths
+        if t not in paths.rank:
+            raise KeyError(t)
+        if paths.rank[self._s] >= paths.rank[t]:
+            path = paths.tree(self._s)[t]
+        else:
+            path = list(reversed(paths.tree(t)[self._s]))
+        self._path[t] = path
+        return path
+
+
 class NetworkView(object):
     """Network view
 
@@ -91,7 +387,20 @@ class NetworkView(object):
         nodes : set
             A set of all nodes currently storing the given content
         """
-        loc = set(v for v in self.model.cache if self.model.cache[v].has(k))
+        loc = set()
+        nodes = self.model.content_caches.get(k)
+        if nodes:
+            cache = self.model.cache
+            # The index may list nodes which no longer store the content, e.g.
+            # if it expired. These are dropped lazily,
+            # except those whose cache is removed, as it may be restored
+            for v in list(nodes):
+                if v not in cache:
+                    continue
+                if cache[v].has(k):
+                    loc.add(v)
+                else:
+                    nodes.discard(v)
         source = self.content_source(k)
         if source:
             loc.add(source)
@@ -131,6 +440,133 @@ class NetworkView(object):
         """
         return self.model.shortest_path[s][t]
 
+    def distance(self, s, t):
+        """Return the delay of the path of minimum delay from *s* to *t*
+
+        Distances from a node are computed the first time a distance from
+        that node is queried and then memoised until paths change, so that
+        strategies and data collectors share the same distance table.
+
+        Parameters
+        ----------
+        s : any hashable type
+            Origin node
+        t : any hashable type
+            Destination node
+
+        Returns
+        -------
+        distance : float
+            The overall delay of the path
+        """
+        return self.distances(s)[t]
+
+    def distances(self, s):
+        """Return the delays of the paths of minimum delay from *s* to all
+        nodes it is connected to
+
+        The returned dictionary is the one memoised by *distance*. Use it
+        rather than *distance* to compare the distances from *s* to many
+        nodes, e.g. to select the nearest replica of a content.
+
+        Parameters
+        ----------
+        s : any hashable type
+            Origin node
+
+        Returns
+        -------
+        distances : dict
+            The overall delay of the paths, keyed by destination node
+        """
+        if s not in self.model.distance:
+            self.model.distance[s] = nx.single_source_dijkstra_path_length(
+                                        self.model.topology, s, weight='delay')
+        return self.model.distance[s]
+
+    def path_caches(self, s, t):
+        """Return the nodes with a cache on the shortest path from *s* to *t*
+
+        The returned value is computed the first time a path is queried and
+        then memoised until paths or caches change.
+
+        Parameters
+        ----------
+        s : any hashable type
+            Origin node
+        t : any hashable type
+            Destination node
+
+        Returns
+        -------
+        path_caches : PathCaches
+            Named tuple whose fields are: *path*, the shortest path from *s*
+            to *t*, *reversed_path*, the same path from *t* to *s*, *caches*,
+            the nodes of the path with a cache, ordered from *s* to *t*,
+            *hops*, the offsets of these nodes in the path and *capacity*,
+            the cumulative size of these caches
+        """
+        try:
+            return self.model.path_caches[(s, t)]
+        except KeyError:
+            pass
+        path = self.model.shortest_path[s][t]
+        cache = self.model.cache
+        hops = tuple(i for i, v in enumerate(path) if v in cache)
+        caches = tuple(path[i] for i in hops)
+        capacity = []
+        size = 0
+        for v in caches:
+            size += cache[v].maxlen
+            capacity.append(size)
+        path_caches = PathCaches(path, tuple(reversed(path)), caches, hops,
+                                 tuple(capacity))
+        self.model.path_caches[(s, t)] = path_caches
+        return path_caches
+
+    def multicast_fork(self, s, t, v):
+        """Return how a content from *s* is delivered to both *t* and *v* on
+        shortest paths
+
+        The returned value is computed the first time it is queried and then
+        memoised until paths change.
+
+        Parameters
+        ----------
+        s : any hashable type
+            Origin node, e.g. a content source
+        t : any hashable type
+            Main destination node, e.g. a receiver
+        v : any hashable type
+            Other destination node, e.g. a cache
+
+        Returns
+        -------
+        multicast_fork : MulticastFork
+            Named tuple whose fields are: *on_path*, whether *v* is on the
+            shortest path from *s* to *t*, *fork_node*, the last node shared
+            by the shortest paths from *s* to *t* and to *v*, or *v* if either
+            path contains the other, and *hops*, the number of hops of the
+            shortest path from the fork node to *v*
+        """
+        try:
+            return self.model.multicast_forks[(s, t, v)]
+        except KeyError:
+            pass
+        shortest_path = self.model.shortest_path
+        recv_path = shortest_path[s][t]
+        cache_path = shortest_path[s][v]
+        for i in range(1, min(len(cache_path), len(recv_path))):
+            if cache_path[i] != recv_path[i]:
+                fork_node = cache_path[i - 1]
+                break
+        else:
+            fork_node = v
+        multicast_fork = MulticastFork(v in recv_path, fork_node,
+                                       len(shortest_path[fork_node][v]) - 1)
+        self.model.multicast_forks[(s, t, v)] = multicast_fork
+        return multicast_fork
+
     def all_pairs_shortest_paths(self):
         """Return all pairs shortest paths
 
@@ -325,7 +761,8 @@ class NetworkModel(object):
     calls to the network controller.
     """
 
-    def __init__(self, topology, cache_policy, shortest_path=None):
+    def __init__(self, topology, cache_policy, shortest_path=None,
+                 lazy_paths=False, predecessor_paths=False):
         """Constructor
 
         Parameters
@@ -338,6 +775,16 @@ class NetworkModel(object):
             policy
         shortest_path : dict of dict, optional
             The all-pair shortest paths of the network
+        lazy_paths : bool, optional
+            If *True*, shortest paths are not computed between all pairs of
+            nodes when the model is built. Instead, the shortest paths from a
+            node are computed the first time a path from or to that node is
+            queried.
+        predecessor_paths : bool, optional
+            If *True*, the shortest paths computed by the model are stored as
+            a matrix of predecessors indexed by node ID and reconstructed on
+            demand, rather than as lists of nodes. Ignored if *lazy_paths* is
+            *True*.
         """
         # Filter inputs
         if not isinstance(topology, fnss.Topology):
@@ -345,9 +792,21 @@ class NetworkModel(object):
                              'fnss.Topology or any of its subclasses.')
 
         # Shortest paths of the network
-        self.shortest_path = shortest_path if shortest_path is not None \
-                             else symmetrify_paths(nx.all_pairs_dijkstra_path(topology))
+        self.lazy_paths = lazy_paths
+        self.predecessor_paths = predecessor_paths
+        if shortest_path is not None:
+            self.shortest_path = shortest_path
+        elif lazy_paths:
+            self.shortest_path = LazyPaths(topology)
+        elif predecessor_paths:
+            self.shortest_path = PredecessorPaths(
+                                    NodeIndex(topology.nodes_iter()), topology)
+        else:
+            self.shortest_path = symmetrify_paths(nx.all_pairs_dijkstra_path(topology))
 
+        # Distances, by delay, from the nodes from which they have been
+        # queried. Entries are added lazily by the view
+        self.distance = {}
         # Network topology
         self.topology = topology
 
@@ -398,6 +857,40 @@ class NetworkModel(object):
         # Hashrouting with edge cache)
         self.local_cache = {}
 
+        # Index of the current time window over which caches count requests
+        # and, for each cache, index of the latest window it has rolled over
+        # to. They differ only if windows are closed lazily.
+        self.freq_epoch = 0
+        self.cache_epoch = {node: 0 for node in self.cache}
+        # Whether a window has ever been closed lazily. Until then, caches
+        # need not be rolled over when accessed
+        self.lazy_freq = False
+
+        # Nodes whose cache may store a content, keyed by content. Nodes are
+        # added when a content is inserted and removed when it is evicted or
+        # removed. Entries may be stale, so the cache must be checked
+        self.content_caches = defaultdict(set)
+
+        # Shortest path trees of the topology, computed the first time paths
+        # are repaired after a topology change, unless paths are stored
+        # lazily or as a matrix of predecessors
+        self.path_trees = None
+
+        # Links removed from and added to the topology since shortest paths
+        # were last computed
+        self.pending_link_removals = []
+        self.pending_link_additions = []
+
+        # Caching nodes on shortest paths, keyed by (origin, destination).
+        # Entries are added lazily by the view and must be cleared whenever
+        # paths or caches change
+        self.path_caches = {}
+
+        # Multicast delivery from a source to a receiver and a cache, keyed by
+        # (source, receiver, cache). Entries are added lazily by the view and
+        # must be cleared whenever paths change
+        self.multicast_forks = {}
+
         # Keep track of nodes and links removed to simulate failures
         self.removed_nodes = {}
         # This keeps track of neighbors of a removed node at the time of removal.
@@ -429,7 +922,7 @@ class NetworkController(object):
         """
         self.session = None
         self.model = model
-        self.collector = None
+        self.detach_collector()
 
     def attach_collector(self, collector):
         """Attach a data collector to which all events will be reported.
@@ -440,10 +933,17 @@ class NetworkController(object):
             The data collector
         """
         self.collector = collector
+        # Events are only notified to the collector if it handles them, and
+        # the summary of each session is only recorded if requested
+        self._report_session = collector.handles('report_session')
+        self._notify = {e: collector.handles(e) for e in SESSION_EVENTS}
 
     def detach_collector(self):
         """Detach the data collector."""
         self.collector = None
+        self._log = False
+        self._report_session = False
+        self._notify = dict.fromkeys(SESSION_EVENTS, False)
 
     def start_session(self, timestamp, receiver, content, log):
         """Instruct the controller to start a new session (i.e. the retrieval
@@ -465,8 +965,17 @@ class NetworkController(object):
                             receiver=receiver,
                             content=content,
                             log=log)
-        if self.collector is not None and self.session['log']:
-            self.collector.start_session(timestamp, receiver, content)
+        # Events of sessions not logged, e.g. during warmup, are not reported
+        # at all, without checking the collector at every event
+        self._log = self.collector is not None and log
+        if self._log:
+            if self._report_session:
+                self.session.update(request_hops=[], request_main_path=[],
+                                    content_hops=[], content_main_path=[],
+                                    cache_hits=[], cache_misses=[],
+                                    server_hits=[])
+            if self._notify['start_session']:
+                self.collector.start_session(timestamp, receiver, content)
 
     def forward_request_path(self, s, t, path=None, main_path=True):
         """Forward a request from node *s* to node *t* over the provided path.
@@ -484,10 +993,17 @@ class NetworkController(object):
             lead to hit a content. It is normally used to calculate latency
             correctly in multicast cases. Default value is *True*
         """
+        if not self._log:
+            return
         if path is None:
             path = self.model.shortest_path[s][t]
-        for u, v in path_links(path):
-            self.forward_request_hop(u, v, main_path)
+        links = path_links(path)
+        if self._report_session:
+            self.session['request_hops'].extend(links)
+            self.session['request_main_path'].extend([main_path] * len(links))
+        if self._notify['request_hop']:
+            for u, v in links:
+                self.collector.request_hop(u, v, main_path)
 
     def forward_content_path(self, u, v, path=None, main_path=True):
         """Forward a content from node *s* to node *t* over the provided path.
@@ -506,10 +1022,17 @@ class NetworkController(object):
             calculate latency correctly in multicast cases. Default value is
             *True*
         """
+        if not self._log:
+            return
         if path is None:
             path = self.model.shortest_path[u][v]
-        for u, v in path_links(path):
-            self.forward_content_hop(u, v, main_path)
+        links = path_links(path)
+        if self._report_session:
+            self.session['content_hops'].extend(links)
+            self.session['content_main_path'].extend([main_path] * len(links))
+        if self._notify['content_hop']:
+            for u, v in links:
+                self.collector.content_hop(u, v, main_path)
 
     def forward_request_hop(self, u, v, main_path=True):
         """Forward a request over link  u -> v.
@@ -525,8 +1048,12 @@ class NetworkController(object):
             lead to hit a content. It is normally used to calculate latency
             correctly in multicast cases. Default value is *True*
         """
-        if self.collector is not None and self.session['log']:
-            self.collector.request_hop(u, v, main_path)
+        if self._log:
+            if self._report_session:
+                self.session['request_hops'].append((u, v))
+                self.session['request_main_path'].append(main_path)
+            if self._notify['request_hop']:
+                self.collector.request_hop(u, v, main_path)
 
     def forward_content_hop(self, u, v, main_path=True):
         """Forward a content over link  u -> v.
@@ -543,10 +1070,14 @@ class NetworkController(object):
             calculate latency correctly in multicast cases. Default value is
             *True*
         """
-        if self.collector is not None and self.session['log']:
-            self.collector.content_hop(u, v, main_path)
-
-    def put_content(self, node):
+        if self._log:
+            if self._report_session:
+                self.session['content_hops'].append((u, v))
+                self.session['content_main_path'].append(main_path)
+            if self._notify['content_hop']:
+                self.collector.content_hop(u, v, main_path)
+
+    def put_content(self, node, content=None):
         """Store content in the specified node.
 
         The node must have a cache stack and the actual insertion of the
@@ -558,6 +1089,9 @@ class NetworkController(object):
         ----------
         node : any hashable type
             The node where the content is inserted
+        content : any hashable type, optional
+            The content to insert. If not provided, the content of the
+            current session is inserted
 
         Returns
         -------
@@ -565,45 +1099,76 @@ class NetworkController(object):
             The evicted object or *None* if no contents were evicted.
         """
         if node in self.model.cache:
-            return self.model.cache[node].put(self.session['content'])
-
-    def get_content(self, node):
+            if content is None:
+                content = self.session['content']
+            if self.model.lazy_freq:
+                self._roll_freq(node)
+            cache = self.model.cache[node]
+            evicted = cache.put(content)
+            # Admission policies may reject the content, so index it only if
+            # it was actually inserted
+            if cache.has(content):
+                self.model.content_caches[content].add(node)
+            if evicted is not None and evicted in self.model.content_caches:
+                self.model.content_caches[evicted].discard(node)
+            return evicted
+
+    def get_content(self, node, content=None):
         """Get a content from a server or a cache.
 
         Parameters
         ----------
         node : any hashable type
             The node where the content is retrieved
+        content : any hashable type, optional
+            The content to retrieve. If not provided, the content of the
+            current session is retrieved. Contents retrieved outside of a
+            session are not reported to the collector
 
         Returns
         -------
         content : bool
             True if the content is available, False otherwise
         """
+        if content is None:
+            content = self.session['content']
         if node in self.model.cache:
-            cache_hit = self.model.cache[node].get(self.session['content'])
-            if cache_hit:
-                if self.session['log']:
-                    self.collector.cache_hit(node)
-            else:
-                if self.session['log']:
-                    self.collector.cache_miss(node)
+            if self.model.lazy_freq:
+                self._roll_freq(node)
+            cache_hit = self.model.cache[node].get(content)
+            if self._log:
+                if cache_hit:
+                    if self._report_session:
+                        self.session['cache_hits'].append(node)
+                    if self._notify['cache_hit']:
+                        self.collector.cache_hit(node)
+                else:
+                    if self._report_session:
+                        self.session['cache_misses'].append(node)
+                    if self._notify['cache_miss']:
+                        self.collector.cache_miss(node)
             return cache_hit
         name, props = fnss.get_stack(self.model.topology, node)
-        if name == 'source' and self.session['content'] in props['contents']:
-            if self.collector is not None and self.session['log']:
-                self.collector.server_hit(node)
+        if name == 'source' and content in props['contents']:
+            if self._log:
+                if self._report_session:
+                    self.session['server_hits'].append(node)
+                if self._notify['server_hit']:
+                    self.collector.server_hit(node)
             return True
         else:
             return False
 
-    def remove_content(self, node):
+    def remove_content(self, node, content=None):
         """Remove the content being handled from the cache
 
         Parameters
         ----------
         node : any hashable type
             The node where the cached content is removed
+        content : any hashable type, optional
+            The content to remove. If not provided, the content of the current
+            session is removed
 
         Returns
         -------
@@ -611,7 +1176,13 @@ class NetworkController(object):
             *True* if the entry was in the cache, *False* if it was not.
         """
         if node in self.model.cache:
-            return self.model.cache[node].remove(self.session['content'])
+            if content is None:
+                content = self.session['content']
+            if self.model.lazy_freq:
+                self._roll_freq(node)
+            if content in self.model.content_caches:
+                self.model.content_caches[content].discard(node)
+            return self.model.cache[node].remove(content)
 
     def end_session(self, success=True):
         """Close a session
@@ -621,9 +1192,14 @@ class NetworkController(object):
         success : bool, optional
             *True* if the session was completed successfully, *False* otherwise
         """
-        if self.collector is not None and self.session['log']:
-            self.collector.end_session(success)
+        if self._log:
+            if self._report_session:
+                self.session['success'] = success
+                self.collector.report_session(self.session)
+            if self._notify['end_session']:
+                self.collector.end_session(success)
         self.session = None
+        self._log = False
 
     def rewire_link(self, u, v, up, vp, recompute_paths=True):
         """Rewire an existing link to new endpoints
@@ -647,9 +1223,10 @@ class NetworkController(object):
         link = self.model.topology.edge[u][v]
         self.model.topology.remove_edge(u, v)
         self.model.topology.add_edge(up, vp, **link)
+        self.model.pending_link_removals.append((u, v))
+        self.model.pending_link_additions.append((up, vp))
         if recompute_paths:
-            shortest_path = nx.all_pairs_dijkstra_path(self.model.topology)
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self._recompute_paths()
 
     def remove_link(self, u, v, recompute_paths=True):
         """Remove a link from the topology and update the network model.
@@ -671,13 +1248,13 @@ class NetworkController(object):
         v : any hashable type
             Destination node
         recompute_paths: bool, optional
-            If True, recompute all shortest paths
+            If True, repair the shortest paths affected by the change
         """
         self.model.removed_links[(u, v)] = self.model.topology.edge[u][v]
         self.model.topology.remove_edge(u, v)
+        self.model.pending_link_removals.append((u, v))
         if recompute_paths:
-            shortest_path = nx.all_pairs_dijkstra_path(self.model.topology)
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self._recompute_paths()
 
     def restore_link(self, u, v, recompute_paths=True):
         """Restore a previously-removed link and update the network model
@@ -689,12 +1266,12 @@ class NetworkController(object):
         v : any hashable type
             Destination node
         recompute_paths: bool, optional
-            If True, recompute all shortest paths
+            If True, repair the shortest paths affected by the change
         """
         self.model.topology.add_edge(u, v, **self.model.removed_links.pop((u, v)))
+        self.model.pending_link_additions.append((u, v))
         if recompute_paths:
-            shortest_path = nx.all_pairs_dijkstra_path(self.model.topology)
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self._recompute_paths()
 
     def remove_node(self, v, recompute_paths=True):
         """Remove a node from the topology and update the network model.
@@ -727,7 +1304,7 @@ class NetworkController(object):
         v : any hashable type
             Node to remove
         recompute_paths: bool, optional
-            If True, recompute all shortest paths
+            If True, repair the shortest paths affected by the change
         """
         self.model.removed_nodes[v] = self.model.topology.node[v]
         # First need to remove all links the removed node as endpoint
@@ -740,13 +1317,13 @@ class NetworkController(object):
             self.model.removed_caches[v] = self.model.cache.pop(v)
         if v in self.model.local_cache:
             self.model.removed_local_caches[v] = self.model.local_cache.pop(v)
+        self.model.path_caches.clear()
         if v in self.model.source_node:
             self.model.removed_sources[v] = self.model.source_node.pop(v)
             for content in self.model.removed_sources[v]:
-                self.model.countent_source.pop(content)
+                self.model.content_source.pop(content)
         if recompute_paths:
-            shortest_path = nx.all_pairs_dijkstra_path(self.model.topology)
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self._recompute_paths()
 
     def restore_node(self, v, recompute_paths=True):
         """Restore a previously-removed node and update the network model.
@@ -756,7 +1333,7 @@ class NetworkController(object):
         v : any hashable type
             Node to restore
         recompute_paths: bool, optional
-            If True, recompute all shortest paths
+            If True, repair the shortest paths affected by the change
         """
         self.model.topology.add_node(v, **self.model.removed_nodes.pop(v))
         for u in self.model.disconnected_neighbors[v]:
@@ -767,13 +1344,13 @@ class NetworkController(object):
             self.model.cache[v] = self.model.removed_caches.pop(v)
         if v in self.model.removed_local_caches:
             self.model.local_cache[v] = self.model.removed_local_caches.pop(v)
+        self.model.path_caches.clear()
         if v in self.model.removed_sources:
             self.model.source_node[v] = self.model.removed_sources.pop(v)
             for content in self.model.source_node[v]:
-                self.model.countent_source[content] = v
+                self.model.content_source[content] = v
         if recompute_paths:
-            shortest_path = nx.all_pairs_dijkstra_path(self.model.topology)
-            self.model.shortest_path = symmetrify_paths(shortest_path)
+            self._recompute_paths()
 
     def reserve_local_cache(self, ratio=0.1):
         """Reserve a fraction of cache as local.
@@ -805,6 +1382,7 @@ class NetworkController(object):
             local_maxlen = iround(c.maxlen * (ratio))
             if local_maxlen > 0:
                 self.model.local_cache[v] = type(c)(local_maxlen)
+        self.model.path_caches.clear()
 
     def get_content_local_cache(self, node):
         """Get content from local cache of node (if any)
@@ -820,12 +1398,17 @@ class NetworkController(object):
         if node not in self.model.local_cache:
             return False
         cache_hit = self.model.local_cache[node].get(self.session['content'])
-        if cache_hit:
-            if self.session['log']:
-                self.collector.cache_hit(node)
-        else:
-            if self.session['log']:
-                self.collector.cache_miss(node)
+        if self._log:
+            if cache_hit:
+                if self._report_session:
+                    self.session['cache_hits'].append(node)
+                if self._notify['cache_hit']:
+                    self.collector.cache_hit(node)
+            else:
+                if self._report_session:
+                    self.session['cache_misses'].append(node)
+                if self._notify['cache_miss']:
+                    self.collector.cache_miss(node)
         return cache_hit
 
     def put_content_local_cache(self, node):
@@ -842,12 +1425,111 @@ class NetworkController(object):
         if node in self.model.local_cache:
             return self.model.local_cache[node].put(self.session['content'])
 
-    def update_freq(self):
-        for k in self.model.cache:
-            self.model.cache[k].update_freq()
+    def apply_topology_changes(self, changes):
+        """Apply a batch of topology changes and then repair shortest paths
+        once for all of them.
+
+        Parameters
+        ----------
+        changes : iterable of tuples
+            The changes to apply, in order. Each change is a tuple whose first
+            element is the name of the method of the controller applying it,
+            i.e. *rewire_link*, *remove_link*, *restore_link*, *remove_node* or
+            *restore_node*, and whose other elements are the positional
+            arguments of the method, e.g. *('remove_link', u, v)*
+        """
+        changes = list(changes)
+        for change in changes:
+            if change[0] not in ('rewire_link', 'remove_link', 'restore_link',
+                                 'remove_node', 'restore_node'):
+                raise ValueError('Topology change %s not supported'
+                                 % str(change[0]))
+        for change in changes:
+            getattr(self, change[0])(*change[1:], recompute_paths=False)
+        self._recompute_paths()
+
+    def _recompute_paths(self):
+        """Repair the shortest paths of the topology after all changes applied
+        since they were last computed and clear the caching nodes and
+        distances memoised for each path
+
+        Only the shortest path trees crossing a removed link or possibly
+        improved by an added one are recomputed. Regular models compute all
+        trees the first time paths are repaired."""
+        model = self.model
+        removed, added = model.pending_link_removals, model.pending_link_additions
+        model.pending_link_removals, model.pending_link_additions = [], []
+        if isinstance(model.shortest_path, (LazyPaths, PredecessorPaths)):
+            model.shortest_path.repair(model.topology, removed, added)
+        elif model.lazy_paths:
+            model.shortest_path = LazyPaths(model.topology)
+        elif model.predecessor_paths:
+            model.shortest_path = PredecessorPaths(
+                            NodeIndex(model.topology.nodes_iter()), model.topology)
+        elif model.path_trees is None:
+            model.path_trees = ShortestPathTrees(model.topology)
+            model.shortest_path = model.path_trees.paths
+        else:
+            model.path_trees.repair(model.topology, removed, added)
+        model.path_caches.clear()
+        model.multicast_forks.clear()
+        model.distance.clear()
+
+    def _roll_freq(self, node):
+        """Make the cache of a node close all time windows of request
+        frequency closed since it was last accessed.
+
+        Parameters
+        ----------
+        node : any hashable type
+            The node whose cache is rolled over
+        """
+        elapsed = self.model.freq_epoch - self.model.cache_epoch.get(node, 0)
+        if elapsed > 0:
+            # A cache not accessed during a window did not count any request
+            # in it, so closing more than two windows has the same effect as
+            # closing two
+            for _ in range(min(elapsed, 2)):
+                self.model.cache[node].update_freq()
+            self.model.cache_epoch[node] = self.model.freq_epoch
+
+    def update_freq(self, lazy=False):
+        """Close the current time window over which caches count requests.
 
-    def update_dist(self, v, value):
-        content = self.session['content']
+        Parameters
+        ----------
+        lazy : bool, optional
+            If *True*, caches are not notified straight away. Instead, each
+            cache closes the window the first time it is accessed afterwards,
+            so that the cost of this operation does not depend on the number
+            of caches. Note that dumps of caches not accessed since may not
+            reflect the closure of the window.
+        """
+        self.model.freq_epoch += 1
+        if lazy:
+            self.model.lazy_freq = True
+        else:
+            for v in self.model.cache:
+                self._roll_freq(v)
+
+    def update_dist(self, v, value, content=None):
+        """Notify the cache of a node of the distance of the node serving the
+        content being handled.
+
+        Parameters
+        ----------
+        v : any hashable type
+            The node whose cache is notified
+        value : int
+            The distance, in hops, of the serving node
+        content : any hashable type, optional
+            The content being handled. If not provided, the content of the
+            current session is used
+        """
+        if content is None:
+            content = self.session['content']
+        if self.model.lazy_freq:
+            self._roll_freq(v)
         self.model.cache[v].update_dist(content, value)
 
 
@@ -0,0 +1,118 @@
+"""Snapshots of the state of the network at the end of the warmup.
+
+Experiments sharing topology, workload, cache placement, content placement,
+strategy and cache policy also share the state of the network at the end of
+the warmup phase, as long as the workload is generated from the same seed.
+This module allows to save this state to a file, so that it can be restored
+by subsequent experiments, which can then skip the warmup phase and start
+measuring immediately.
+
+A snapshot stores the state of all caches of the network model, the internal
+state of the strategy, the state of the random number generators and the
+first measured event, so that the measurement phase of an experiment
+restoring a snapshot is identical to that of the experiment which saved it.
+The first measured event is stored because workloads generate it before the
+state of the random number generators can be restored. Snapshots are pickled and compressed
+with gzip.
+"""
+import os
+import gzip
+import random
+import tempfile
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import numpy as np
+
+__all__ = [
+    'save_snapshot',
+    'load_snapshot'
+          ]
+
+
+def save_snapshot(path, model, strategy, event):
+    """Save the state of caches, strategy and random number generators and
+    the first measured event to a file.
+
+    The file is written atomically, so that processes running experiments in
+    parallel never read a partially written snapshot.
+
+    Parameters
+    ----------
+    path : str
+        The path of the snapshot file
+    model : NetworkModel
+        The network model whose caches are saved
+    strategy : Strategy
+        The strategy whose state is saved
+    event : tuple
+        The first measured (time, event) tuple of the workload
+    """
+    snapshot = {'cache': model.cache,
+                'local_cache': model.local_cache,
+                'content_caches': model.content_caches,
+                'freq_epoch': model.freq_epoch,
+                'cache_epoch': model.cache_epoch,
+                'lazy_freq': model.lazy_freq,
+                'strategy': strategy.get_state(),
+                'random': random.getstate(),
+                'np_random': np.random.get_state(),
+                'event': event}
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            with gzip.GzipFile(fileobj=f, mode='wb') as gz:
+                pickle.dump(snapshot, gz, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def load_snapshot(path, model, strategy):
+    """Restore the state of caches, strategy and random number generators
+    from a file and return the first measured event.
+
+    Parameters
+    ----------
+    path : str
+        The path of the snapshot file
+    model : NetworkModel
+        The network model whose caches are restored
+    strategy : Strategy
+        The strategy whose state is restored
+
+    Returns
+    -------
+    event : tuple
+        The first measured (time, event) tuple of the workload
+
+    Raises
+    ------
+    ValueError
+        If the caches of the snapshot do not match those of the model
+    """
+    with gzip.open(path, 'rb') as f:
+        snapshot = pickle.load(f)
+    cache = snapshot['cache']
+    if set(cache) != set(model.cache) or \
+            any(cache[v].maxlen != model.cache[v].maxlen for v in cache):
+        raise ValueError('The caches of the snapshot %s do not match those '
+                         'of the network model' % path)
+    model.cache.clear()
+    model.cache.update(cache)
+    model.local_cache.clear()
+    model.local_cache.update(snapshot['local_cache'])
+    model.content_caches = snapshot['content_caches']
+    model.freq_epoch = snapshot['freq_epoch']
+    model.cache_epoch = snapshot['cache_epoch']
+    model.lazy_freq = snapshot['lazy_freq']
+    strategy.set_state(snapshot['strategy'])
+    random.setstate(snapshot['random'])
+    np.random.set_state(snapshot['np_random'])
+    return snapshot['event']
@@ -4,6 +4,23 @@ import unittest
 import icarus.execution as collectors
 
 
+def session(timestamp, receiver, content, request_hops=(), content_hops=(),
+            request_main_path=None, content_main_path=None, cache_hits=(),
+            cache_misses=(), server_hits=(), success=True):
+    """Build the summary of a session as reported by the controller"""
+    if request_main_path is None:
+        request_main_path = [True] * len(request_hops)
+    if content_main_path is None:
+        content_main_path = [True] * len(content_hops)
+    return dict(timestamp=timestamp, receiver=receiver, content=content,
+                log=True, request_hops=list(request_hops),
+                request_main_path=request_main_path,
+                content_hops=list(content_hops),
+                content_main_path=content_main_path,
+                cache_hits=list(cache_hits), cache_misses=list(cache_misses),
+                server_hits=list(server_hits), success=success)
+
+
 class TestLinkLoadCollector(unittest.TestCase):
 
     def test_internal_external_custom_size(self):
@@ -103,6 +120,51 @@ class TestLinkLoadCollector(unittest.TestCase):
         self.assertEqual(0, mean_ext)
         self.assertEqual(0, len(ext_load))
 
+    def test_report_session(self):
+
+        req_size = 500
+        cont_size = 700
+
+        link_type = {(1, 2): 'internal', (2, 3): 'external',
+                     (2, 1): 'internal', (3, 2): 'external'}
+
+        view = type('MockNetworkView', (), {'link_type': lambda s, u, v: link_type[(u, v)]})()
+
+        c = collectors.LinkLoadCollector(view, req_size=req_size, content_size=cont_size)
+
+        c.report_session(session(3.0, 1, 4, [(1, 2)], [(2, 1)]))
+        c.report_session(session(5.0, 1, 4, [(1, 2), (2, 3)], [(3, 2), (2, 1)]))
+
+        res = c.results()
+        int_load = res['PER_LINK_INTERNAL']
+        ext_load = res['PER_LINK_EXTERNAL']
+        self.assertEqual(2 * req_size / 2, int_load[(1, 2)])
+        self.assertEqual(2 * cont_size / 2, int_load[(2, 1)])
+        self.assertEqual(req_size / 2, ext_load[(2, 3)])
+        self.assertEqual(cont_size / 2, ext_load[(3, 2)])
+
+    def test_merge(self):
+
+        link_type = {(1, 2): 'internal', (2, 3): 'external',
+                     (2, 1): 'internal', (3, 2): 'external'}
+
+        view = type('MockNetworkView', (), {'link_type': lambda s, u, v: link_type[(u, v)]})()
+
+        c = collectors.LinkLoadCollector(view)
+        c.report_session(session(5.0, 1, 4, [(1, 2), (2, 3)], [(3, 2), (2, 1)]))
+        other = collectors.LinkLoadCollector(view)
+        other.report_session(session(3.0, 1, 4, [(1, 2)], [(2, 1)]))
+        other.report_session(session(7.0, 1, 4, [(1, 2)], [(2, 1)]))
+        c.merge(other)
+        c.merge(collectors.LinkLoadCollector(view))
+
+        res = c.results()
+        int_load = res['PER_LINK_INTERNAL']
+        ext_load = res['PER_LINK_EXTERNAL']
+        self.assertEqual(3 * 150 / 4, int_load[(1, 2)])
+        self.assertEqual(3 * 1500 / 4, int_load[(2, 1)])
+        self.assertEqual(150 / 4, ext_load[(2, 3)])
+
 
 class TestLatencyCollector(unittest.TestCase):
 
@@ -154,6 +216,44 @@ class TestLatencyCollector(unittest.TestCase):
         res = c.results()
         self.assertEqual((10 + 20 + 2 * (2 + 4)) / 2, res['MEAN'])
 
+    def test_report_session(self):
+
+        link_delay = {(1, 2): 2, (2, 3): 10,
+                      (2, 1): 4, (3, 2): 20}
+        view = type('MockNetworkView', (), {'link_delay': lambda s, u, v: link_delay[(u, v)]})()
+
+        c = collectors.LatencyCollector(view)
+
+        c.report_session(session(3.0, 1, 'CONTENT', [(1, 2)], [(2, 1)]))
+        c.report_session(session(5.0, 1, 'CONTENT',
+                                 [(1, 2), (2, 3), (2, 1)], [(3, 2), (2, 1), (2, 3)],
+                                 request_main_path=[True, True, False],
+                                 content_main_path=[True, True, False]))
+        c.report_session(session(7.0, 1, 'CONTENT', [(1, 2)], [], success=False))
+
+        res = c.results()
+        self.assertEqual((10 + 20 + 2 * (2 + 4)) / 3, res['MEAN'])
+
+    def test_merge(self):
+
+        link_delay = {(1, 2): 2, (2, 3): 10,
+                      (2, 1): 4, (3, 2): 20}
+        view = type('MockNetworkView', (), {'link_delay': lambda s, u, v: link_delay[(u, v)]})()
+
+        c = collectors.LatencyCollector(view, cdf=True)
+        c.report_session(session(3.0, 1, 'CONTENT', [(1, 2)], [(2, 1)]))
+        other = collectors.LatencyCollector(view, cdf=True)
+        other.report_session(session(5.0, 1, 'CONTENT', [(1, 2), (2, 3)],
+                                     [(3, 2), (2, 1)]))
+        other.report_session(session(7.0, 1, 'CONTENT', [(1, 2)], [], success=False))
+        c.merge(other)
+
+        res = c.results()
+        self.assertEqual((10 + 20 + 2 * (2 + 4)) / 3, res['MEAN'])
+        x, cdf = res['CDF']
+        self.assertEqual([6, 36], list(x))
+        self.assertEqual([0.5, 1], list(cdf))
+
 
 class TestCacheHitRatioCollector(unittest.TestCase):
 
@@ -236,3 +336,140 @@ class TestCacheHitRatioCollector(unittest.TestCase):
 
         res = c.results()
         self.assertEqual({1: 0.5, 2: 0.25}, res['PER_CONTENT'])
+
+    def test_report_session(self):
+
+        view = type('MockNetworkView', (), {})()
+
+        c = collectors.CacheHitRatioCollector(view, content_hits=True)
+
+        c.report_session(session(3.0, 'RECV', 1, cache_hits=[1]))
+        c.report_session(session(4.0, 'RECV', 1, server_hits=[2]))
+        c.report_session(session(5.0, 'RECV', 2, cache_misses=[1], server_hits=[2]))
+        c.report_session(session(6.0, 'RECV', 2, server_hits=[2]))
+
+        res = c.results()
+        self.assertEqual(0.25, res['MEAN'])
+        self.assertEqual({1: 0.5, 2: 0.0}, res['PER_CONTENT'])
+        self.assertEqual({1: 0.25}, res['PER_NODE_CACHE_HIT_RATIO'])
+        self.assertEqual({2: 0.75}, res['PER_NODE_SERVER_HIT_RATIO'])
+
+    def test_merge(self):
+
+        view = type('MockNetworkView', (), {})()
+
+        c = collectors.CacheHitRatioCollector(view, content_hits=True)
+        c.report_session(session(3.0, 'RECV', 1, cache_hits=[1]))
+        c.report_session(session(6.0, 'RECV', 2, server_hits=[2]))
+        other = collectors.CacheHitRatioCollector(view, content_hits=True)
+        other.report_session(session(4.0, 'RECV', 1, server_hits=[2]))
+        other.report_session(session(5.0, 'RECV', 2, cache_misses=[1], server_hits=[2]))
+        c.merge(other)
+
+        res = c.results()
+        self.assertEqual(0.25, res['MEAN'])
+        self.assertEqual({1: 0.5, 2: 0.0}, res['PER_CONTENT'])
+        self.assertEqual({1: 0.25}, res['PER_NODE_CACHE_HIT_RATIO'])
+        self.assertEqual({2: 0.75}, res['PER_NODE_SERVER_HIT_RATIO'])
+
+
+class TestPathStretchCollector(unittest.TestCase):
+
+    def setUp(self):
+        shortest_path = {(1, 3): [1, 2, 3], (3, 1): [3, 2, 1]}
+        self.view = type('MockNetworkView', (), {
+            'content_source': lambda s, content: 3,
+            'shortest_path': lambda s, u, v: shortest_path[(u, v)]})()
+
+    def test_base(self):
+        c = collectors.PathStretchCollector(self.view)
+
+        c.start_session(3.0, 1, 'CONTENT')
+        c.request_hop(1, 2)
+        c.request_hop(2, 3)
+        c.content_hop(3, 2)
+        c.content_hop(2, 1)
+        c.end_session()
+
+        c.start_session(5.0, 1, 'CONTENT')
+        c.request_hop(1, 4)
+        c.request_hop(4, 2)
+        c.request_hop(2, 3)
+        c.content_hop(3, 2)
+        c.content_hop(2, 1)
+        c.end_session()
+
+        res = c.results()
+        self.assertAlmostEqual((2 + 3) / 3 / 2, res['MEAN_REQUEST'])
+        self.assertAlmostEqual(2 / 3, res['MEAN_CONTENT'])
+        self.assertAlmostEqual((4 + 5) / 6 / 2, res['MEAN'])
+
+    def test_report_session(self):
+        c = collectors.PathStretchCollector(self.view)
+
+        c.report_session(session(3.0, 1, 'CONTENT', [(1, 2), (2, 3)], [(3, 2), (2, 1)]))
+        c.report_session(session(5.0, 1, 'CONTENT', [(1, 4), (4, 2), (2, 3)],
+                                 [(3, 2), (2, 1)]))
+
+        res = c.results()
+        self.assertAlmostEqual((2 + 3) / 3 / 2, res['MEAN_REQUEST'])
+        self.assertAlmostEqual(2 / 3, res['MEAN_CONTENT'])
+        self.assertAlmostEqual((4 + 5) / 6 / 2, res['MEAN'])
+
+    def test_merge(self):
+        c = collectors.PathStretchCollector(self.view, cdf=True)
+        c.report_session(session(3.0, 1, 'CONTENT', [(1, 2), (2, 3)], [(3, 2), (2, 1)]))
+        other = collectors.PathStretchCollector(self.view, cdf=True)
+        other.report_session(session(5.0, 1, 'CONTENT', [(1, 4), (4, 2), (2, 3)],
+                                     [(3, 2), (2, 1)]))
+        c.merge(other)
+
+        res = c.results()
+        self.assertAlmostEqual((2 + 3) / 3 / 2, res['MEAN_REQUEST'])
+        self.assertAlmostEqual(2 / 3, res['MEAN_CONTENT'])
+        self.assertAlmostEqual((4 + 5) / 6 / 2, res['MEAN'])
+        self.assertEqual(2, len(res['CDF'][0]))
+
+
+class TestCollectorProxy(unittest.TestCase):
+
+    def test_dispatch(self):
+        view = type('MockNetworkView', (), {'link_delay': lambda s, u, v: 1})()
+        latency = collectors.LatencyCollector(view)
+        test = collectors.TestCollector(view)
+        proxy = collectors.CollectorProxy(view, [latency, test])
+        self.assertTrue(proxy.handles('report_session'))
+        self.assertTrue(proxy.handles('request_hop'))
+        self.assertEqual([test], proxy.collectors['request_hop'])
+        self.assertEqual([test], proxy.collectors['start_session'])
+        self.assertEqual([latency], proxy.collectors['report_session'])
+        self.assertFalse(collectors.LatencyCollector(view).handles('request_hop'))
+        self.assertTrue(collectors.LatencyCollector(view).handles('report_session'))
+        self.assertFalse(collectors.TestCollector(view).handles('report_session'))
+
+    def test_handlers(self):
+        view = type('MockNetworkView', (), {'link_delay': lambda s, u, v: 1})()
+        test_1 = collectors.TestCollector(view)
+        test_2 = collectors.TestCollector(view)
+        latency = collectors.LatencyCollector(view)
+        hits = []
+        hit_collector = type('HitCollector', (collectors.DataCollector,),
+                             {'cache_hit': lambda s, node: hits.append(node)})(view)
+        proxy = collectors.CollectorProxy(view, [test_1, test_2, hit_collector])
+        self.assertEqual([], proxy.handlers['report_session'])
+        self.assertEqual(2, len(proxy.handlers['request_hop']))
+        self.assertEqual(3, len(proxy.handlers['cache_hit']))
+        self.assertFalse(proxy.handles('report_session'))
+        proxy.start_session(1.0, 1, 'CONTENT')
+        proxy.request_hop(1, 2)
+        proxy.cache_hit(2)
+        proxy.end_session()
+        for c in (test_1, test_2):
+            self.assertEqual([(1, 2)], c.session_summary()['request_hops'])
+            self.assertEqual(2, c.session_summary()['serving_node'])
+        self.assertEqual([2], hits)
+        # Events handled by a single collector are dispatched to it directly
+        proxy = collectors.CollectorProxy(view, [test_1, hit_collector, latency])
+        self.assertEqual(test_1.request_hop, proxy.request_hop)
+        self.assertEqual(latency.report_session, proxy.report_session)
+        self.assertNotEqual(test_1.cache_hit, proxy.cache_hit)
@@ -0,0 +1,144 @@
+from __future__ import division
+import unittest
+import os
+import random
+import shutil
+import tempfile
+
+import fnss
+
+from icarus.scenarios import IcnTopology
+from icarus.execution import exec_experiment, exec_sharded_experiment
+
+
+def build_topology(n_contents=20, cache_size=3):
+    # Topology sketch
+    #
+    # 0 ---- 1 ---- 2 ---- 3 ---- 4
+    #        |             |
+    #        |             |
+    #        5 -- 6 - 7 -- 8 -- 9
+    #
+    topology = IcnTopology()
+    topology.add_path([0, 1, 2, 3, 4])
+    topology.add_path([1, 5, 6, 7, 8, 3])
+    topology.add_edge(8, 9)
+    fnss.set_delays_constant(topology, 1, 'ms')
+    for u, v in topology.edges_iter():
+        topology.edge[u][v]['type'] = 'internal'
+    fnss.add_stack(topology, 4, 'source',
+                   {'contents': range(1, n_contents + 1)})
+    for v in (0, 9):
+        fnss.add_stack(topology, v, 'receiver', {})
+    for v in (1, 2, 3, 5, 6, 7, 8):
+        fnss.add_stack(topology, v, 'router', {'cache_size': cache_size})
+    return topology
+
+
+def build_workload(n_warmup, n_measured, n_contents=20):
+    rand = random.Random(0)
+    return [(t, {'receiver': rand.choice((0, 9)),
+                 'content': rand.randint(1, n_contents),
+                 'log': t >= n_warmup})
+            for t in range(n_warmup + n_measured)]
+
+
+def random_workload(n_warmup, n_measured, n_contents=20):
+    # Events are drawn from the global random number generator as they are
+    # generated, as in StationaryWorkload
+    for t in range(n_warmup + n_measured):
+        yield (t, {'receiver': random.choice((0, 9)),
+                   'content': random.randint(1, n_contents),
+                   'log': t >= n_warmup})
+
+
+class TestWarmupSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'snapshot.pkl.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_experiment(self, workload, strategy, warmup_snapshot=None,
+                       cache_policy={'name': 'LRU'}):
+        random.seed(1)
+        results = exec_experiment(build_topology(), workload, {},
+                                  strategy, cache_policy,
+                                  {'CACHE_HIT_RATIO': {}, 'LATENCY': {}},
+                                  warmup_snapshot)
+        return results.dict()
+
+    def test_save_restore(self):
+        workload = build_workload(300, 200)
+        measured = [(t, e) for t, e in workload if e['log']]
+        for strategy, cache_policy in [
+                ({'name': 'LCE'}, {'name': 'LRU'}),
+                ({'name': 'PROB_CACHE'}, {'name': 'LRU'}),
+                ({'name': 'RAND_BERNOULLI', 'p': 0.3}, {'name': 'LRU'}),
+                ({'name': 'LCE'}, {'name': 'SLRU'}),
+                ({'name': 'LCD'}, {'name': 'IN_CACHE_LFU'}),
+                ({'name': 'MUS', 'lazy_freq': False}, {'name': 'MUS'}),
+                ({'name': 'MUS', 'lazy_freq': True}, {'name': 'MUS'})]:
+            expected = self.run_experiment(workload, strategy,
+                                           cache_policy=cache_policy)
+            self.assertEqual(expected, self.run_experiment(
+                workload, strategy, self.path, cache_policy))
+            self.assertTrue(os.path.exists(self.path))
+            # Warmup requests are skipped when the snapshot is restored
+            self.assertEqual(expected, self.run_experiment(
+                measured, strategy, self.path, cache_policy))
+            os.remove(self.path)
+
+    def test_random_workload(self):
+        # Strategies drawing random numbers during the warmup must not change
+        # the first measured event generated by the workload
+        for strategy in ({'name': 'PROB_CACHE'},
+                         {'name': 'RAND_BERNOULLI', 'p': 0.3}):
+            expected = self.run_experiment(random_workload(300, 200), strategy)
+            for _ in range(2):
+                self.assertEqual(expected, self.run_experiment(
+                    random_workload(300, 200), strategy, self.path))
+            os.remove(self.path)
+
+    def test_mismatch(self):
+        workload = build_workload(10, 10)
+        self.run_experiment(workload, {'name': 'LCE'}, self.path)
+        topology = build_topology()
+        fnss.add_stack(topology, 2, 'router', {'cache_size': 5})
+        self.assertRaises(ValueError, exec_experiment, topology, workload, {},
+                          {'name': 'LCE'}, {'name': 'LRU'}, {}, self.path)
+
+
+class TestShardedExperiment(unittest.TestCase):
+
+    def test_sharded(self):
+        workload = build_workload(200, 300, 30)
+        collectors = {'CACHE_HIT_RATIO': {}, 'LINK_LOAD': {},
+                      'LATENCY': {'cdf': True}}
+        for strategy in ({'name': 'HR_SYMM'}, {'name': 'HR_MULTICAST'},
+                         {'name': 'HR_HYBRID_AM', 'max_stretch': 0.4}):
+            expected = exec_experiment(build_topology(30, 2), workload, {},
+                                       strategy, {'name': 'LRU'}, collectors)
+            for n_processes in (1, 3):
+                results = exec_sharded_experiment(build_topology(30, 2),
+                                                  workload, {}, strategy,
+                                                  {'name': 'LRU'}, collectors,
+                                                  n_processes)
+                self.assertEqual(expected['CACHE_HIT_RATIO'],
+                                 results['CACHE_HIT_RATIO'])
+                self.assertEqual(expected['LINK_LOAD'], results['LINK_LOAD'])
+                self.assertAlmostEqual(expected['LATENCY']['MEAN'],
+                                       results['LATENCY']['MEAN'])
+                self.assertEqual(list(expected['LATENCY']['CDF'][1]),
+                                 list(results['LATENCY']['CDF'][1]))
+
+    def test_not_sharded(self):
+        workload = build_workload(10, 10, 30)
+        for strategy in ({'name': 'LCE'},
+                         {'name': 'HR_EDGE_CACHE', 'routing': 'SYMM',
+                          'edge_cache_ratio': 0.5}):
+            self.assertRaises(ValueError, exec_sharded_experiment,
+                              build_topology(30, 2), workload, {}, strategy,
+                              {'name': 'LRU'}, {'CACHE_HIT_RATIO': {}}, 2)
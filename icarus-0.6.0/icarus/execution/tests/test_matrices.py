@@ -0,0 +1,36 @@
+from __future__ import division
+import unittest
+
+import networkx as nx
+import fnss
+
+import icarus.execution.matrices as matrices
+from icarus.execution.network import symmetrify_paths
+
+
+class TestPredecessorPaths(unittest.TestCase):
+
+    def test_paths(self):
+        topology = fnss.Topology()
+        topology.add_path([1, 2, 4, 5, 3, 6, 1])
+        topology.add_path([7, 8, 9])
+        topology.add_edge(10, 10)
+        expected = symmetrify_paths(nx.all_pairs_dijkstra_path(topology))
+        index = matrices.NodeIndex([9, 8, 7])
+        paths = matrices.PredecessorPaths(index, topology, maxlen=4)
+        self.assertEqual(expected, {u: dict(paths[u]) for u in paths})
+        self.assertEqual(list(paths[1][5]), list(reversed(paths[5][1])))
+        self.assertEqual(4, len(paths._hot))
+        self.assertRaises(KeyError, paths[1].__getitem__, 7)
+        self.assertEqual(0, len(paths.path(index.ids[1], index.ids[7])))
+        self.assertEqual({7, 8, 9}, set(paths[8]))
+
+    def test_new_node(self):
+        topology = fnss.Topology()
+        topology.add_path([1, 2, 3])
+        index = matrices.NodeIndex()
+        paths = matrices.PredecessorPaths(index, topology)
+        index.add(4)
+        self.assertRaises(KeyError, paths[1].__getitem__, 4)
+        self.assertEqual([3, 2, 1], paths[3][1])
+
@@ -20,8 +20,58 @@ class TestSymmetrifyPaths(unittest.TestCase):
         network.symmetrify_paths(path)
         self.assertEqual(list(path[1][5]), list(reversed(path[5][1])))
 
+class TestLazyPaths(unittest.TestCase):
+
+    def test_paths(self):
+        topology = fnss.Topology()
+        topology.add_path([1, 2, 4, 5, 3, 6, 1])
+        topology.add_path([7, 8, 9])
+        expected = network.symmetrify_paths(nx.all_pairs_dijkstra_path(topology))
+        paths = network.LazyPaths(topology)
+        self.assertEqual([1, 2, 4, 5], paths[1][5])
+        self.assertEqual([5, 4, 2, 1], paths[5][1])
+        self.assertEqual({5}, set(paths.trees))
+        self.assertRaises(KeyError, paths[1].__getitem__, 7)
+        self.assertRaises(KeyError, paths[1].__getitem__, 10)
+        self.assertEqual({7, 8, 9}, set(paths[7]))
+        self.assertEqual(expected, {u: dict(paths[u]) for u in paths})
+
+
+class TestShortestPathTrees(unittest.TestCase):
+
+    def test_repair(self):
+        topology = fnss.Topology(nx.connected_watts_strogatz_graph(20, 4, 0.3, seed=1))
+        for i, (u, v) in enumerate(topology.edges()):
+            topology.edge[u][v]['weight'] = 1 + i % 2
+        trees = network.ShortestPathTrees(topology)
+        for u, v in [(0, 1), (5, 6), (10, 11)]:
+            if topology.has_edge(u, v):
+                topology.remove_edge(u, v)
+                trees.repair(topology, [(u, v)], [])
+            else:
+                topology.add_edge(u, v)
+                trees.repair(topology, [], [(u, v)])
+            self.assertEqual(network.symmetrify_paths(nx.all_pairs_dijkstra_path(topology)),
+                             trees.paths)
+
+    def test_stale_trees(self):
+        pred = {1: {2: 1, 3: 2}, 3: {2: 3, 1: 2}}
+        dist = {1: {1: 0, 2: 1, 3: 2}, 3: {3: 0, 2: 1, 1: 2}}
+        stale = lambda removed, added: network.stale_trees(
+                    [1, 3], lambda r, v: pred[r].get(v),
+                    lambda r, v: dist[r].get(v, float('inf')), removed, added)
+        self.assertEqual({1, 3}, stale([(2, 3)], []))
+        self.assertEqual(set(), stale([(3, 4)], []))
+        self.assertEqual({1, 3}, stale([], [(1, 3, 2)]))
+        self.assertEqual(set(), stale([], [(1, 3, 3)]))
+        self.assertEqual({1, 3}, stale([], [(1, 4, 1)]))
+        self.assertEqual(set(), stale([], [(4, 5, 1)]))
+
+
 class TestNetworkMvc(unittest.TestCase):
 
+    predecessor_paths = False
+
     @classmethod
     def build_topology(cls):
         # Topology sketch
@@ -46,7 +96,8 @@ class TestNetworkMvc(unittest.TestCase):
 
     def setUp(self):
         self.topology = self.build_topology()
-        model = network.NetworkModel(self.topology, cache_policy={'name': 'FIFO'})
+        model = network.NetworkModel(self.topology, cache_policy={'name': 'FIFO'},
+                                     predecessor_paths=self.predecessor_paths)
         self.view = network.NetworkView(model)
         self.controller = network.NetworkController(model)
         self.collector = TestCollector(self.view)
@@ -93,3 +144,187 @@ class TestNetworkMvc(unittest.TestCase):
         self.controller.rewire_link(1, 8, 1, 5, recompute_paths=True)
         self.assertEqual([0, 1, 2, 3, 4], self.view.shortest_path(0, 4))
         self.assertEqual(1, self.topology.edge[2][3]['a'])
+
+    def test_apply_topology_changes(self):
+        all_pairs = lambda: network.symmetrify_paths(
+                                nx.all_pairs_dijkstra_path(self.topology))
+        self.controller.apply_topology_changes([('remove_link', 2, 3)])
+        self.assertEqual([0, 1, 5, 6, 7, 8, 3, 4], self.view.shortest_path(0, 4))
+        self.controller.apply_topology_changes([('restore_link', 2, 3),
+                                                ('remove_node', 7),
+                                                ('rewire_link', 1, 5, 5, 2)])
+        self.assertEqual([0, 1, 2, 3, 4], self.view.shortest_path(0, 4))
+        self.assertEqual(all_pairs(), {u: dict(paths) for u, paths in
+                                       self.view.all_pairs_shortest_paths().items()})
+        self.controller.apply_topology_changes([('restore_node', 7),
+                                                ('remove_link', 3, 4)])
+        self.assertEqual(all_pairs(), {u: dict(paths) for u, paths in
+                                       self.view.all_pairs_shortest_paths().items()})
+        self.assertRaises(ValueError, self.controller.apply_topology_changes,
+                          [('remove_cache', 1)])
+
+    def test_lazy_paths(self):
+        model = network.NetworkModel(self.topology, cache_policy={'name': 'FIFO'},
+                                     lazy_paths=True)
+        view = network.NetworkView(model)
+        controller = network.NetworkController(model)
+        self.assertEqual([0, 1, 2, 3, 4], view.shortest_path(0, 4))
+        self.assertEqual([4, 3, 2, 1, 0], view.shortest_path(4, 0))
+        self.assertEqual({4}, set(model.shortest_path.trees))
+        controller.remove_link(2, 3, recompute_paths=True)
+        self.assertEqual([0, 1, 5, 6, 7, 8, 3, 4], view.shortest_path(0, 4))
+
+    def test_distance(self):
+        self.assertEqual(4, self.view.distance(0, 4))
+        self.assertEqual({0}, set(self.view.model.distance))
+        self.controller.remove_link(2, 3, recompute_paths=True)
+        self.assertEqual(7, self.view.distance(0, 4))
+
+    def test_distances(self):
+        distances = self.view.distances(0)
+        self.assertEqual(4, distances[4])
+        self.assertIs(distances, self.view.distances(0))
+        self.assertEqual(distances[6], self.view.distance(0, 6))
+        self.controller.remove_link(1, 2, recompute_paths=True)
+        self.assertEqual(7, self.view.distances(0)[4])
+
+    def test_content_locations(self):
+        self.assertEqual({4}, self.view.content_locations(1))
+        self.controller.put_content(1, 1)
+        self.controller.put_content(2, 1)
+        self.controller.put_content(3, 2)
+        self.assertEqual({1, 2, 4}, self.view.content_locations(1))
+        self.assertEqual({3, 4}, self.view.content_locations(2))
+        # Caches have size 1, so inserting a content evicts the previous one
+        self.assertEqual(1, self.controller.put_content(2, 3))
+        self.assertEqual({1, 4}, self.view.content_locations(1))
+        self.assertEqual({2, 4}, self.view.content_locations(3))
+        self.controller.remove_content(1, 1)
+        self.assertEqual({4}, self.view.content_locations(1))
+        self.controller.remove_node(3, recompute_paths=False)
+        self.assertEqual({4}, self.view.content_locations(2))
+        self.controller.restore_node(3, recompute_paths=False)
+        self.assertEqual({3, 4}, self.view.content_locations(2))
+        self.controller.reserve_local_cache(0.5)
+        self.assertEqual({4}, self.view.content_locations(2))
+
+    def test_content_locations_rejected(self):
+        model = network.NetworkModel(self.topology, cache_policy={'name': 'NULL'})
+        controller = network.NetworkController(model)
+        controller.put_content(1, 1)
+        self.assertFalse(model.content_caches.get(1))
+        self.assertEqual({4}, network.NetworkView(model).content_locations(1))
+
+    def test_path_caches(self):
+        path_caches = self.view.path_caches(0, 4)
+        self.assertEqual([0, 1, 2, 3, 4], path_caches.path)
+        self.assertEqual((4, 3, 2, 1, 0), path_caches.reversed_path)
+        self.assertEqual((1, 2, 3), path_caches.caches)
+        self.assertEqual((1, 2, 3), path_caches.hops)
+        self.assertEqual((1, 2, 3), path_caches.capacity)
+        self.assertIs(path_caches, self.view.path_caches(0, 4))
+        path_caches = self.view.path_caches(4, 2)
+        self.assertEqual((3, 2), path_caches.caches)
+        self.assertEqual((1, 2), path_caches.hops)
+
+    def test_multicast_fork(self):
+        self.assertEqual((True, 2, 0), self.view.multicast_fork(4, 0, 2))
+        fork = self.view.multicast_fork(4, 0, 6)
+        self.assertEqual((False, 3, 3), fork)
+        self.assertEqual(3, fork.fork_node)
+        self.assertIs(fork, self.view.multicast_fork(4, 0, 6))
+        self.controller.remove_link(2, 3, recompute_paths=True)
+        self.assertEqual((True, 6, 0), self.view.multicast_fork(4, 0, 6))
+
+    def test_path_caches_remove_restore(self):
+        self.assertEqual((1, 2, 3), self.view.path_caches(0, 4).caches)
+        self.controller.remove_link(2, 3, recompute_paths=True)
+        path_caches = self.view.path_caches(0, 4)
+        self.assertEqual([0, 1, 5, 6, 7, 8, 3, 4], path_caches.path)
+        self.assertEqual((1, 5, 6, 7, 8, 3), path_caches.caches)
+        self.assertEqual((1, 2, 3, 4, 5, 6), path_caches.hops)
+        self.assertEqual((1, 2, 3, 4, 5, 6), path_caches.capacity)
+        self.controller.restore_link(2, 3, recompute_paths=True)
+        self.assertEqual((1, 2, 3), self.view.path_caches(0, 4).caches)
+        self.controller.remove_node(2, recompute_paths=False)
+        self.assertEqual((1, 3), self.view.path_caches(0, 4).caches)
+        self.assertEqual((1, 2), self.view.path_caches(0, 4).capacity)
+        self.controller.restore_node(2, recompute_paths=False)
+        self.assertEqual((1, 2, 3), self.view.path_caches(0, 4).caches)
+
+    def test_report_session(self):
+        sessions = []
+        collector = type('SummaryCollector', (TestCollector,),
+                         {'report_session': lambda s, session: sessions.append(session)})
+        self.controller.attach_collector(collector(self.view))
+        self.controller.start_session(1.0, 0, 2, log=True)
+        self.controller.forward_request_path(0, 2)
+        self.assertFalse(self.controller.get_content(2))
+        self.controller.forward_request_hop(2, 3)
+        self.controller.forward_request_hop(3, 4)
+        self.assertTrue(self.controller.get_content(4))
+        self.controller.forward_content_path(4, 0)
+        self.controller.forward_content_path(3, 8, main_path=False)
+        self.controller.end_session()
+        self.controller.start_session(2.0, 0, 2, log=False)
+        self.controller.forward_request_path(0, 4)
+        self.controller.end_session()
+        self.assertEqual(1, len(sessions))
+        session = sessions[0]
+        self.assertEqual([(0, 1), (1, 2), (2, 3), (3, 4)], session['request_hops'])
+        self.assertEqual([True] * 4, session['request_main_path'])
+        self.assertEqual([(4, 3), (3, 2), (2, 1), (1, 0), (3, 8)],
+                         session['content_hops'])
+        self.assertEqual([True] * 4 + [False], session['content_main_path'])
+        self.assertEqual([], session['cache_hits'])
+        self.assertEqual([2], session['cache_misses'])
+        self.assertEqual([4], session['server_hits'])
+        self.assertTrue(session['success'])
+        # The collector only receives the summary
+        self.assertFalse(hasattr(self.controller.collector, 'session'))
+
+    def test_unlogged_session(self):
+        def fail(*args, **kwargs):
+            raise AssertionError('Collector notified of unlogged session')
+        collector = type('FailCollector', (TestCollector,),
+                         dict((e, fail) for e in ('start_session', 'end_session',
+                                                  'request_hop', 'content_hop',
+                                                  'cache_hit', 'cache_miss',
+                                                  'server_hit')))
+        self.controller.attach_collector(collector(self.view))
+        self.controller.start_session(1.0, 0, 2, log=False)
+        self.controller.forward_request_path(0, 4)
+        self.assertFalse(self.controller.get_content(3))
+        self.assertTrue(self.controller.get_content(4))
+        self.controller.put_content(3)
+        self.controller.forward_content_path(4, 0)
+        self.controller.end_session()
+        self.assertTrue(self.view.cache_lookup(3, 2))
+
+
+class TestPredecessorPathsNetworkMvc(TestNetworkMvc):
+
+    predecessor_paths = True
+
+    def test_rewire_link(self):
+        # Paths of equal length are chosen as in a regular network model
+        self.controller.rewire_link(1, 5, 1, 8, recompute_paths=True)
+        model = network.NetworkModel(self.topology, cache_policy={'name': 'FIFO'})
+        self.assertEqual(model.shortest_path,
+                         {u: dict(paths) for u, paths in
+                          self.view.all_pairs_shortest_paths().items()})
+        self.assertEqual([0, 1, 8], self.view.shortest_path(0, 8))
+
+    def test_predecessor_paths(self):
+        paths = self.view.model.shortest_path
+        self.assertIsInstance(paths, network.PredecessorPaths)
+        labels, ids = paths.index.labels, paths.index.ids
+        self.assertEqual(sorted(self.topology.nodes()), sorted(labels))
+        self.assertEqual([0, 1, 2, 3, 4],
+                         [labels[x] for x in paths.path(ids[0], ids[4])])
+        self.assertEqual([4, 3, 2, 1, 0], self.view.shortest_path(4, 0))
+        self.assertEqual(set(self.topology.nodes()),
+                         set(self.view.all_pairs_shortest_paths()[0]))
+        self.controller.remove_link(2, 3, recompute_paths=True)
+        self.assertIs(paths, self.view.model.shortest_path)
+        self.assertEqual([0, 1, 5, 6, 7, 8, 3, 4], self.view.shortest_path(0, 4))
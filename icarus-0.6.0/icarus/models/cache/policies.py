@@ -4,7 +4,9 @@ This module contains the implementations of all the cache replacement policies
 provided by Icarus.
 """
 from __future__ import division
-from collections import deque, defaultdict
+from array import array
+from collections import deque
+import heapq
 import random
 import abc
 import copy
@@ -17,18 +19,24 @@ from icarus.registry import register_cache_policy
 
 __all__ = [
         'LinkedSet',
+        'LfuBucketList',
+        'IndexedHeap',
         'Cache',
         'NullCache',
         'BeladyMinCache',
         'LruCache',
+        'ArrayLruCache',
         'SegmentedLruCache',
         'InCacheLfuCache',
         'PerfectLfuCache',
         'FifoCache',
+        'ClockCache',
+        'ClockProCache',
         'MusCache',
         'ClimbCache',
         'RandEvictionCache',
         'insert_after_k_hits_cache',
+        'tinylfu_cache',
         'rand_insert_cache',
         'keyval_cache',
         'ttl_cache',
@@ -84,6 +92,18 @@ class LinkedSet(object):
             for i in iterable:
                 self.append_bottom(i)
 
+    def __getstate__(self):
+        """Return the state of the set to pickle, i.e. the list of its items.
+
+        Linked nodes are not pickled because pickling them would recurse
+        through the whole list.
+        """
+        return list(self)
+
+    def __setstate__(self, state):
+        """Restore the state of the set from the list of its items"""
+        self.__init__(state)
+
     def __len__(self):
         """Return the number of elements in the linked set
 
@@ -450,6 +470,641 @@ class LinkedSet(object):
         self._map.clear()
 
 
+class LfuBucketList(object):
+    """A set whose items are ordered by access frequency and stored in a
+    doubly-linked list of frequency buckets.
+
+    Each bucket groups all items with the same frequency and buckets are
+    linked in increasing order of frequency, so that the least frequently
+    used item is always found in the bucket at the head of the list.
+    Ties between items with the same frequency are broken by insertion order,
+    i.e. the item inserted first is considered the least frequently used.
+
+    This data structure is designed to implement LFU replacement policies.
+    Since items with the same frequency must be kept sorted by insertion
+    order, each bucket stores its items in a min-heap with lazy deletion.
+    Hence inserting an item, incrementing its frequency and popping the least
+    frequently used item have an amortized *O(log b)* cost, with b being the
+    size of the bucket involved.
+    """
+    class _Bucket(object):
+        """Class implementing a bucket of the frequency list"""
+
+        def __init__(self, freq, prev=None, next=None):
+            """Constructor
+
+            Parameters
+            ----------
+            freq : int
+                The frequency of all items stored in the bucket
+            prev : _Bucket, optional
+                The bucket with the closest lower frequency
+            next : _Bucket, optional
+                The bucket with the closest higher frequency
+            """
+            self.freq = freq
+            self.prev = prev
+            self.next = next
+            # Heap of (insertion order, item) tuples. It may contain stale
+            # entries of items that left the bucket. These are discarded
+            # lazily when they reach the top of the heap
+            self.heap = []
+            # Number of items currently in the bucket
+            self.count = 0
+
+    def __init__(self):
+        """Constructor"""
+        self._head = None
+        self._tail = None
+        # Map each item to a (bucket, insertion order) tuple
+        self._map = {}
+        self._t = 0
+
+    def __getstate__(self):
+        """Return the state of the set to pickle, i.e. the list of its items,
+        each with its frequency and insertion order.
+
+        Buckets are not pickled because pickling them would recurse through
+        the whole list of buckets.
+        """
+        return self._t, [(k, bucket.freq, t) for k, (bucket, t) in self._map.items()]
+
+    def __setstate__(self, state):
+        """Restore the state of the set from the list of its items"""
+        self.__init__()
+        self._t, items = state
+        bucket = None
+        for k, freq, t in sorted(items, key=lambda x: (x[1], x[2])):
+            if bucket is None or bucket.freq != freq:
+                bucket = self._Bucket(freq, prev=bucket)
+                if bucket.prev is None:
+                    self._head = bucket
+                else:
+                    bucket.prev.next = bucket
+                self._tail = bucket
+            # Entries are appended in increasing insertion order, hence the
+            # heap invariant holds
+            bucket.heap.append((t, k))
+            bucket.count += 1
+            self._map[k] = (bucket, t)
+
+    def __len__(self):
+        """Return the number of items in the set
+
+        Returns
+        -------
+        len : int
+            The length of the set
+        """
+        return len(self._map)
+
+    def __contains__(self, k):
+        """Return whether the set contains a given item
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to search
+
+        Returns
+        -------
+        contains : bool
+            *True* if the set contains the item, *False* otherwise
+        """
+        return k in self._map
+
+    def __iter__(self):
+        """Return an iterator over the set, from the most to the least
+        frequently used item.
+
+        This operation has a O(n*log(n)) time complexity, with n being the
+        size of the set.
+
+        Returns
+        -------
+        iter : iterator
+            An iterator over the set
+        """
+        bucket = self._tail
+        while bucket:
+            for t, k in sorted(self._live_entries(bucket), reverse=True):
+                yield k
+            bucket = bucket.prev
+
+    def _live_entries(self, bucket):
+        """Return the heap entries of a bucket which are not stale"""
+        return [(t, k) for t, k in bucket.heap
+                if k in self._map and self._map[k][0] is bucket
+                and self._map[k][1] == t]
+
+    def _unlink(self, bucket):
+        """Remove an empty bucket from the list"""
+        if bucket.prev is None:
+            self._head = bucket.next
+        else:
+            bucket.prev.next = bucket.next
+        if bucket.next is None:
+            self._tail = bucket.prev
+        else:
+            bucket.next.prev = bucket.prev
+
+    def _release(self, bucket):
+        """Account for an item having left a bucket, removing the bucket if
+        it is now empty or compacting its heap if it holds too many stale
+        entries"""
+        bucket.count -= 1
+        if bucket.count == 0:
+            self._unlink(bucket)
+        elif len(bucket.heap) > 2 * bucket.count + 8:
+            bucket.heap = self._live_entries(bucket)
+            heapq.heapify(bucket.heap)
+
+    @property
+    def bottom(self):
+        """Return the least frequently used item, without removing it
+
+        Returns
+        -------
+        bottom : any hashable type
+            The least frequently used item or *None* if the set is empty
+        """
+        if self._head is None:
+            return None
+        heap = self._head.heap
+        while True:
+            t, k = heap[0]
+            if k in self._map and self._map[k] == (self._head, t):
+                return k
+            heapq.heappop(heap)
+
+    def frequency(self, k):
+        """Return the frequency of an item
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item whose frequency is queried
+
+        Returns
+        -------
+        freq : int
+            The frequency of the item
+        """
+        if k not in self._map:
+            raise KeyError('Item %s not in the set' % str(k))
+        return self._map[k][0].freq
+
+    def add(self, k):
+        """Insert an item with frequency equal to 1
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to insert
+        """
+        if k in self._map:
+            raise KeyError('The item %s is already in the set' % str(k))
+        self._t += 1
+        bucket = self._head
+        if bucket is None or bucket.freq != 1:
+            bucket = self._Bucket(1, next=self._head)
+            if self._head is None:
+                self._tail = bucket
+            else:
+                self._head.prev = bucket
+            self._head = bucket
+        heapq.heappush(bucket.heap, (self._t, k))
+        bucket.count += 1
+        self._map[k] = (bucket, self._t)
+
+    def increment(self, k):
+        """Increment by one the frequency of an item, moving it to the next
+        frequency bucket
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item whose frequency is incremented
+        """
+        if k not in self._map:
+            raise KeyError('Item %s not in the set' % str(k))
+        bucket, t = self._map[k]
+        nxt = bucket.next
+        if nxt is None or nxt.freq != bucket.freq + 1:
+            nxt = self._Bucket(bucket.freq + 1, prev=bucket, next=bucket.next)
+            if bucket.next is None:
+                self._tail = nxt
+            else:
+                bucket.next.prev = nxt
+            bucket.next = nxt
+        heapq.heappush(nxt.heap, (t, k))
+        nxt.count += 1
+        self._map[k] = (nxt, t)
+        self._release(bucket)
+
+    def pop_bottom(self):
+        """Pop the least frequently used item
+
+        Returns
+        -------
+        bottom : any hashable type
+            The least frequently used item or *None* if the set is empty
+        """
+        k = self.bottom
+        if k is None:
+            return None
+        bucket, _ = self._map.pop(k)
+        heapq.heappop(bucket.heap)
+        self._release(bucket)
+        return k
+
+    def remove(self, k):
+        """Remove an item from the set
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to remove
+        """
+        if k not in self._map:
+            raise KeyError('Item %s not in the set' % str(k))
+        bucket, _ = self._map.pop(k)
+        self._release(bucket)
+
+    def clear(self):
+        """Empty the set"""
+        self._head = None
+        self._tail = None
+        self._map.clear()
+
+
+class IndexedHeap(object):
+    """A binary min-heap of items, each associated to a priority, which keeps
+    track of the position of each item in the heap.
+
+    This data structure is designed to implement cache replacement policies
+    evicting the item with the lowest value of an arbitrary utility function,
+    such as Perfect-LFU.
+
+    It provides O(1) time complexity for searching an item and retrieving the
+    item with the lowest priority and O(log n) time complexity for inserting
+    an item, removing any item and changing the priority of any item.
+    Priorities can be of any type supporting comparisons, e.g. tuples.
+    """
+
+    def __init__(self, iterable=[]):
+        """Constructor
+
+        Parameters
+        ----------
+        iterable : iterable type
+            An iterable of (item, priority) tuples to initialize the data
+            structure. It must contain only one instance of each item. The
+            heap is built in linear time.
+        """
+        # Heap-ordered lists of priorities and of the corresponding items
+        self._prio = []
+        self._items = []
+        # Map each item to its position in the heap
+        self._pos = {}
+        for k, priority in iterable:
+            if k in self._pos:
+                raise ValueError('The iterable parameter contains repeated '
+                                 'elements')
+            self._pos[k] = len(self._items)
+            self._items.append(k)
+            self._prio.append(priority)
+        for i in reversed(range(len(self._items) // 2)):
+            self._sift_down(i)
+
+    def __len__(self):
+        """Return the number of items in the heap
+
+        Returns
+        -------
+        len : int
+            The length of the heap
+        """
+        return len(self._items)
+
+    def __iter__(self):
+        """Return an iterator over the items of the heap, in no specific order
+
+        Returns
+        -------
+        iter : iterator
+            An iterator over the heap
+        """
+        return iter(self._items)
+
+    def __contains__(self, k):
+        """Return whether the heap contains a given item
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to search
+
+        Returns
+        -------
+        contains : bool
+            *True* if the heap contains the item, *False* otherwise
+        """
+        return k in self._pos
+
+    def _sift_up(self, i):
+        """Move the entry at position i up until the heap invariant holds"""
+        prio, items, pos = self._prio, self._items, self._pos
+        p, k = prio[i], items[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if not p < prio[parent]:
+                break
+            prio[i] = prio[parent]
+            items[i] = items[parent]
+            pos[items[i]] = i
+            i = parent
+        prio[i] = p
+        items[i] = k
+        pos[k] = i
+
+    def _sift_down(self, i):
+        """Move the entry at position i down until the heap invariant holds"""
+        prio, items, pos = self._prio, self._items, self._pos
+        n = len(items)
+        p, k = prio[i], items[i]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and prio[child + 1] < prio[child]:
+                child += 1
+            if not prio[child] < p:
+                break
+            prio[i] = prio[child]
+            items[i] = items[child]
+            pos[items[i]] = i
+            i = child
+        prio[i] = p
+        items[i] = k
+        pos[k] = i
+
+    @property
+    def top(self):
+        """Return the item with the lowest priority
+
+        Returns
+        -------
+        top : any hashable type
+            The item with the lowest priority or *None* if the heap is empty
+        """
+        return self._items[0] if self._items else None
+
+    def priority(self, k):
+        """Return the priority of an item
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item whose priority is queried
+
+        Returns
+        -------
+        priority : any comparable type
+            The priority of the item
+        """
+        if k not in self._pos:
+            raise KeyError('Item %s not in the heap' % str(k))
+        return self._prio[self._pos[k]]
+
+    def push(self, k, priority):
+        """Insert an item in the heap
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to insert
+        priority : any comparable type
+            The priority of the item
+        """
+        if k in self._pos:
+            raise KeyError('The item %s is already in the heap' % str(k))
+        self._prio.append(priority)
+        self._items.append(k)
+        self._sift_up(len(self._items) - 1)
+
+    def update(self, k, priority):
+        """Change the priority of an item already in the heap
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to update
+        priority : any comparable type
+            The new priority of the item
+        """
+        if k not in self._pos:
+            raise KeyError('Item %s not in the heap' % str(k))
+        i = self._pos[k]
+        old = self._prio[i]
+        self._prio[i] = priority
+        if priority < old:
+            self._sift_up(i)
+        else:
+            self._sift_down(i)
+
+    def pop(self):
+        """Pop the item with the lowest priority
+
+        Returns
+        -------
+        top : any hashable type
+            The item with the lowest priority or *None* if the heap is empty
+        """
+        if not self._items:
+            return None
+        return self.remove(self._items[0])
+
+    def remove(self, k):
+        """Remove an item from the heap
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to remove
+
+        Returns
+        -------
+        k : any hashable type
+            The removed item
+        """
+        if k not in self._pos:
+            raise KeyError('Item %s not in the heap' % str(k))
+        i = self._pos.pop(k)
+        last_prio = self._prio.pop()
+        last = self._items.pop()
+        if i < len(self._items):
+            old = self._prio[i]
+            self._prio[i] = last_prio
+            self._items[i] = last
+            if last_prio < old:
+                self._sift_up(i)
+            else:
+                self._sift_down(i)
+        return k
+
+    def clear(self):
+        """Empty the heap"""
+        del self._prio[:]
+        del self._items[:]
+        self._pos.clear()
+
+
+class _ArrayCounter(object):
+    """Dictionary-like store of (frequency, time) counters of items identified
+    by integers, backed by NumPy arrays indexed by item identifier.
+
+    An item is considered to be stored if its frequency is positive.
+    """
+
+    def __init__(self, size):
+        """Constructor
+
+        Parameters
+        ----------
+        size : int
+            The number of identifiers that can be stored, i.e. items must be
+            integers between 0 and size - 1
+        """
+        self._freq = np.zeros(size, dtype=np.int64)
+        self._t = np.zeros(size, dtype=np.int64)
+
+    def __contains__(self, k):
+        return self._freq[k] > 0
+
+    def __getitem__(self, k):
+        if self._freq[k] == 0:
+            raise KeyError(k)
+        return int(self._freq[k]), int(self._t[k])
+
+    def __setitem__(self, k, v):
+        self._freq[k], self._t[k] = v
+
+    def clear(self):
+        self._freq[:] = 0
+        self._t[:] = 0
+
+
+class _FrequencySketch(object):
+    """Approximate counter of item request frequencies in fixed memory, as
+    used by the TinyLFU admission policy.
+
+    The first request of an item in a sample is only recorded in a
+    *doorkeeper* Bloom filter, following requests are recorded in a
+    count-min sketch. After *sample_size* requests, all counters are halved
+    and the doorkeeper is reset, so that the estimates age over time.
+    """
+
+    def __init__(self, sample_size, width=None, depth=4, doorkeeper=True,
+                 seed=None):
+        """Constructor
+
+        Parameters
+        ----------
+        sample_size : int
+            The number of requests after which counters are halved
+        width : int, optional
+            The number of counters of each row of the count-min sketch,
+            rounded up to a power of 2. If not specified, it is equal to
+            *sample_size*
+        depth : int, optional
+            The number of rows of the count-min sketch, i.e. the number of
+            hash functions
+        doorkeeper : bool, optional
+            If *True*, use a doorkeeper Bloom filter
+        seed : any hashable type, optional
+            The seed used to generate the hash functions
+        """
+        if sample_size < 1:
+            raise ValueError('sample_size must be positive')
+        if depth < 1:
+            raise ValueError('depth must be positive')
+        width = sample_size if width is None else width
+        self._bits = max(int(np.ceil(np.log2(max(width, 2)))), 1)
+        self._width = 1 << self._bits
+        self._depth = depth
+        self._sample_size = sample_size
+        rand = random.Random(seed)
+        # Odd 64-bit multipliers of the multiply-shift hash functions
+        self._a = [rand.getrandbits(64) | 1 for _ in range(depth)]
+        self._counters = array('I', [0]) * (depth * self._width)
+        self._doorkeeper = bytearray(self._width) if doorkeeper else None
+        self._n = 0
+
+    def _index(self, k):
+        """Return the index of the counter of an item in each row"""
+        h = hash(k) & 0xFFFFFFFFFFFFFFFF
+        shift = 64 - self._bits
+        return [i * self._width + (((h * a) & 0xFFFFFFFFFFFFFFFF) >> shift)
+                for i, a in enumerate(self._a)]
+
+    def estimate(self, k):
+        """Return the estimated frequency of an item
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item
+
+        Returns
+        -------
+        freq : int
+            The estimated frequency
+        """
+        index = self._index(k)
+        freq = min(self._counters[i] for i in index)
+        if self._doorkeeper is not None:
+            width = self._width
+            if all(self._doorkeeper[i % width] for i in index):
+                freq += 1
+        return freq
+
+    def record(self, k):
+        """Record a request for an item
+
+        Parameters
+        ----------
+        k : any hashable type
+            The requested item
+        """
+        index = self._index(k)
+        doorkeeper = self._doorkeeper
+        if doorkeeper is not None:
+            width = self._width
+            if not all(doorkeeper[i % width] for i in index):
+                for i in index:
+                    doorkeeper[i % width] = 1
+                index = ()
+        if index:
+            counters = self._counters
+            freq = min(counters[i] for i in index)
+            # Conservative update: only increment the smallest counters
+            for i in index:
+                if counters[i] == freq:
+                    counters[i] = freq + 1
+        self._n += 1
+        if self._n >= self._sample_size:
+            self.reset()
+
+    def reset(self):
+        """Halve all counters and clear the doorkeeper"""
+        counters = np.frombuffer(self._counters, dtype=np.uint32)
+        counters >>= 1
+        if self._doorkeeper is not None:
+            self._doorkeeper[:] = bytearray(self._width)
+        self._n = 0
+
+
 class Cache(object):
     """Base implementation of a cache object"""
 
@@ -754,6 +1409,12 @@ class BeladyMinCache(Cache):
     This policy is not implementable in practice because it requires knowledge
     of future requests, however it is very useful as a theoretical performance
     upper bound.
+
+    The position of the next request of each item in the trace is computed
+    once, at construction time, and cached items are kept in an indexed heap
+    keyed by the position of their next request, so that the item to evict is
+    found in logarithmic time. This makes this policy usable on traces of
+    millions of requests.
     """
 
     @inheritdoc(Cache)
@@ -770,12 +1431,24 @@ class BeladyMinCache(Cache):
         self._maxlen = int(maxlen)
         if self._maxlen <= 0:
             raise ValueError('maxlen must be positive')
-        self._next = defaultdict(deque)
-        for i, k in enumerate(trace):
-            self._next[k].append(i)
-        for k in self._next.values():
-            k.append(np.infty)
-        self._cache = {}
+        trace = list(trace)
+        # Position in the trace used to represent that an item is not
+        # requested anymore
+        self._end = len(trace)
+        # Array mapping each position of the trace to the position of the
+        # following request for the same item
+        self._next = np.empty(self._end, dtype=np.int64)
+        # Dict mapping each item to the position of its next request, which
+        # at the end of this pass is the position of its first request
+        self._pos = {}
+        for i in range(self._end - 1, -1, -1):
+            k = trace[i]
+            self._next[i] = self._pos.get(k, self._end)
+            self._pos[k] = i
+        # Heap of cached items keyed by (-position of next request, insertion
+        # order), so that its top is the item requested next the latest
+        self._cache = IndexedHeap()
+        self._t = 0
 
     @inheritdoc(Cache)
     def __len__(self):
@@ -788,7 +1461,7 @@ class BeladyMinCache(Cache):
 
     @inheritdoc(Cache)
     def dump(self):
-        return set(self._cache.keys())
+        return set(self._cache)
 
     @inheritdoc(Cache)
     def has(self, k, *args, **kwargs):
@@ -796,26 +1469,51 @@ class BeladyMinCache(Cache):
 
     @inheritdoc(Cache)
     def get(self, k, *args, **kwargs):
-        self._next[k].popleft()
-        return k in self._cache
+        i = self._pos.get(k, self._end)
+        if i < self._end:
+            i = int(self._next[i])
+            self._pos[k] = i
+        if k in self._cache:
+            self._cache.update(k, (-i, self._cache.priority(k)[1]))
+            return True
+        return False
 
     def put(self, k, *args, **kwargs):
-        if len(self) < self.maxlen:
-            self._cache[k] = self._next[k]
+        """Insert an item in the cache if not already inserted.
+
+        If the cache is full, the item is inserted only if it is requested
+        again before the cached item requested next the latest, which is
+        evicted.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to be inserted
+
+        Returns
+        -------
+        evicted : any hashable type
+            The evicted object or *None* if no contents were evicted.
+        """
+        if k in self._cache:
             return None
-        next_cache = max(self._cache, key=lambda k: self._cache[k][0])
-        if self._next[k][0] < self._next[next_cache][0]:
-            self._cache.pop(next_cache)
-            self._cache[k] = self._next[k]
-            return next_cache
+        i = self._pos.get(k, self._end)
+        if len(self._cache) >= self._maxlen:
+            next_cache = self._cache.top
+            if i >= -self._cache.priority(next_cache)[0]:
+                return None
+            self._cache.pop()
         else:
-            return None
+            next_cache = None
+        self._t += 1
+        self._cache.push(k, (-i, self._t))
+        return next_cache
 
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
         if k not in self._cache:
             return False
-        self._cache.pop(k)
+        self._cache.remove(k)
         return True
 
     @inheritdoc(Cache)
@@ -882,15 +1580,157 @@ class LruCache(Cache):
 
     @inheritdoc(Cache)
     def has(self, k, *args, **kwargs):
-        return k in self._cache
+        return k in self._cache
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        # search content over the list
+        # if it has it push on top, otherwise return false
+        if k not in self._cache:
+            return False
+        self._cache.move_to_top(k)
+        return True
+
+    def put(self, k, *args, **kwargs):
+        """Insert an item in the cache if not already inserted.
+
+        If the element is already present in the cache, it will pushed to the
+        top of the cache.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to be inserted
+
+        Returns
+        -------
+        evicted : any hashable type
+            The evicted object or *None* if no contents were evicted.
+        """
+        # if content in cache, push it on top, no eviction
+        if k in self._cache:
+            self._cache.move_to_top(k)
+            return None
+        # if content not in cache append it on top
+        self._cache.append_top(k)
+        return self._cache.pop_bottom() if len(self._cache) > self._maxlen else None
+
+    @inheritdoc(Cache)
+    def remove(self, k, *args, **kwargs):
+        if k not in self._cache:
+            return False
+        self._cache.remove(k)
+        return True
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self._cache.clear()
+
+
+@register_cache_policy('ARRAY_LRU')
+class ArrayLruCache(Cache):
+    """Least Recently Used (LRU) cache eviction policy for contents identified
+    by integers.
+
+    This policy makes exactly the same eviction decisions of *LruCache* but,
+    instead of allocating a linked list node and a dictionary entry for each
+    cached item, it stores the links of the list in two arrays preallocated
+    at construction time and indexed by content identifier. Therefore, no
+    memory is allocated when items are inserted or moved.
+
+    It can only be used if contents are integers between 0 and *n_contents*,
+    as in the case of stationary workloads. Its memory footprint is 8 bytes
+    per content of the catalogue, regardless of the size of the cache.
+    """
+
+    def __init__(self, maxlen, n_contents, **kwargs):
+        """Constructor
+
+        Parameters
+        ----------
+        maxlen : int
+            The maximum number of items the cache can store
+        n_contents : int
+            The largest content identifier
+        """
+        self._maxlen = int(maxlen)
+        if self._maxlen <= 0:
+            raise ValueError('maxlen must be positive')
+        # The last entry of each array is a sentinel closing the circular
+        # list: its next item is the top of the cache and its previous item
+        # is the bottom. Items not in cache have both links set to -1
+        self._root = int(n_contents) + 1
+        self._next = array('i', [-1]) * (self._root + 1)
+        self._prev = array('i', [-1]) * (self._root + 1)
+        self._next[self._root] = self._prev[self._root] = self._root
+        self._len = 0
+
+    @inheritdoc(Cache)
+    def __len__(self):
+        return self._len
+
+    @property
+    @inheritdoc(Cache)
+    def maxlen(self):
+        return self._maxlen
+
+    @inheritdoc(Cache)
+    def dump(self):
+        dump = []
+        k = self._next[self._root]
+        while k != self._root:
+            dump.append(k)
+            k = self._next[k]
+        return dump
+
+    def position(self, k, *args, **kwargs):
+        """Return the current position of an item in the cache. Position *0*
+        refers to the head of cache (i.e. most recently used item), while
+        position *maxlen - 1* refers to the tail of the cache (i.e. the least
+        recently used item).
+
+        This method does not change the internal state of the cache.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item looked up in the cache
+
+        Returns
+        -------
+        position : int
+            The current position of the item in the cache
+        """
+        if not self.has(k):
+            raise ValueError('The item %s is not in the cache' % str(k))
+        return self.dump().index(k)
+
+    def _move_to_top(self, k):
+        """Unlink a cached item and link it again at the top of the cache"""
+        nxt, prev = self._next, self._prev
+        p = prev[k]
+        if p == self._root:
+            return
+        n = nxt[k]
+        nxt[p] = n
+        prev[n] = p
+        top = nxt[self._root]
+        nxt[k] = top
+        prev[k] = self._root
+        prev[top] = k
+        nxt[self._root] = k
+
+    @inheritdoc(Cache)
+    def has(self, k, *args, **kwargs):
+        # Identifiers out of range would index the sentinel or, if negative,
+        # the arrays from their end
+        return 0 <= k < self._root and self._next[k] >= 0
 
     @inheritdoc(Cache)
     def get(self, k, *args, **kwargs):
-        # search content over the list
-        # if it has it push on top, otherwise return false
-        if k not in self._cache:
+        if not 0 <= k < self._root or self._next[k] < 0:
             return False
-        self._cache.move_to_top(k)
+        self._move_to_top(k)
         return True
 
     def put(self, k, *args, **kwargs):
@@ -901,32 +1741,58 @@ class LruCache(Cache):
 
         Parameters
         ----------
-        k : any hashable type
+        k : int
             The item to be inserted
 
         Returns
         -------
-        evicted : any hashable type
+        evicted : int
             The evicted object or *None* if no contents were evicted.
+
+        Raises
+        ------
+        ValueError
+            If the item is not between 0 and *n_contents*
         """
-        # if content in cache, push it on top, no eviction
-        if k in self._cache:
-            self._cache.move_to_top(k)
+        nxt, prev, root = self._next, self._prev, self._root
+        if not 0 <= k < root:
+            raise ValueError('Content %s out of range' % str(k))
+        if nxt[k] >= 0:
+            self._move_to_top(k)
             return None
-        # if content not in cache append it on top
-        self._cache.append_top(k)
-        return self._cache.pop_bottom() if len(self._cache) > self._maxlen else None
+        top = nxt[root]
+        nxt[k] = top
+        prev[k] = root
+        prev[top] = k
+        nxt[root] = k
+        if self._len < self._maxlen:
+            self._len += 1
+            return None
+        evicted = prev[root]
+        p = prev[evicted]
+        nxt[p] = root
+        prev[root] = p
+        nxt[evicted] = prev[evicted] = -1
+        return evicted
 
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
-        if k not in self._cache:
+        nxt, prev = self._next, self._prev
+        if not 0 <= k < self._root or nxt[k] < 0:
             return False
-        self._cache.remove(k)
+        n, p = nxt[k], prev[k]
+        nxt[p] = n
+        prev[n] = p
+        nxt[k] = prev[k] = -1
+        self._len -= 1
         return True
 
     @inheritdoc(Cache)
     def clear(self):
-        self._cache.clear()
+        for k in self.dump():
+            self._next[k] = self._prev[k] = -1
+        self._next[self._root] = self._prev[self._root] = self._root
+        self._len = 0
 
 
 @register_cache_policy('SLRU')
@@ -944,7 +1810,34 @@ class SegmentedLruCache(Cache):
     This policy can be viewed as a sort of combination between an LRU and LFU
     replacement policies as it makes eviction decisions based both frequency
     and recency of item reference.
+
+    All segments are stored in a single doubly-linked list, in which the
+    items of each segment are delimited by a sentinel node. Each node records
+    the segment in which its item is located and each segment keeps its own
+    length counter, so that promotions, demotions and evictions are
+    performed in constant time, without any lookup in per-segment maps.
     """
+    class _Node(object):
+        """Class implementing a node of the list of cached items"""
+
+        def __init__(self, val, seg, up=None, down=None):
+            """Constructor
+
+            Parameters
+            ----------
+            val : any hashable type
+                The value stored by the node
+            seg : int
+                The segment in which the item is located
+            up : _Node, optional
+                The node above in the list
+            down : _Node, optional
+                The node below in the list
+            """
+            self.val = val
+            self.seg = seg
+            self.up = up
+            self.down = down
 
     def __init__(self, maxlen, segments=2, alloc=None, *args, **kwargs):
         """Constructor
@@ -972,14 +1865,71 @@ class SegmentedLruCache(Cache):
         else:
             alloc = [1 / segments for _ in range(segments)]
         self._segment_maxlen = apportionment(maxlen, alloc)
-        self._segment = [LinkedSet() for _ in range(segments)]
+        # Sentinel node i is located immediately above the top item of segment
+        # i. The last sentinel is located below the bottom item of the last
+        # segment
+        self._sentinel = [self._Node(None, i) for i in range(segments + 1)]
+        for up, down in zip(self._sentinel[:-1], self._sentinel[1:]):
+            up.down = down
+            down.up = up
+        # Number of items in each segment
+        self._segment_len = [0] * segments
         # This map is a dictionary mapping each item in the cache with the
-        # segment in which it is located. This is not strictly necessary to
-        # locate an item as we could have used the map in each segment.
-        # This design choice however speeds up processing at the cost of a
-        # moderate increase in memory footprint.
+        # node storing it, which in turn records the segment in which it is
+        # located
         self._cache = {}
 
+    def _unlink(self, n):
+        """Remove a node from the list
+
+        Parameters
+        ----------
+        n : _Node
+            The node to remove
+        """
+        n.up.down = n.down
+        n.down.up = n.up
+        self._segment_len[n.seg] -= 1
+
+    def _append_top(self, n, seg):
+        """Insert a node on top of a segment
+
+        Parameters
+        ----------
+        n : _Node
+            The node to insert
+        seg : int
+            The segment
+        """
+        s = self._sentinel[seg]
+        n.seg = seg
+        n.up = s
+        n.down = s.down
+        s.down.up = n
+        s.down = n
+        self._segment_len[seg] += 1
+
+    def _promote(self, n):
+        """Move a node to the top of the segment above its own, demoting the
+        bottom item of that segment if it overflows, or to the top of its own
+        segment if already in the top segment
+
+        Parameters
+        ----------
+        n : _Node
+            The node to promote
+        """
+        seg = n.seg
+        self._unlink(n)
+        if seg == 0:
+            self._append_top(n, 0)
+            return
+        self._append_top(n, seg - 1)
+        if self._segment_len[seg - 1] > self._segment_maxlen[seg - 1]:
+            demoted = self._sentinel[seg].up
+            self._unlink(demoted)
+            self._append_top(demoted, seg)
+
     @inheritdoc(Cache)
     def __len__(self):
         return len(self._cache)
@@ -997,17 +1947,7 @@ class SegmentedLruCache(Cache):
     def get(self, k, *args, **kwargs):
         if k not in self._cache:
             return False
-        seg = self._cache[k]
-        if seg == 0:
-            self._segment[seg].move_to_top(k)
-        else:
-            self._segment[seg].remove(k)
-            self._segment[seg - 1].append_top(k)
-            self._cache[k] = seg - 1
-            if len(self._segment[seg - 1]) > self._segment_maxlen[seg - 1]:
-                demoted = self._segment[seg - 1].pop_bottom()
-                self._segment[seg].append_top(demoted)
-                self._cache[demoted] = seg
+        self._promote(self._cache[k])
         return True
 
     def put(self, k, *args, **kwargs):
@@ -1028,33 +1968,25 @@ class SegmentedLruCache(Cache):
         """
         # if content in cache, promote it, no eviction
         if k in self._cache:
-            seg = self._cache[k]
-            if seg == 0:
-                self._segment[seg].move_to_top(k)
-            else:
-                self._segment[seg].remove(k)
-                self._segment[seg - 1].append_top(k)
-                self._cache[k] = seg - 1
-                if len(self._segment[seg - 1]) > self._segment_maxlen[seg - 1]:
-                    demoted = self._segment[seg - 1].pop_bottom()
-                    self._segment[seg].append_top(demoted)
-                    self._cache[demoted] = seg
+            self._promote(self._cache[k])
             return None
         # if content not in cache append on top of probatory segment and
         # possibly evict LRU item
-        self._segment[-1].append_top(k)
-        self._cache[k] = len(self._segment) - 1
-        if len(self._segment[-1]) > self._segment_maxlen[-1]:
-            evicted = self._segment[-1].pop_bottom()
-            self._cache.pop(evicted)
-            return evicted
+        last = len(self._segment_len) - 1
+        n = self._Node(k, last)
+        self._append_top(n, last)
+        self._cache[k] = n
+        if self._segment_len[last] > self._segment_maxlen[last]:
+            evicted = self._sentinel[-1].up
+            self._unlink(evicted)
+            self._cache.pop(evicted.val)
+            return evicted.val
 
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
         if k not in self._cache:
             return False
-        seg = self._cache.pop(k)
-        self._segment[seg].remove(k)
+        self._unlink(self._cache.pop(k))
         return True
 
     def position(self, k, *args, **kwargs):
@@ -1063,7 +1995,8 @@ class SegmentedLruCache(Cache):
         position *maxlen - 1* refers to the tail of the cache (i.e. the least
         recently used item).
 
-        This method does not change the internal state of the cache.
+        This method does not change the internal state of the cache. Its cost
+        is linear in the position of the item within its segment.
 
         Parameters
         ----------
@@ -1077,20 +2010,53 @@ class SegmentedLruCache(Cache):
         """
         if not k in self._cache:
             raise ValueError('The item %s is not in the cache' % str(k))
-        seg = self._cache[k]
-        position = self._segment[seg].index(k)
-        return sum(len(self._segment[i]) for i in range(seg)) + position
+        n = self._cache[k]
+        position = sum(self._segment_len[:n.seg])
+        curr = self._sentinel[n.seg].down
+        while curr is not n:
+            curr = curr.down
+            position += 1
+        return position
+
+    def __getstate__(self):
+        """Return the state of the cache to pickle, storing the items of each
+        segment as a list, since pickling linked nodes would recurse through
+        the whole list"""
+        return self._maxlen, self._segment_maxlen, self.dump(serialized=False)
+
+    def __setstate__(self, state):
+        """Restore the state of the cache from the items of each segment"""
+        self._maxlen, self._segment_maxlen, segments = state
+        self._sentinel = [self._Node(None, i) for i in range(len(segments) + 1)]
+        self._segment_len = [0] * len(segments)
+        self._cache = {}
+        self.clear()
+        for seg, items in enumerate(segments):
+            for k in reversed(items):
+                n = self._Node(k, seg)
+                self._append_top(n, seg)
+                self._cache[k] = n
 
     @inheritdoc(Cache)
     def dump(self, serialized=True):
-        dump = list(list(iter(s)) for s in self._segment)
+        dump = []
+        for seg in range(len(self._segment_len)):
+            segment = []
+            curr = self._sentinel[seg].down
+            end = self._sentinel[seg + 1]
+            while curr is not end:
+                segment.append(curr.val)
+                curr = curr.down
+            dump.append(segment)
         return sum(dump, []) if serialized else dump
 
     @inheritdoc(Cache)
     def clear(self):
         self._cache.clear()
-        for s in self._segment:
-            s.clear()
+        for up, down in zip(self._sentinel[:-1], self._sentinel[1:]):
+            up.down = down
+            down.up = up
+        self._segment_len = [0] * len(self._segment_len)
 
 
 @register_cache_policy('IN_CACHE_LFU')
@@ -1109,16 +2075,16 @@ class InCacheLfuCache(Cache):
     policy in which a counter is maintained also when the content is evicted.
 
     In-cache LFU performs better than LRU under IRM demands.
-    However, its implementation is computationally expensive since it
-    cannot be implemented in such a way that both search and replacement tasks
-    can be executed in constant time. This makes it particularly unfit for
-    large caches and line speed operations.
+    Differently from a naive implementation scanning all cached items upon
+    each eviction, this implementation stores items in a frequency-bucket list
+    so that the least frequently used item is located without scanning the
+    cache. If several items have the lowest frequency, the one among them
+    which was inserted first is evicted.
     """
 
     @inheritdoc(Cache)
     def __init__(self, maxlen, *args, **kwargs):
-        self._cache = {}
-        self.t = 0
+        self._cache = LfuBucketList()
         self._maxlen = int(maxlen)
         if self._maxlen <= 0:
             raise ValueError('maxlen must be positive')
@@ -1134,7 +2100,7 @@ class InCacheLfuCache(Cache):
 
     @inheritdoc(Cache)
     def dump(self):
-        return sorted(self._cache, key=lambda x: self._cache[x], reverse=True)
+        return list(iter(self._cache))
 
     @inheritdoc(Cache)
     def has(self, k, *args, **kwargs):
@@ -1143,8 +2109,7 @@ class InCacheLfuCache(Cache):
     @inheritdoc(Cache)
     def get(self, k, *args, **kwargs):
         if self.has(k):
-            freq, t = self._cache[k]
-            self._cache[k] = freq + 1, t
+            self._cache.increment(k)
             return True
         else:
             return False
@@ -1152,18 +2117,15 @@ class InCacheLfuCache(Cache):
     @inheritdoc(Cache)
     def put(self, k, *args, **kwargs):
         if not self.has(k):
-            self.t += 1
-            self._cache[k] = (1, self.t)
+            self._cache.add(k)
             if len(self._cache) > self._maxlen:
-                evicted = min(self._cache, key=lambda x: self._cache[x])
-                self._cache.pop(evicted)
-                return evicted
+                return self._cache.pop_bottom()
         return None
 
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
         if k in self._cache:
-            self._cache.pop(k)
+            self._cache.remove(k)
             return True
         else:
             return False
@@ -1191,15 +2153,34 @@ class PerfectLfuCache(Cache):
     IRM demands. However, its implementation is computationally expensive since
     it cannot be implemented in such a way that both search and replacement
     tasks can be executed in constant time. This makes it particularly unfit
-    for large caches and line speed operations.
+    for large caches and line speed operations. In this implementation, cached
+    items are stored in an indexed heap keyed by their counters, so that
+    replacement is executed in logarithmic time.
+
+    Since counters are kept for all items ever requested, their memory
+    footprint grows with the size of the content catalogue. If contents are
+    identified by integers, as in the case of stationary workloads, the
+    *n_contents* parameter can be used to store counters in preallocated
+    arrays instead of a dictionary, which is considerably more compact.
     """
 
-    @inheritdoc(Cache)
-    def __init__(self, maxlen, *args, **kwargs):
-        # Dict storing counter for all contents, not only those in cache
-        self._counter = {}
-        # Set storing only items currently in cache
-        self._cache = set()
+    def __init__(self, maxlen, n_contents=None, *args, **kwargs):
+        """Constructor
+
+        Parameters
+        ----------
+        maxlen : int
+            The maximum number of items the cache can store
+        n_contents : int, optional
+            If specified, contents must be integers between 0 and *n_contents*
+            and their counters are stored in arrays indexed by content
+            identifier instead of a dictionary
+        """
+        # Store counter for all contents, not only those in cache
+        self._counter = {} if n_contents is None \
+                        else _ArrayCounter(int(n_contents) + 1)
+        # Heap storing only items currently in cache, keyed by their counter
+        self._cache = IndexedHeap()
         self.t = 0
         self._maxlen = int(maxlen)
         if self._maxlen <= 0:
@@ -1228,12 +2209,12 @@ class PerfectLfuCache(Cache):
         if k in self._counter:
             freq, t = self._counter[k]
             self._counter[k] = freq + 1, t
+            if self.has(k):
+                self._cache.update(k, (freq + 1, t))
+                return True
         else:
             self._counter[k] = 1, self.t
-        if self.has(k):
-            return True
-        else:
-            return False
+        return False
 
     @inheritdoc(Cache)
     def put(self, k, *args, **kwargs):
@@ -1245,17 +2226,15 @@ class PerfectLfuCache(Cache):
                 # If I always call a get before a put, this line should never
                 # be executed
                 self._counter[k] = (1, self.t)
-            self._cache.add(k)
+            self._cache.push(k, self._counter[k])
             if len(self._cache) > self._maxlen:
-                evicted = min(self._cache, key=lambda x: self._counter[x])
-                self._cache.remove(evicted)
-                return evicted
+                return self._cache.pop()
         return None
 
     @inheritdoc(Cache)
     def remove(self, k, *args, **kwargs):
         if k in self._cache:
-            self._cache.pop(k)
+            self._cache.remove(k)
             return True
         else:
             return False
@@ -1358,6 +2337,373 @@ class FifoCache(Cache):
         self._d.clear()
 
 
+@register_cache_policy('CLOCK')
+class ClockCache(Cache):
+    """CLOCK cache eviction policy.
+
+    CLOCK is a low-overhead approximation of LRU. Items are stored in a
+    circular buffer of slots, each associated to a reference bit, which is set
+    whenever the item is requested. When an item is inserted in a full cache,
+    a hand sweeps the buffer clearing the reference bits it finds set, until
+    it finds an item whose reference bit is not set. This item is replaced by
+    the new one and the hand is moved to the next slot.
+
+    Slots and reference bits are stored in arrays preallocated at
+    construction time, so that a hit only costs setting a bit.
+    """
+
+    @inheritdoc(Cache)
+    def __init__(self, maxlen, *args, **kwargs):
+        self._maxlen = int(maxlen)
+        if self._maxlen <= 0:
+            raise ValueError('maxlen must be positive')
+        # Item stored in each slot, or None if the slot is free
+        self._key = [None] * self._maxlen
+        # Reference bit of each slot
+        self._ref = bytearray(self._maxlen)
+        # Map between items and the slots storing them
+        self._slot = {}
+        # Stack of free slots
+        self._free = list(range(self._maxlen - 1, -1, -1))
+        self._hand = 0
+
+    @inheritdoc(Cache)
+    def __len__(self):
+        return len(self._slot)
+
+    @property
+    @inheritdoc(Cache)
+    def maxlen(self):
+        return self._maxlen
+
+    @inheritdoc(Cache)
+    def dump(self):
+        # Slots are listed backwards from the hand, so that the last items
+        # are the first ones inspected upon the next eviction
+        n = self._maxlen
+        slots = ((self._hand - i) % n for i in range(1, n + 1))
+        return [self._key[i] for i in slots if self._key[i] is not None]
+
+    @inheritdoc(Cache)
+    def has(self, k, *args, **kwargs):
+        return k in self._slot
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        if k not in self._slot:
+            return False
+        self._ref[self._slot[k]] = 1
+        return True
+
+    def put(self, k, *args, **kwargs):
+        """Insert an item in the cache if not already inserted.
+
+        If the element is already present in the cache, its reference bit is
+        set.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to be inserted
+
+        Returns
+        -------
+        evicted : any hashable type
+            The evicted object or *None* if no contents were evicted.
+        """
+        if k in self._slot:
+            self._ref[self._slot[k]] = 1
+            return None
+        if self._free:
+            i = self._free.pop()
+            self._key[i] = k
+            self._slot[k] = i
+            return None
+        ref = self._ref
+        hand = self._hand
+        while ref[hand]:
+            ref[hand] = 0
+            hand = hand + 1 if hand < self._maxlen - 1 else 0
+        evicted = self._key[hand]
+        del self._slot[evicted]
+        self._key[hand] = k
+        self._slot[k] = hand
+        self._hand = hand + 1 if hand < self._maxlen - 1 else 0
+        return evicted
+
+    @inheritdoc(Cache)
+    def remove(self, k, *args, **kwargs):
+        if k not in self._slot:
+            return False
+        i = self._slot.pop(k)
+        self._key[i] = None
+        self._ref[i] = 0
+        self._free.append(i)
+        return True
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self._key = [None] * self._maxlen
+        self._ref = bytearray(self._maxlen)
+        self._slot.clear()
+        self._free = list(range(self._maxlen - 1, -1, -1))
+        self._hand = 0
+
+
+@register_cache_policy('CLOCK_PRO')
+class ClockProCache(Cache):
+    """CLOCK-Pro cache eviction policy.
+
+    CLOCK-Pro [1]_ improves CLOCK by distinguishing *hot* items, requested
+    frequently, from *cold* items. Cold items are admitted to the cache on
+    a test period, during which their metadata is kept even after they are
+    evicted (*non-resident* items). A cold item requested during its test
+    period becomes hot. Resident and non-resident items share a circular
+    list scanned by three hands: the cold hand evicts unreferenced cold
+    items, the hot hand demotes unreferenced hot items to cold and the test
+    hand terminates the test period of non-resident items. The number of
+    resident cold items is adapted to the workload, growing when
+    non-resident items are requested and shrinking when their test period
+    expires. This implementation follows the widely used formulation in
+    which all resident cold items are in their test period. Differently from
+    the original proposal, hands do not push each other forward when they
+    meet, so that each hand is only run when needed and each insertion
+    evicts at most one item.
+
+    The circular list is stored in arrays of *2 maxlen* slots preallocated at
+    construction time, which is the maximum number of resident and
+    non-resident items tracked. A hit only costs setting the reference bit of
+    the item.
+
+    References
+    ----------
+    .. [1] S. Jiang, F. Chen, X. Zhang, CLOCK-Pro: an effective improvement
+           of the CLOCK replacement, in Proc. of USENIX ATC'05
+    """
+    # Status of a slot
+    _FREE, _HOT, _COLD, _TEST = range(4)
+
+    @inheritdoc(Cache)
+    def __init__(self, maxlen, *args, **kwargs):
+        self._maxlen = int(maxlen)
+        if self._maxlen <= 0:
+            raise ValueError('maxlen must be positive')
+        size = 2 * self._maxlen
+        # Item stored in each slot
+        self._key = [None] * size
+        # Status and reference bit of each slot
+        self._status = bytearray(size)
+        self._ref = bytearray(size)
+        # Links of the circular list
+        self._next = array('i', [-1]) * size
+        self._prev = array('i', [-1]) * size
+        # Map between resident and non-resident items and their slots
+        self._slot = {}
+        # Stack of free slots
+        self._free = list(range(size - 1, -1, -1))
+        # Hands are set to -1 when the list is empty
+        self._hand_hot = self._hand_cold = self._hand_test = -1
+        self._n_hot = self._n_cold = self._n_test = 0
+        # Target number of resident cold items
+        self._cold_target = self._maxlen
+        # Item evicted during the current insertion
+        self._evicted = None
+
+    @inheritdoc(Cache)
+    def __len__(self):
+        return self._n_hot + self._n_cold
+
+    @property
+    @inheritdoc(Cache)
+    def maxlen(self):
+        return self._maxlen
+
+    @inheritdoc(Cache)
+    def dump(self):
+        # Items are listed in the order of the circular list, starting from
+        # the hot hand
+        dump = []
+        if self._hand_hot < 0:
+            return dump
+        i = self._hand_hot
+        while True:
+            if self._status[i] in (self._HOT, self._COLD):
+                dump.append(self._key[i])
+            i = self._next[i]
+            if i == self._hand_hot:
+                return dump
+
+    def _resident(self, k):
+        """Return the slot of an item if it is resident, otherwise -1"""
+        i = self._slot.get(k, -1)
+        return i if i >= 0 and self._status[i] != self._TEST else -1
+
+    @inheritdoc(Cache)
+    def has(self, k, *args, **kwargs):
+        return self._resident(k) >= 0
+
+    @inheritdoc(Cache)
+    def get(self, k, *args, **kwargs):
+        i = self._resident(k)
+        if i < 0:
+            return False
+        self._ref[i] = 1
+        return True
+
+    def _add(self, k, status):
+        """Make room for an item and insert it in the list right behind the
+        hot hand
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to insert
+        status : int
+            The status of the item, either hot or cold
+        """
+        while self._n_hot + self._n_cold >= self._maxlen:
+            self._run_hand_cold()
+        i = self._free.pop()
+        self._key[i] = k
+        self._status[i] = status
+        self._ref[i] = 0
+        self._slot[k] = i
+        nxt, prev = self._next, self._prev
+        if self._hand_hot < 0:
+            nxt[i] = prev[i] = i
+            self._hand_hot = self._hand_cold = self._hand_test = i
+        else:
+            h = self._hand_hot
+            p = prev[h]
+            nxt[p] = i
+            prev[i] = p
+            nxt[i] = h
+            prev[h] = i
+
+    def _delete(self, i):
+        """Remove a slot from the list, moving back the hands pointing to it
+
+        Parameters
+        ----------
+        i : int
+            The slot to remove
+        """
+        del self._slot[self._key[i]]
+        self._key[i] = None
+        self._status[i] = self._FREE
+        self._ref[i] = 0
+        nxt, prev = self._next, self._prev
+        if nxt[i] == i:
+            self._hand_hot = self._hand_cold = self._hand_test = -1
+        else:
+            p, n = prev[i], nxt[i]
+            if self._hand_hot == i:
+                self._hand_hot = p
+            if self._hand_cold == i:
+                self._hand_cold = p
+            if self._hand_test == i:
+                self._hand_test = p
+            nxt[p] = n
+            prev[n] = p
+        nxt[i] = prev[i] = -1
+        self._free.append(i)
+
+    def _run_hand_cold(self):
+        """Inspect the item pointed by the cold hand, promoting it to hot if
+        referenced or evicting it otherwise, then advance the hand"""
+        i = self._hand_cold
+        if self._status[i] == self._COLD:
+            self._n_cold -= 1
+            if self._ref[i]:
+                self._status[i] = self._HOT
+                self._ref[i] = 0
+                self._n_hot += 1
+            else:
+                self._status[i] = self._TEST
+                self._n_test += 1
+                self._evicted = self._key[i]
+        self._hand_cold = self._next[self._hand_cold]
+        while self._n_test > self._maxlen:
+            self._run_hand_test()
+        while self._n_hot > self._maxlen - self._cold_target:
+            self._run_hand_hot()
+
+    def _run_hand_hot(self):
+        """Inspect the item pointed by the hot hand, demoting it to cold if
+        not referenced, then advance the hand"""
+        i = self._hand_hot
+        if self._status[i] == self._HOT:
+            if self._ref[i]:
+                self._ref[i] = 0
+            else:
+                self._status[i] = self._COLD
+                self._n_hot -= 1
+                self._n_cold += 1
+        self._hand_hot = self._next[self._hand_hot]
+
+    def _run_hand_test(self):
+        """Inspect the item pointed by the test hand, terminating its test
+        period if non-resident, then advance the hand"""
+        i = self._hand_test
+        if self._status[i] == self._TEST:
+            self._delete(i)
+            self._n_test -= 1
+            if self._cold_target > 1:
+                self._cold_target -= 1
+        self._hand_test = self._next[self._hand_test]
+
+    def put(self, k, *args, **kwargs):
+        """Insert an item in the cache if not already inserted.
+
+        If the element is already present in the cache, its reference bit is
+        set. If the item is non-resident but in its test period, it is
+        inserted as hot, otherwise it is inserted as cold.
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item to be inserted
+
+        Returns
+        -------
+        evicted : any hashable type
+            The evicted object or *None* if no contents were evicted.
+        """
+        i = self._slot.get(k, -1)
+        if i >= 0 and self._status[i] != self._TEST:
+            self._ref[i] = 1
+            return None
+        if i >= 0:
+            if self._cold_target < self._maxlen:
+                self._cold_target += 1
+            self._n_test -= 1
+            self._delete(i)
+            self._add(k, self._HOT)
+            self._n_hot += 1
+        else:
+            self._add(k, self._COLD)
+            self._n_cold += 1
+        evicted = self._evicted
+        self._evicted = None
+        return evicted
+
+    @inheritdoc(Cache)
+    def remove(self, k, *args, **kwargs):
+        i = self._resident(k)
+        if i < 0:
+            return False
+        if self._status[i] == self._HOT:
+            self._n_hot -= 1
+        else:
+            self._n_cold -= 1
+        self._delete(i)
+        return True
+
+    @inheritdoc(Cache)
+    def clear(self):
+        self.__init__(self._maxlen)
+
+
 @register_cache_policy('CLIMB')
 class ClimbCache(Cache):
     """CLIMB cache implementation
@@ -1539,13 +2885,30 @@ class RandEvictionCache(Cache):
 
 @register_cache_policy('MUS')
 class MusCache(Cache):
-    """Least Frequently Used (LFU) cache implementation
-    MUS
+    """Most Utilitarian Stay (MUS) cache implementation
+
+    This policy associates each item with a utility equal to the product of
+    its distance from the closest upstream copy, as last notified through
+    *update_dist*, and the number of times it was requested in the last
+    completed time window. Requests are counted in the current window by
+    *get* and the window is closed by *update_freq*. Upon insertion of a new
+    item in a full cache, the cache evicts the item with the lowest utility
+    and, among items with equal utility, the one inserted first.
+
+    Cached items are stored in an indexed heap keyed by their utility, so that
+    replacement is executed in logarithmic time. Since closing a time window
+    changes the utility of all items, items are ranked again in a single pass
+    only when the next replacement takes place.
     """
 
     @inheritdoc(Cache)
     def __init__(self, maxlen, **kwargs):
+        # Map each cached item to its insertion time
         self._cache = {}
+        # Cached items keyed by (utility, insertion time)
+        self._heap = IndexedHeap()
+        # False if frequencies changed since the heap was built
+        self._ranked = True
         self._freq = {}
         self._cal_freq = {}
         self._dist = {}
@@ -1563,19 +2926,30 @@ class MusCache(Cache):
     def maxlen(self):
         return self._maxlen
 
+    def _utility(self, k):
+        """Return the key by which a cached item is ranked for eviction"""
+        return self._dist[k] * self._freq.get(k, 0), self._cache[k]
+
+    def _rank(self):
+        """Rebuild the heap of cached items if frequencies changed"""
+        if not self._ranked:
+            self._heap = IndexedHeap((k, self._utility(k)) for k in self._cache)
+            self._ranked = True
+
     def update_dist(self, k, value):
         self._dist[k] = value
+        if self._ranked and k in self._heap:
+            self._heap.update(k, self._utility(k))
 
     def update_freq(self):
         self._freq = self._cal_freq
         self._cal_freq = {}
+        self._ranked = False
 
     @inheritdoc(Cache)
     def dump(self):
-        for k in self._cache:
-            if k not in self._freq:
-                self._freq[k] = 0
-        return sorted(self._cache, key=lambda x: (self._dist[x]*self._freq[x], self._cache[x]), reverse=True)
+        self._rank()
+        return sorted(self._heap, key=self._heap.priority, reverse=True)
 
     @inheritdoc(Cache)
     def has(self, k):
@@ -1597,11 +2971,11 @@ class MusCache(Cache):
         if not self.has(k):
             self.t += 1
             self._cache[k] = self.t
+            if self._ranked:
+                self._heap.push(k, self._utility(k))
             if len(self._cache) > self._maxlen:
-                for k in self._cache:
-                    if k not in self._freq:
-                        self._freq[k] = 0
-                evicted = min(self._cache, key=lambda x: (self._dist[x]*self._freq[x], self._cache[x]))
+                self._rank()
+                evicted = self._heap.pop()
                 del self._cache[evicted]
                 return evicted
         return None
@@ -1610,6 +2984,8 @@ class MusCache(Cache):
     def remove(self, k):
         if k in self._cache:
             self._cache.pop(k)
+            if self._ranked:
+                self._heap.remove(k)
             return True
         else:
             return False
@@ -1617,6 +2993,8 @@ class MusCache(Cache):
     @inheritdoc(Cache)
     def clear(self):
         self._cache.clear()
+        self._heap.clear()
+        self._ranked = True
 
 def insert_after_k_hits_cache(cache, k=2, memory=None):
     """Return a cache inserting items only after k requests.
@@ -1693,6 +3071,75 @@ def insert_after_k_hits_cache(cache, k=2, memory=None):
     return cache
 
 
+def tinylfu_cache(cache, k=2, sample_size=None, width=None, depth=4,
+                  doorkeeper=True, seed=None):
+    """Return a cache inserting items only if requested frequently, according
+    to the frequency estimates of a TinyLFU sketch [2]_.
+
+    Requests looked up in the cache with *get* are recorded in a count-min
+    sketch of fixed size preceded by a doorkeeper Bloom filter, whose counters
+    are halved every *sample_size* requests. An item is inserted in the cache
+    only if its estimated frequency is at least *k*. Differently from the
+    original TinyLFU proposal, the frequency of the item is not compared with
+    the one of the item that would be evicted, which is not known before
+    insertion. Differently from *insert_after_k_hits_cache*, the memory
+    used does not depend on the number of distinct items requested.
+
+    Parameters
+    ----------
+    cache : Cache
+        The instance of a cache to be applied TinyLFU admission
+    k : int, optional
+        The minimum estimated frequency of an item to be inserted
+    sample_size : int, optional
+        The number of requests after which the frequency estimates are
+        halved. If not specified, it is ten times the size of the cache
+    width : int, optional
+        The number of counters of each row of the count-min sketch, rounded up
+        to a power of 2. If not specified, it is equal to *sample_size*
+    depth : int, optional
+        The number of rows of the count-min sketch
+    doorkeeper : bool, optional
+        If *True*, the first request of an item in a sample is recorded in a
+        Bloom filter instead of the count-min sketch
+    seed : any hashable type, optional
+        The seed used to generate the hash functions of the sketch
+
+    Returns
+    -------
+    cache : Cache
+        The modified cache instance
+
+    References
+    ----------
+    .. [2] G. Einziger, R. Friedman, B. Manes, TinyLFU: A Highly Efficient
+           Cache Admission Policy, ACM Transactions on Storage, 2017
+    """
+    if k < 1:
+        raise ValueError("k must be positive")
+    if sample_size is None:
+        sample_size = 10 * cache.maxlen
+    sketch = _FrequencySketch(sample_size, width, depth, doorkeeper, seed)
+    c_get = cache.get
+    c_put = cache.put
+
+    def get(item, *args, **kwargs):
+        sketch.record(item)
+        return c_get(item, *args, **kwargs)
+
+    def put(item, force_insert=False, *args, **kwargs):
+        if force_insert or cache.has(item) or sketch.estimate(item) >= k:
+            return c_put(item, *args, **kwargs)
+        return None
+
+    cache.get = get
+    cache.get.__doc__ = c_get.__doc__
+    cache.put = put
+    cache.put.__doc__ = c_put.__doc__
+    cache._tinylfu_sketch = sketch
+    return cache
+
+
 def rand_insert_cache(cache, p, seed=None):
     """Return a random insertion cache
 
@@ -1909,6 +3356,12 @@ def ttl_cache(cache, f_time):
     However, if other operations like *position* or *len* are executed,
     results may take into account also expired items. In such cases, it is then
     advisable to execute a *purge* first.
+
+    Expiration times are kept in a binary heap of (expiration time, insertion
+    order, item) entries. Entries of items removed or whose expiration time
+    is extended are not deleted from the heap but are discarded when they
+    reach its top, so that insertions take logarithmic time. Items with
+    infinite TTL are not added to the heap at all.
     """
     if not isinstance(cache, Cache):
         raise TypeError('cache must be an instance of Cache or its subclasses')
@@ -1921,7 +3374,8 @@ def ttl_cache(cache, f_time):
     cache.f_time = f_time
     cache.expiry = {}
 
-    cache._exp_list = LinkedSet()
+    cache._exp_heap = []
+    cache._exp_t = 0
 
     c_put = cache.put
     c_get = cache.get
@@ -1938,11 +3392,33 @@ def ttl_cache(cache, f_time):
         expiry : float
             Cutoff expiration time
         """
-        while cache._exp_list.bottom is not None and \
-              cache.expiry[cache._exp_list.bottom] < expiry:
-            expired = cache._exp_list.pop_bottom()
-            cache.expiry.pop(expired)
-            c_remove(expired)
+        heap = cache._exp_heap
+        while heap and heap[0][0] < expiry:
+            expires, _, expired = heapq.heappop(heap)
+            # Skip stale entries of removed items or extended expirations
+            if cache.expiry.get(expired) == expires:
+                cache.expiry.pop(expired)
+                c_remove(expired)
+
+    def _push_expiry(k, expires):
+        """Add an entry to the heap of expiration times, rebuilding the heap
+        from live entries if stale ones outnumber them
+
+        Parameters
+        ----------
+        k : any hashable type
+            The item
+        expires : float
+            The expiration time of the item
+        """
+        if expires == np.infty:
+            return
+        heap = cache._exp_heap
+        if len(heap) > 2 * len(cache.expiry) + 8:
+            heap[:] = [e for e in heap if cache.expiry.get(e[2]) == e[0]]
+            heapq.heapify(heap)
+        cache._exp_t += 1
+        heapq.heappush(heap, (expires, cache._exp_t, k))
 
     def purge():
         """Purge all expired items"""
@@ -1996,23 +3472,16 @@ def ttl_cache(cache, f_time):
         # Purge expired items only if cache is full for performance reasons
         if len(cache) == cache.maxlen:
             cache._purge_till(now)
+        elif k in cache.expiry and cache.expiry[k] < now:
+            # Drop the expired copy of the item not purged yet, otherwise
+            # policies checking for its presence with has() may store it twice
+            remove(k)
         evicted = c_put(k)
         if evicted is not None:
             cache.expiry.pop(evicted)
-            cache._exp_list.remove(evicted)
         if k not in cache.expiry or cache.expiry[k] < expires:
             cache.expiry[k] = expires
-            if k in cache._exp_list:
-                cache._exp_list.remove(k)
-            if len(cache._exp_list) == 0:
-                cache._exp_list.append_top(k)
-            else:
-                for i in cache._exp_list:
-                    if expires >= cache.expiry[i]:
-                        cache._exp_list.insert_above(i, k)
-                        break
-                else:
-                    cache._exp_list.append_bottom(k)
+            _push_expiry(k, expires)
         return evicted
 
     def has(k, *args, **kwargs):
@@ -2021,7 +3490,6 @@ def ttl_cache(cache, f_time):
     def remove(k, *args, **kwargs):
         c_remove(k)
         cache.expiry.pop(k)
-        cache._exp_list.remove(k)
 
     def dump():
         """Return a dump of all the elements currently in the cache possibly
@@ -2040,7 +3508,7 @@ def ttl_cache(cache, f_time):
     def clear():
         c_clear()
         cache.expiry.clear()
-        cache._exp_list.clear()
+        del cache._exp_heap[:]
 
     cache._purge_till = _purge_till
 
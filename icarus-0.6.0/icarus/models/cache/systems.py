@@ -337,6 +337,23 @@ class ShardedCache(Cache):
         self._node = [CACHE_POLICY[policy](self._node_maxlen[i], **policy_attr)
                       for i in range(nodes)]
         self.f_map = f_map if f_map is not None else lambda k: hash(k) % nodes
+        self._default_f_map = f_map is None
+
+    def __getstate__(self):
+        """Return the state of the cache to pickle. The default mapping is
+        not pickled, because it is a closure, and it is rebuilt when the
+        state is restored"""
+        state = self.__dict__.copy()
+        if self._default_f_map:
+            del state['f_map']
+        return state
+
+    def __setstate__(self, state):
+        """Restore the state of the cache"""
+        self.__dict__.update(state)
+        if self._default_f_map:
+            nodes = len(self._node)
+            self.f_map = lambda k: hash(k) % nodes
 
     @inheritdoc(Cache)
     def __len__(self):
@@ -1,10 +1,62 @@
 from __future__ import division
 import unittest
 import collections
+import random
+import pickle
 
 import numpy as np
 
 import icarus.models as cache
+from icarus.registry import CACHE_POLICY
+
+
+class ScanLfu(object):
+    """Reference LFU cache scanning the whole cache upon eviction.
+
+    Ties are broken in favour of the item counted first. If *perfect*, the
+    requests of items not in the cache are also counted and counts are kept
+    after eviction, as in perfect LFU.
+    """
+
+    def __init__(self, maxlen, perfect=False):
+        self.maxlen = maxlen
+        self.perfect = perfect
+        # (frequency, time of the first count) keyed by item
+        self.counter = {}
+        self.cache = set()
+        self.t = 0
+
+    def get(self, k):
+        self.t += 1
+        if self.perfect and k not in self.counter:
+            self.counter[k] = 1, self.t
+        elif self.perfect or k in self.cache:
+            freq, t = self.counter[k]
+            self.counter[k] = freq + 1, t
+        return k in self.cache
+
+    def put(self, k):
+        if k in self.cache:
+            return None
+        self.t += 1
+        if self.perfect:
+            freq, t = self.counter[k]
+            self.counter[k] = freq + 1, t
+        else:
+            self.counter[k] = 1, self.t
+        self.cache.add(k)
+        if len(self.cache) > self.maxlen:
+            evicted = min(self.cache, key=self.counter.__getitem__)
+            self.cache.remove(evicted)
+            return evicted
+        return None
+
+    def remove(self, k):
+        self.cache.remove(k)
+
+    def dump(self):
+        return sorted(self.cache, key=self.counter.__getitem__, reverse=True)
+
 
 class TestLinkedSet(unittest.TestCase):
 
@@ -213,6 +265,137 @@ class TestLinkedSet(unittest.TestCase):
         self.assertIsNotNone(cache.LinkedSet(iterable=[1, 0, None]))
 
 
+class TestLfuBucketList(unittest.TestCase):
+
+    def test_add_pop(self):
+        c = cache.LfuBucketList()
+        c.add(1)
+        c.add(2)
+        c.add(3)
+        self.assertEqual(len(c), 3)
+        self.assertEqual(list(c), [3, 2, 1])
+        self.assertEqual(c.bottom, 1)
+        self.assertEqual(c.pop_bottom(), 1)
+        self.assertEqual(c.pop_bottom(), 2)
+        self.assertEqual(c.pop_bottom(), 3)
+        self.assertIsNone(c.pop_bottom())
+        self.assertEqual(len(c), 0)
+        self.assertRaises(KeyError, c.remove, 1)
+
+    def test_increment(self):
+        c = cache.LfuBucketList()
+        for i in (1, 2, 3, 4):
+            c.add(i)
+        c.increment(2)
+        c.increment(1)
+        c.increment(2)
+        self.assertEqual(c.frequency(1), 2)
+        self.assertEqual(c.frequency(2), 3)
+        self.assertEqual(c.frequency(3), 1)
+        # Item 1 has joined the bucket of frequency 2 later than 2 did, but
+        # ties are broken by insertion order
+        c.increment(2)
+        c.increment(1)
+        c.increment(1)
+        self.assertEqual(list(c), [2, 1, 4, 3])
+        self.assertEqual(c.pop_bottom(), 3)
+        self.assertEqual(c.pop_bottom(), 4)
+        self.assertEqual(c.pop_bottom(), 1)
+        self.assertEqual(c.pop_bottom(), 2)
+        self.assertRaises(KeyError, c.increment, 1)
+
+    def test_remove(self):
+        c = cache.LfuBucketList()
+        for i in (1, 2, 3):
+            c.add(i)
+        c.increment(1)
+        c.remove(2)
+        self.assertNotIn(2, c)
+        self.assertEqual(list(c), [1, 3])
+        c.remove(1)
+        self.assertEqual(list(c), [3])
+        c.add(2)
+        self.assertEqual(c.pop_bottom(), 3)
+        self.assertEqual(c.pop_bottom(), 2)
+
+    def test_clear(self):
+        c = cache.LfuBucketList()
+        for i in (1, 2, 3):
+            c.add(i)
+        c.clear()
+        self.assertEqual(len(c), 0)
+        self.assertEqual(list(c), [])
+        self.assertIsNone(c.bottom)
+
+
+class TestIndexedHeap(unittest.TestCase):
+
+    def heap_consistency(self, heap):
+        """Checks the heap invariant and the consistency of the item index.
+
+        This method depends on the internal implementation of the IndexedHeap
+        class
+        """
+        for i in range(1, len(heap._items)):
+            if heap._prio[i] < heap._prio[(i - 1) // 2]:
+                return False
+        return all(heap._pos[k] == i for i, k in enumerate(heap._items))
+
+    def test_push_pop(self):
+        h = cache.IndexedHeap()
+        for k, p in ((1, 5), (2, 3), (3, 8), (4, 1)):
+            h.push(k, p)
+        self.assertTrue(self.heap_consistency(h))
+        self.assertEqual(len(h), 4)
+        self.assertEqual(h.top, 4)
+        self.assertEqual(h.priority(3), 8)
+        self.assertEqual([h.pop() for _ in range(4)], [4, 2, 1, 3])
+        self.assertIsNone(h.pop())
+        self.assertIsNone(h.top)
+        self.assertRaises(KeyError, h.priority, 1)
+
+    def test_init(self):
+        h = cache.IndexedHeap((k, -k) for k in range(20))
+        self.assertTrue(self.heap_consistency(h))
+        self.assertEqual([h.pop() for _ in range(3)], [19, 18, 17])
+        self.assertRaises(ValueError, cache.IndexedHeap, [(1, 1), (1, 2)])
+
+    def test_update_remove(self):
+        h = cache.IndexedHeap()
+        for k in range(10):
+            h.push(k, (k % 3, k))
+        self.assertRaises(KeyError, h.push, 3, (0, 0))
+        h.update(9, (-1, 9))
+        h.update(0, (5, 0))
+        self.assertTrue(self.heap_consistency(h))
+        h.remove(3)
+        h.remove(6)
+        self.assertNotIn(3, h)
+        self.assertTrue(self.heap_consistency(h))
+        self.assertEqual([h.pop() for _ in range(len(h))],
+                         [9, 1, 4, 7, 2, 5, 8, 0])
+
+    def test_random_operations(self):
+        rand = random.Random(0)
+        h = cache.IndexedHeap()
+        prio = {}
+        for _ in range(2000):
+            k = rand.randint(0, 50)
+            if k in prio and rand.random() < 0.3:
+                h.remove(k)
+                prio.pop(k)
+            elif k in prio:
+                prio[k] = rand.random()
+                h.update(k, prio[k])
+            else:
+                prio[k] = rand.random()
+                h.push(k, prio[k])
+            self.assertEqual(h.top, min(prio, key=prio.get) if prio else None)
+        self.assertTrue(self.heap_consistency(h))
+        h.clear()
+        self.assertEqual(len(h), 0)
+
+
 class TestCache(unittest.TestCase):
 
     def test_do(self):
@@ -240,6 +423,31 @@ class TestCache(unittest.TestCase):
         self.assertFalse(c.do('GET', 2))
         self.assertEquals(c.dump(), [])
 
+    def test_pickle(self):
+        rand = random.Random(0)
+        trace = [rand.randint(0, 50) for _ in range(300)]
+        for name, policy in CACHE_POLICY.items():
+            if name in ('PATH', 'TREE', 'ARRAY'):
+                continue
+            c = policy(10, trace=trace, n_contents=51)
+            for k in trace[:200]:
+                if name == 'MUS':
+                    c.update_dist(k, 1 + k % 3)
+                if not c.get(k):
+                    c.put(k)
+            d = pickle.loads(pickle.dumps(c, pickle.HIGHEST_PROTOCOL))
+            if name == 'RAND':
+                self.assertEqual(set(c.dump()), set(d.dump()))
+                continue
+            self.assertEqual(c.dump(), d.dump(), name)
+            for k in trace[200:]:
+                if name == 'MUS':
+                    c.update_dist(k, 1 + k % 3)
+                    d.update_dist(k, 1 + k % 3)
+                self.assertEqual(c.get(k), d.get(k), name)
+                self.assertEqual(c.put(k), d.put(k), name)
+            self.assertEqual(c.dump(), d.dump(), name)
+
 
 class TestMinCache(unittest.TestCase):
 
@@ -275,6 +483,49 @@ class TestMinCache(unittest.TestCase):
             self.assertIsNone(c.put(i))
             self.assertEqual(set(range(min(i + 1, size))), set(c.dump()))
 
+    def test_get_put_random_trace(self):
+
+        class ScanMin(object):
+            """Reference implementation scanning all cached items"""
+
+            def __init__(self, maxlen, trace):
+                self.maxlen = maxlen
+                self.next = collections.defaultdict(collections.deque)
+                for i, k in enumerate(trace):
+                    self.next[k].append(i)
+                for k in self.next.values():
+                    k.append(float('inf'))
+                self.cache = collections.OrderedDict()
+
+            def get(self, k):
+                self.next[k].popleft()
+                return k in self.cache
+
+            def put(self, k):
+                if k in self.cache:
+                    return None
+                if len(self.cache) < self.maxlen:
+                    self.cache[k] = True
+                    return None
+                victim = max(self.cache, key=lambda x: self.next[x][0])
+                if self.next[k][0] < self.next[victim][0]:
+                    del self.cache[victim]
+                    self.cache[k] = True
+                    return victim
+                return None
+
+        rand = random.Random(7)
+        trace = [int(rand.paretovariate(1.2)) for _ in range(3000)]
+        c = cache.BeladyMinCache(10, trace)
+        ref = ScanMin(10, trace)
+        for k in trace:
+            hit = c.get(k)
+            self.assertEqual(ref.get(k), hit)
+            if not hit:
+                self.assertEqual(ref.put(k), c.put(k))
+            self.assertEqual(set(ref.cache), c.dump())
+        self.assertEqual(10, len(c))
+
 
 class TestLruCache(unittest.TestCase):
 
@@ -331,6 +582,73 @@ class TestLruCache(unittest.TestCase):
         self.assertEqual(c.position(3), 2)
         self.assertEqual(c.position(4), 3)
 
+class TestArrayLruCache(unittest.TestCase):
+
+    def test_lru(self):
+        c = cache.ArrayLruCache(4, n_contents=10)
+        c.put(0)
+        self.assertEqual(len(c), 1)
+        c.put(2)
+        c.put(3)
+        c.put(4)
+        self.assertEqual(len(c), 4)
+        self.assertEqual(c.dump(), [4, 3, 2, 0])
+        self.assertEqual(c.put(5), 0)
+        self.assertEqual(c.put(5), None)
+        self.assertEqual(len(c), 4)
+        self.assertEqual(c.dump(), [5, 4, 3, 2])
+        self.assertTrue(c.get(2))
+        self.assertEqual(c.dump(), [2, 5, 4, 3])
+        self.assertTrue(c.get(4))
+        self.assertFalse(c.get(0))
+        self.assertEqual(c.dump(), [4, 2, 5, 3])
+        self.assertEqual(c.position(5), 2)
+        c.clear()
+        self.assertEqual(len(c), 0)
+        self.assertEqual(c.dump(), [])
+        self.assertFalse(c.has(4))
+
+    def test_out_of_range(self):
+        c = cache.ArrayLruCache(4, n_contents=10)
+        c.put(10)
+        for k in (-1, 11, 12):
+            self.assertFalse(c.has(k))
+            self.assertFalse(c.get(k))
+            self.assertFalse(c.remove(k))
+            self.assertRaises(ValueError, c.put, k)
+        self.assertEqual(c.dump(), [10])
+
+    def test_remove(self):
+        c = cache.ArrayLruCache(4, n_contents=10)
+        c.put(1)
+        c.put(2)
+        c.put(3)
+        self.assertTrue(c.remove(2))
+        self.assertFalse(c.remove(2))
+        self.assertEqual(len(c), 2)
+        self.assertEqual(c.dump(), [3, 1])
+        c.put(4)
+        c.put(5)
+        self.assertEqual(c.dump(), [5, 4, 3, 1])
+        c.remove(5)
+        c.remove(1)
+        self.assertEqual(len(c), 2)
+        self.assertEqual(c.dump(), [4, 3])
+
+    def test_random_trace(self):
+        rand = random.Random(1)
+        for maxlen in (1, 5, 20):
+            c = cache.ArrayLruCache(maxlen, n_contents=100)
+            ref = cache.LruCache(maxlen)
+            for _ in range(5000):
+                k = int(rand.paretovariate(1.2)) % 101
+                self.assertEqual(c.get(k), ref.get(k))
+                self.assertEqual(c.put(k), ref.put(k))
+                if rand.random() < 0.01:
+                    self.assertEqual(c.remove(k), ref.remove(k))
+            self.assertEqual(c.dump(), ref.dump())
+
+
 class TestSlruCache(unittest.TestCase):
 
     def test_alloc(self):
@@ -463,6 +781,69 @@ class TestSlruCache(unittest.TestCase):
         self.assertEqual(c.dump(serialized=True), [1, 2, 3, 4])
         self.assertEqual(c.dump(), [1, 2, 3, 4])
 
+    def test_random_trace(self):
+
+        class LinkedSetSlru(object):
+            """Reference implementation with one LinkedSet per segment"""
+
+            def __init__(self, segment_maxlen):
+                self.segment_maxlen = segment_maxlen
+                self.segment = [cache.LinkedSet() for _ in segment_maxlen]
+
+            def seg(self, k):
+                for i, s in enumerate(self.segment):
+                    if k in s:
+                        return i
+                return None
+
+            def get(self, k):
+                seg = self.seg(k)
+                if seg is None:
+                    return False
+                if seg == 0:
+                    self.segment[0].move_to_top(k)
+                    return True
+                self.segment[seg].remove(k)
+                self.segment[seg - 1].append_top(k)
+                if len(self.segment[seg - 1]) > self.segment_maxlen[seg - 1]:
+                    self.segment[seg].append_top(
+                                    self.segment[seg - 1].pop_bottom())
+                return True
+
+            def put(self, k):
+                if self.get(k):
+                    return None
+                self.segment[-1].append_top(k)
+                if len(self.segment[-1]) > self.segment_maxlen[-1]:
+                    return self.segment[-1].pop_bottom()
+                return None
+
+            def dump(self):
+                return [list(s) for s in self.segment]
+
+        rand = random.Random(11)
+        c = cache.SegmentedLruCache(12, 3, [0.25, 0.25, 0.5])
+        ref = LinkedSetSlru(c._segment_maxlen)
+        for _ in range(3000):
+            k = int(rand.paretovariate(1))
+            r = rand.random()
+            if r < 0.4:
+                self.assertEqual(ref.get(k), c.get(k))
+            elif r < 0.9:
+                self.assertEqual(ref.put(k), c.put(k))
+            elif c.has(k):
+                self.assertTrue(c.remove(k))
+                ref.segment[ref.seg(k)].remove(k)
+            self.assertEqual(ref.dump(), c.dump(serialized=False))
+            serialized = c.dump()
+            self.assertEqual(len(serialized), len(c))
+            for i, item in enumerate(serialized):
+                self.assertEqual(i, c.position(item))
+        c.clear()
+        self.assertEqual([[], [], []], c.dump(serialized=False))
+        self.assertEqual(0, len(c))
+
+
 class TestFifoCache(unittest.TestCase):
 
     def test_fifo(self):
@@ -505,6 +886,90 @@ class TestFifoCache(unittest.TestCase):
         self.assertEqual(len(c), 3)
         self.assertEqual(c.dump(), [4, 3, 1])
 
+class TestClockCache(unittest.TestCase):
+
+    def test_clock(self):
+        c = cache.ClockCache(3)
+        self.assertEqual(c.maxlen, 3)
+        self.assertIsNone(c.put(1))
+        self.assertIsNone(c.put(2))
+        self.assertIsNone(c.put(3))
+        self.assertEqual(len(c), 3)
+        self.assertTrue(c.get(1))
+        self.assertFalse(c.get(4))
+        self.assertEqual(c.put(4), 2)
+        self.assertEqual(c.dump(), [4, 1, 3])
+        self.assertEqual(c.put(5), 3)
+        self.assertEqual(c.dump(), [5, 4, 1])
+        self.assertTrue(c.get(4))
+        self.assertEqual(c.put(6), 1)
+        self.assertEqual(c.dump(), [6, 5, 4])
+        self.assertEqual(len(c), 3)
+
+    def test_remove(self):
+        c = cache.ClockCache(3)
+        c.put(1)
+        c.put(2)
+        c.put(3)
+        self.assertTrue(c.remove(2))
+        self.assertFalse(c.remove(2))
+        self.assertEqual(len(c), 2)
+        self.assertFalse(c.has(2))
+        self.assertIsNone(c.put(4))
+        self.assertEqual(set(c.dump()), {1, 3, 4})
+        c.clear()
+        self.assertEqual(len(c), 0)
+        self.assertEqual(c.dump(), [])
+
+
+class TestClockProCache(unittest.TestCase):
+
+    def test_scan_resistance(self):
+        c = cache.ClockProCache(10)
+        lru = cache.LruCache(10)
+        trace = 3 * list(range(5)) + list(range(100, 200)) + list(range(5))
+        for cache_inst in (c, lru):
+            for k in trace:
+                if not cache_inst.get(k):
+                    cache_inst.put(k)
+        for k in range(5):
+            self.assertTrue(c.has(k))
+        self.assertEqual(len(c), 10)
+
+    def test_non_resident_promotion(self):
+        c = cache.ClockProCache(2)
+        c.put(1)
+        c.put(2)
+        self.assertEqual(c.put(3), 1)
+        self.assertFalse(c.has(1))
+        self.assertFalse(c.get(1))
+        evicted = c.put(1)
+        self.assertIn(evicted, (2, 3))
+        self.assertTrue(c.has(1))
+        self.assertEqual(len(c), 2)
+
+    def test_random_trace(self):
+        rand = random.Random(5)
+        c = cache.ClockProCache(8)
+        cached = set()
+        for _ in range(5000):
+            k = int(rand.paretovariate(0.8))
+            if rand.random() < 0.05:
+                self.assertEqual(k in cached, c.remove(k))
+                cached.discard(k)
+                continue
+            hit = c.get(k)
+            self.assertEqual(k in cached, hit)
+            if not hit:
+                evicted = c.put(k)
+                cached.add(k)
+                cached.discard(evicted)
+            self.assertEqual(cached, set(c.dump()))
+            self.assertEqual(len(cached), len(c))
+            self.assertLessEqual(len(c), c.maxlen)
+        c.clear()
+        self.assertEqual(len(c), 0)
+        self.assertEqual(c.dump(), [])
 
 
 class TestClimbCache(unittest.TestCase):
@@ -640,6 +1105,37 @@ class TestInCacheLfuCache(unittest.TestCase):
         self.assertEquals(len(c), 0)
         self.assertEquals(c.dump(), [])
 
+    def test_lfu_tie_insertion_order(self):
+        c = cache.InCacheLfuCache(3)
+        c.put(1)
+        c.put(2)
+        c.put(3)
+        c.get(2)
+        c.get(1)
+        self.assertEqual(c.dump(), [2, 1, 3])
+        self.assertEqual(c.put(4), 3)
+        self.assertEqual(c.put(5), 4)
+        c.get(5)
+        c.get(5)
+        # All other items have frequency > 1, so the new item is evicted
+        self.assertEqual(c.put(6), 6)
+        self.assertEqual(c.dump(), [5, 2, 1])
+
+    def test_lfu_random_trace(self):
+        rand = random.Random(1)
+        for maxlen in (1, 5, 20):
+            c = cache.InCacheLfuCache(maxlen)
+            ref = ScanLfu(maxlen)
+            for _ in range(5000):
+                k = int(rand.paretovariate(1.2)) % 60
+                self.assertEqual(c.get(k), ref.get(k))
+                self.assertEqual(c.put(k), ref.put(k))
+                if rand.random() < 0.01:
+                    v = rand.choice(ref.dump())
+                    self.assertTrue(c.remove(v))
+                    ref.remove(v)
+            self.assertEqual(c.dump(), ref.dump())
+
 
 class TestPerfectLfuCache(unittest.TestCase):
 
@@ -693,6 +1189,125 @@ class TestPerfectLfuCache(unittest.TestCase):
         self.assertEquals(len(c), 0)
         self.assertEquals(c.dump(), [])
 
+    def test_lfu_array_counter(self):
+        c = cache.PerfectLfuCache(2, n_contents=10)
+        for k in (1, 1, 2, 3, 3, 3):
+            if not c.get(k):
+                c.put(k)
+        self.assertEqual(c.dump(), [3, 1])
+        c.get(10)
+        self.assertFalse(c.has(10))
+        self.assertRaises(IndexError, c.get, 11)
+        c.clear()
+        self.assertEqual(c.dump(), [])
+        c.put(2)
+        self.assertEqual(c.dump(), [2])
+
+    def test_remove(self):
+        c = cache.PerfectLfuCache(3)
+        c.put(1)
+        c.put(2)
+        self.assertTrue(c.remove(1))
+        self.assertFalse(c.remove(1))
+        self.assertEqual(c.dump(), [2])
+
+    def test_lfu_random_trace(self):
+        rand = random.Random(1)
+        for maxlen in (1, 5, 20):
+            ref = ScanLfu(maxlen, perfect=True)
+            caches = [cache.PerfectLfuCache(maxlen),
+                      cache.PerfectLfuCache(maxlen, n_contents=100)]
+            for _ in range(5000):
+                k = int(rand.paretovariate(1.2)) % 100
+                hit = ref.get(k)
+                evicted = ref.put(k) if not hit else None
+                for c in caches:
+                    self.assertEqual(c.get(k), hit)
+                    if not hit:
+                        self.assertEqual(c.put(k), evicted)
+            for c in caches:
+                self.assertEqual(set(c.dump()), ref.cache)
+
+
+class TestMusCache(unittest.TestCase):
+
+    def test_mus(self):
+        c = cache.MusCache(3)
+        for k, dist in ((1, 1), (2, 2), (3, 3)):
+            c.get(k)
+            c.update_dist(k, dist)
+            c.put(k)
+        c.get(1)
+        c.get(1)
+        c.get(3)
+        c.update_freq()
+        # Utilities are now 1 * 3 = 3, 2 * 1 = 2, 3 * 2 = 6
+        self.assertEqual(c.dump(), [3, 1, 2])
+        # Item 4 was not requested in the last window, its utility is 0 and
+        # it is evicted straight away
+        c.update_dist(4, 1)
+        self.assertEqual(c.put(4), 4)
+        self.assertEqual(c.dump(), [3, 1, 2])
+        c.update_dist(1, 0)
+        self.assertEqual(c.dump(), [3, 2, 1])
+        # Items 1 and 5 have both utility 0 but 1 was inserted first
+        c.update_dist(5, 4)
+        self.assertEqual(c.put(5), 1)
+        self.assertEqual(c.dump(), [3, 2, 5])
+        self.assertTrue(c.remove(2))
+        self.assertFalse(c.remove(2))
+        self.assertEqual(c.dump(), [3, 5])
+        c.clear()
+        self.assertEqual(c.dump(), [])
+
+    def test_mus_random_trace(self):
+        # Reference implementation scanning the whole cache upon eviction
+        class ScanMus(object):
+            def __init__(self, maxlen):
+                self.maxlen = maxlen
+                self.cache = {}
+                self.freq = {}
+                self.cal_freq = {}
+                self.dist = {}
+                self.t = 0
+            def update_freq(self):
+                self.freq = self.cal_freq
+                self.cal_freq = {}
+            def get(self, k):
+                self.cal_freq[k] = self.cal_freq.get(k, 0) + 1
+                return k in self.cache
+            def put(self, k):
+                if k not in self.cache:
+                    self.t += 1
+                    self.cache[k] = self.t
+                    if len(self.cache) > self.maxlen:
+                        evicted = min(self.cache, key=lambda x: (
+                            self.dist[x] * self.freq.get(x, 0), self.cache[x]))
+                        del self.cache[evicted]
+                        return evicted
+                return None
+            def dump(self):
+                return sorted(self.cache, key=lambda x: (
+                    self.dist[x] * self.freq.get(x, 0), self.cache[x]),
+                    reverse=True)
+        rand = random.Random(1)
+        for maxlen in (1, 5, 20):
+            c = cache.MusCache(maxlen)
+            ref = ScanMus(maxlen)
+            for i in range(5000):
+                if i % 50 == 0:
+                    c.update_freq()
+                    ref.update_freq()
+                k = int(rand.paretovariate(1.2)) % 60
+                self.assertEqual(c.get(k), ref.get(k))
+                dist = rand.randint(1, 6)
+                c.update_dist(k, dist)
+                ref.dist[k] = dist
+                self.assertEqual(c.put(k), ref.put(k))
+                if i % 500 == 0:
+                    self.assertEqual(c.dump(), ref.dump())
+            self.assertEqual(c.dump(), ref.dump())
+
 
 class TestInsertAfterKHits(unittest.TestCase):
 
@@ -802,6 +1417,68 @@ class TestInsertAfterKHits(unittest.TestCase):
         self.assertGreater(len(c.dump.__doc__), 0)
         self.assertGreater(len(c.clear.__doc__), 0)
 
+class TestTinyLfu(unittest.TestCase):
+
+    def test_put_get(self):
+        c = cache.tinylfu_cache(cache.LruCache(2), k=2, seed=1)
+        self.assertFalse(c.get(1))
+        self.assertIsNone(c.put(1))
+        self.assertFalse(c.has(1))
+        self.assertFalse(c.get(1))
+        self.assertIsNone(c.put(1))
+        self.assertTrue(c.has(1))
+        self.assertTrue(c.get(1))
+
+    def test_force_insert(self):
+        c = cache.tinylfu_cache(cache.LruCache(2), k=3, seed=1)
+        c.put(1, force_insert=True)
+        c.put(2, force_insert=True)
+        self.assertEqual(c.put(3, force_insert=True), 1)
+        self.assertEqual(c.dump(), [3, 2])
+
+    def test_put_args(self):
+        # Arguments other than the item are passed to the wrapped cache
+        c = cache.tinylfu_cache(cache.keyval_cache(cache.LruCache(2)), k=2,
+                                seed=1)
+        self.assertIsNone(c.get(1))
+        self.assertIsNone(c.get(1))
+        c.put(1, v='a')
+        self.assertEqual('a', c.get(1))
+        c.put(2, force_insert=True, v='b')
+        self.assertEqual('b', c.get(2))
+
+    def test_k_one(self):
+        c = cache.tinylfu_cache(cache.FifoCache(2), k=1, seed=1)
+        self.assertFalse(c.get(1))
+        c.put(1)
+        self.assertTrue(c.has(1))
+
+    def test_sketch(self):
+        rand = random.Random(9)
+        c = cache.tinylfu_cache(cache.LruCache(10), sample_size=1000, seed=2)
+        sketch = c._tinylfu_sketch
+        freq = collections.Counter()
+        for _ in range(999):
+            k = int(rand.paretovariate(0.5))
+            c.get(k)
+            freq[k] += 1
+        for k, n in freq.items():
+            self.assertGreaterEqual(sketch.estimate(k), n)
+        top = freq.most_common(1)[0][0]
+        self.assertLessEqual(sketch.estimate(top), freq[top] + 5)
+        c.get(top)
+        self.assertLessEqual(sketch.estimate(top), (freq[top] + 1) // 2)
+
+    def test_incorrect_params(self):
+        self.assertRaises(ValueError, cache.tinylfu_cache,
+                          cache.LruCache(2), k=0)
+        self.assertRaises(ValueError, cache.tinylfu_cache,
+                          cache.LruCache(2), sample_size=0)
+
+    def test_naming(self):
+        c = cache.tinylfu_cache(cache.LruCache(2))
+        self.assertEqual(c.get.__name__, 'get')
+        self.assertEqual(c.put.__name__, 'put')
 
 
 class TestRandInsert(unittest.TestCase):
@@ -1011,6 +1688,26 @@ class TestTtlCache(unittest.TestCase):
         self.assertIn((2, np.infty), dump)
         self.assertIn((3, np.infty), dump)
 
+    def test_random_expiry(self):
+        rand = random.Random(3)
+        now = [0]
+        c = cache.ttl_cache(cache.FifoCache(1000), lambda: now[0])
+        expiry = {}
+        for _ in range(5000):
+            now[0] += rand.randint(0, 2)
+            for k in [k for k, exp in expiry.items() if exp < now[0]]:
+                del expiry[k]
+            k = rand.randint(0, 100)
+            if k in expiry and rand.random() < 0.2:
+                c.remove(k)
+                del expiry[k]
+                continue
+            ttl = rand.randint(1, 30)
+            c.put(k, ttl=ttl)
+            expiry[k] = max(expiry.get(k, 0), now[0] + ttl)
+            self.assertEqual(expiry, dict(c.dump()))
+            self.assertLessEqual(len(c._exp_heap), 2 * len(expiry) + 9)
+
     def test_clear(self):
         curr_time = 1
         f_time = lambda: curr_time
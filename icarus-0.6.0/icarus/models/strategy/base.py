@@ -54,6 +54,77 @@ class Strategy(object):
         raise NotImplementedError('The selected strategy must implement '
                                   'a process_event method')
 
+    def warmup(self, time, receiver, content):
+        """Process a request issued to warm up caches.
+
+        Since these requests are not logged, their only effect is on the
+        state of caches. Strategies can override this method to execute only
+        the cache lookups and insertions of `process_event`, without starting
+        a session and forwarding requests and contents hop by hop. The state
+        of caches must be the same as if the request was processed by
+        `process_event` without logging it, which is what this method does
+        by default.
+
+        Parameters
+        ----------
+        time : int
+            The timestamp of the event
+        receiver : any hashable type
+            The receiver node requesting a content
+        content : any hashable type
+            The content identifier requested by the receiver
+        """
+        self.process_event(time, receiver, content, False)
+
+    def shard(self, content):
+        """Return the shard of the workload which requests for a content
+        belong to.
+
+        Requests of different shards never access the same caches, so that
+        shards can be processed independently, e.g. in parallel by different
+        processes, without changing the state of any cache. Strategies whose
+        requests may access any cache cannot split their workload in shards,
+        which is the default.
+
+        Parameters
+        ----------
+        content : any hashable type
+            The content identifier
+
+        Returns
+        -------
+        shard : any hashable type
+            The shard of the requests for the content or *None* if the
+            workload cannot be split in shards
+        """
+        return None
+
+    def get_state(self):
+        """Return the internal state of the strategy, so that it can be saved
+        in a snapshot of the network and restored afterwards.
+
+        By default, the state comprises all attributes of the strategy except
+        the network view and controller. Strategies whose attributes cannot be
+        pickled must override this method and `set_state`.
+
+        Returns
+        -------
+        state : dict
+            The state of the strategy
+        """
+        return {k: v for k, v in self.__dict__.items()
+                if k not in ('view', 'controller')}
+
+    def set_state(self, state):
+        """Restore the internal state of the strategy.
+
+        Parameters
+        ----------
+        state : dict
+            The state of the strategy, as returned by `get_state`
+        """
+        self.__dict__.update(state)
+
 
 
 @register_strategy('NO_CACHE')
@@ -82,3 +153,8 @@ class NoCache(Strategy):
         path = list(reversed(path))
         self.controller.forward_content_path(source, receiver, path)
         self.controller.end_session()
+
+    @inheritdoc(Strategy)
+    def warmup(self, time, receiver, content):
+        # Without caches, requests have no effect on the network state
+        pass
@@ -34,6 +34,10 @@ class BaseHashrouting(Strategy):
         # Allocate results of hash function to caching nodes
         self.cache_assignment = {i: self.cache_nodes[i]
                                  for i in range(len(self.cache_nodes))}
+        # Authoritative cache of each content, keyed by cluster (None if the
+        # topology is not clustered) and then by content. Entries are added
+        # the first time a content is looked up
+        self.authoritative_caches = {}
         # Check if there are clusters
         if 'clusters' in self.view.topology().graph:
             self.clusters = self.view.topology().graph['clusters']
@@ -59,12 +63,24 @@ class BaseHashrouting(Strategy):
         authoritative_cache : any hashable type
             The node on which the authoritative cache is deployed
         """
+        try:
+            return self.authoritative_caches[cluster][content]
+        except KeyError:
+            pass
         # TODO: I should probably consider using a better non-cryptographic hash
         # function, like xxhash
         h = hash(content)
         if cluster is not None:
-            return self.clusters[cluster][h % self.cluster_size[cluster]]
-        return self.cache_assignment[h % self.n_cache_nodes]
+            cache = self.clusters[cluster][h % self.cluster_size[cluster]]
+        else:
+            cache = self.cache_assignment[h % self.n_cache_nodes]
+        self.authoritative_caches.setdefault(cluster, {})[content] = cache
+        return cache
+
+    @inheritdoc(Strategy)
+    def shard(self, content):
+        # Requests only access the authoritative cache of their content
+        return self.authoritative_cache(content)
 
     def process_event(self, time, receiver, content, log):
         raise NotImplementedError('Cannot use BaseHashrouting class as is. '
@@ -136,7 +152,7 @@ class Hashrouting(BaseHashrouting):
                 # Forward to receiver
                 self.controller.forward_content_path(cache, receiver)
             elif self.routing == 'ASYMM':
-                if cache in self.view.shortest_path(source, receiver):
+                if self.view.multicast_fork(source, receiver, cache).on_path:
                     # Forward to cache
                     self.controller.forward_content_path(source, cache)
                     # Insert in cache
@@ -147,24 +163,16 @@ class Hashrouting(BaseHashrouting):
                     # Forward to receiver straight away
                     self.controller.forward_content_path(source, receiver)
             elif self.routing == 'MULTICAST':
-                if cache in self.view.shortest_path(source, receiver):
+                fork = self.view.multicast_fork(source, receiver, cache)
+                if fork.on_path:
                     self.controller.forward_content_path(source, cache)
                     # Insert in cache
                     self.controller.put_content(cache)
                     # Forward to receiver
                     self.controller.forward_content_path(cache, receiver)
                 else:
-                    # Multicast
-                    cache_path = self.view.shortest_path(source, cache)
-                    recv_path = self.view.shortest_path(source, receiver)
-
-                    # find what is the node that has to fork the content flow
-                    for i in range(1, min([len(cache_path), len(recv_path)])):
-                        if cache_path[i] != recv_path[i]:
-                            fork_node = cache_path[i - 1]
-                            break
-                    else:
-                        fork_node = cache
+                    # Multicast from the node that has to fork the content flow
+                    fork_node = fork.fork_node
                     self.controller.forward_content_path(source, fork_node)
                     self.controller.forward_content_path(fork_node, receiver)
                     self.controller.forward_content_path(fork_node, cache,
@@ -219,6 +227,10 @@ class HashroutingEdge(BaseHashrouting):
         if any(v not in self.view.topology().cache_nodes() for v in self.proxy.values()):
             raise ValueError('There are receivers connected to a proxy without cache')
 
+    # Requests also access the edge cache of their receiver, hence the
+    # workload cannot be split in shards
+    shard = Strategy.shard
+
     @inheritdoc(Strategy)
     def process_event(self, time, receiver, content, log):
         # get all required data
@@ -251,7 +263,7 @@ class HashroutingEdge(BaseHashrouting):
                 # Forward to receiver
                 self.controller.forward_content_path(cache, proxy)
             elif self.routing == 'ASYMM':
-                if cache in self.view.shortest_path(source, proxy):
+                if self.view.multicast_fork(source, proxy, cache).on_path:
                     # Forward to cache
                     self.controller.forward_content_path(source, cache)
                     # Insert in cache
@@ -262,23 +274,16 @@ class HashroutingEdge(BaseHashrouting):
                     # Forward to receiver straight away
                     self.controller.forward_content_path(source, proxy)
             elif self.routing == 'MULTICAST':
-                if cache in self.view.shortest_path(source, proxy):
+                fork = self.view.multicast_fork(source, proxy, cache)
+                if fork.on_path:
                     self.controller.forward_content_path(source, cache)
                     # Insert in cache
                     self.controller.put_content(cache)
                     # Forward to receiver
                     self.controller.forward_content_path(cache, receiver)
                 else:
-                    # Multicast
-                    cache_path = self.view.shortest_path(source, cache)
-                    recv_path = self.view.shortest_path(source, proxy)
-
-                    # find what is the node that has to fork the content flow
-                    for i in range(1, min([len(cache_path), len(recv_path)])):
-                        if cache_path[i] != recv_path[i]:
-                            fork_node = cache_path[i - 1]
-                            break
-                    else: fork_node = cache
+                    # Multicast from the node that has to fork the content flow
+                    fork_node = fork.fork_node
                     self.controller.forward_content_path(source, fork_node)
                     self.controller.forward_content_path(fork_node, proxy)
                     self.controller.forward_content_path(fork_node, cache, main_path=False)
@@ -328,6 +333,10 @@ class HashroutingOnPath(BaseHashrouting):
         self.routing = routing
         self.controller.reserve_local_cache(on_path_cache_ratio)
 
+    # Requests also access the local caches on their path, hence the
+    # workload cannot be split in shards
+    shard = Strategy.shard
+
     @inheritdoc(Strategy)
     def process_event(self, time, receiver, content, log):
         # get all required data
@@ -453,6 +462,11 @@ class HashroutingClustered(BaseHashrouting):
         self.cluster_topology = extract_cluster_level_topology(view.topology())
         self.cluster_sp = nx.all_pairs_shortest_path(self.cluster_topology)
 
+    # Requests access an authoritative cache in each cluster, which is not
+    # the one selected by hashing over all caching nodes, hence the workload
+    # cannot be split in shards
+    shard = Strategy.shard
+
     @inheritdoc(Strategy)
     def process_event(self, time, receiver, content, log):
         # get all required data
@@ -695,7 +709,8 @@ class HashroutingHybridAM(BaseHashrouting):
             if not self.controller.get_content(source):
                 raise RuntimeError('The content was not found at the expected source')
 
-            if cache in self.view.shortest_path(source, receiver):
+            fork = self.view.multicast_fork(source, receiver, cache)
+            if fork.on_path:
                 # Forward to cache
                 self.controller.forward_content_path(source, cache)
                 # Insert in cache
@@ -704,19 +719,10 @@ class HashroutingHybridAM(BaseHashrouting):
                 self.controller.forward_content_path(cache, receiver)
             else:
                 # Multicast
-                cache_path = self.view.shortest_path(source, cache)
-                recv_path = self.view.shortest_path(source, receiver)
-
-                # find what is the node that has to fork the content flow
-                for i in range(1, min([len(cache_path), len(recv_path)])):
-                    if cache_path[i] != recv_path[i]:
-                        fork_node = cache_path[i - 1]
-                        break
-                else: fork_node = cache
                 self.controller.forward_content_path(source, receiver, main_path=True)
                 # multicast to cache only if stretch is under threshold
-                if len(self.view.shortest_path(fork_node, cache)) - 1 < self.max_stretch:
-                    self.controller.forward_content_path(fork_node, cache, main_path=False)
+                if fork.hops < self.max_stretch:
+                    self.controller.forward_content_path(fork.fork_node, cache, main_path=False)
                     self.controller.put_content(cache)
         self.controller.end_session()
 
@@ -761,7 +767,8 @@ class HashroutingHybridSM(BaseHashrouting):
             if not self.controller.get_content(source):
                 raise RuntimeError('The content is not found the expected source')
 
-            if cache in self.view.shortest_path(source, receiver):
+            fork = self.view.multicast_fork(source, receiver, cache)
+            if fork.on_path:
                 self.controller.forward_content_path(source, cache)
                 # Insert in cache
                 self.controller.put_content(cache)
@@ -769,21 +776,12 @@ class HashroutingHybridSM(BaseHashrouting):
                 self.controller.forward_content_path(cache, receiver)
             else:
                 # Multicast
-                cache_path = self.view.shortest_path(source, cache)
-                recv_path = self.view.shortest_path(source, receiver)
-
-                # find what is the node that has to fork the content flow
-                for i in range(1, min([len(cache_path), len(recv_path)])):
-                    if cache_path[i] != recv_path[i]:
-                        fork_node = cache_path[i - 1]
-                        break
-                else: fork_node = cache
-
+                fork_node = fork.fork_node
                 symmetric_path_len = len(self.view.shortest_path(source, cache)) + \
                                      len(self.view.shortest_path(cache, receiver)) - 2
                 multicast_path_len = len(self.view.shortest_path(source, fork_node)) + \
-                                     len(self.view.shortest_path(fork_node, cache)) + \
-                                     len(self.view.shortest_path(fork_node, receiver)) - 3
+                                     fork.hops + \
+                                     len(self.view.shortest_path(fork_node, receiver)) - 2
 
                 self.controller.put_content(cache)
                 # If symmetric and multicast have equal cost, choose symmetric
@@ -796,4 +794,4 @@ class HashroutingHybridSM(BaseHashrouting):
                     # Multicast delivery
                     self.controller.forward_content_path(source, receiver, main_path=True)
                     self.controller.forward_content_path(fork_node, cache, main_path=False)
-                self.controller.end_session()
+        self.controller.end_session()
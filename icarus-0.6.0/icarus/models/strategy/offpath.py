@@ -1,8 +1,6 @@
 """Implementations of all off-path strategies"""
 from __future__ import division
 
-import networkx as nx
-
 from icarus.registry import register_strategy
 from icarus.util import inheritdoc, path_links
 
@@ -24,6 +22,13 @@ class NearestReplicaRouting(Strategy):
 
     On the return path, content can be caching according to a variety of
     metacaching policies. LCE and LCD are currently supported.
+
+    The approximate implementations only discover the replicas within a
+    radius, in hops, from the receiver, by flooding either actual requests
+    (*approx_1*) or meta-requests (*approx_2*). The request is then forwarded
+    to the nearest replica discovered or, if none, to the content source.
+    The overhead of flooding is not modelled, hence both implementations
+    route requests and contents in the same way.
     """
 
     def __init__(self, view, controller, metacaching, implementation='ideal',
@@ -38,13 +43,14 @@ class NearestReplicaRouting(Strategy):
             An instance of the network controller
         metacaching : str (LCE | LCD)
             Metacaching policy used
-        implementation : str, optional
-            The implementation of the nearest replica discovery. Currently on
-            ideal routing is implemented, in which each node has omniscient
-            knowledge of the location of each content.
+        implementation : str (ideal | approx_1 | approx_2), optional
+            The implementation of the nearest replica discovery. In ideal
+            routing each node has omniscient knowledge of the location of
+            each content, while approximate implementations only discover
+            replicas within a radius.
         radius : int, optional
-            Radius used by nodes to discover the location of a content. Not
-            used by ideal routing.
+            Radius, in hops, used by nodes to discover the location of a
+            content. Not used by ideal routing.
         """
         super(NearestReplicaRouting, self).__init__(view, controller)
         if metacaching not in ('LCE', 'LCD'):
@@ -54,32 +60,28 @@ class NearestReplicaRouting(Strategy):
         self.metacaching = metacaching
         self.implementation = implementation
         self.radius = radius
-        self.distance = nx.all_pairs_dijkstra_path_length(self.view.topology(),
-                                                          weight='delay')
 
     @inheritdoc(Strategy)
     def process_event(self, time, receiver, content, log):
         # get all required data
         locations = self.view.content_locations(content)
-        nearest_replica = min(locations, key=lambda x: self.distance[receiver][x])
-        # Route request to nearest replica
-        self.controller.start_session(time, receiver, content, log)
-        if self.implementation == 'ideal':
-            self.controller.forward_request_path(receiver, nearest_replica)
-        elif self.implementation == 'approx_1':
-            # Floods actual request packets
-            paths = {loc: len(self.view.shortest_path(receiver, loc)[:self.radius])
-                     for loc in locations}
-            # TODO: Continue
-            raise NotImplementedError("Not implemented")
-        elif self.implementation == 'approx_2':
-            # Floods meta-request packets
-            # TODO: Continue
-            raise NotImplementedError("Not implemented")
-        else:
+        if self.implementation in ('approx_1', 'approx_2'):
+            # Floods actual request packets (approx_1) or meta-request
+            # packets (approx_2) up to the radius. If no replica is found,
+            # the request is forwarded to the source
+            source = self.view.content_source(content)
+            locations = [v for v in locations
+                         if len(self.view.shortest_path(receiver, v)) - 1
+                         <= self.radius] or [source]
+        elif self.implementation != 'ideal':
             # Should never reach this block anyway
             raise ValueError("Implementation %s not supported"
                              % str(self.implementation))
+        distance = self.view.distances(receiver)
+        nearest_replica = min(locations, key=distance.__getitem__)
+        # Route request to nearest replica
+        self.controller.start_session(time, receiver, content, log)
+        self.controller.forward_request_path(receiver, nearest_replica)
         self.controller.get_content(nearest_replica)
         # Now we need to return packet and we have options
         path = list(reversed(self.view.shortest_path(receiver, nearest_replica)))
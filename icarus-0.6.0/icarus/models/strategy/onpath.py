@@ -3,6 +3,7 @@ from __future__ import division
 import random
 
 import networkx as nx
+import numpy as np
 import math
 
 from icarus.registry import register_strategy
@@ -24,6 +25,38 @@ __all__ = [
            ]
 
 
+def on_path_lookup(view, controller, receiver, content):
+    """Look up a content in the caches on the path from a receiver to the
+    source of the content, stopping at the first cache hit.
+
+    This executes the cache lookups made by on-path strategies while routing
+    a request, without forwarding it hop by hop, and it is used to process
+    warmup requests.
+
+    Parameters
+    ----------
+    view : NetworkView
+        The network view
+    controller : NetworkController
+        The network controller
+    receiver : any hashable type
+        The receiver node requesting the content
+    content : any hashable type
+        The content requested
+
+    Returns
+    -------
+    serving_node : any hashable type
+        The node serving the content
+    """
+    source = view.content_source(content)
+    path_caches = view.path_caches(receiver, source)
+    for v, hop in zip(path_caches.caches, path_caches.hops):
+        if hop > 0 and controller.get_content(v, content):
+            return v
+    return source
+
+
 @register_strategy('PARTITION')
 class Partition(Strategy):
     """Partition caching strategy.
@@ -66,6 +99,12 @@ class Partition(Strategy):
         self.controller.forward_content_path(cache, receiver)
         self.controller.end_session()
 
+    @inheritdoc(Strategy)
+    def warmup(self, time, receiver, content):
+        cache = self.cache_assignment[receiver]
+        if not self.controller.get_content(cache, content):
+            self.controller.put_content(cache, content)
+
 
 @register_strategy('EDGE')
 class Edge(Strategy):
@@ -111,12 +150,22 @@ class Edge(Strategy):
             serving_node = v
 
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
+        path = self.view.path_caches(receiver, serving_node).reversed_path
         self.controller.forward_content_path(serving_node, receiver, path)
         if serving_node == source:
             self.controller.put_content(edge_cache)
         self.controller.end_session()
 
+    @inheritdoc(Strategy)
+    def warmup(self, time, receiver, content):
+        source = self.view.content_source(content)
+        path_caches = self.view.path_caches(receiver, source)
+        for v, hop in zip(path_caches.caches, path_caches.hops):
+            if hop > 0:
+                if not self.controller.get_content(v, content):
+                    self.controller.put_content(v, content)
+                break
+
 
 @register_strategy('LCE')
 class LeaveCopyEverywhere(Strategy):
@@ -147,14 +196,33 @@ class LeaveCopyEverywhere(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
-        for u, v in path_links(path):
-            self.controller.forward_content_hop(u, v)
-            if self.view.has_cache(v):
-                # insert content
+        path_caches = self.view.path_caches(receiver, serving_node)
+        self.controller.forward_content_path(serving_node, receiver,
+                                             path_caches.reversed_path)
+        # insert content in all caches except the serving node, in the order
+        # the content traverses them
+        for v in reversed(path_caches.caches):
+            if v != serving_node:
                 self.controller.put_content(v)
         self.controller.end_session()
 
+    @inheritdoc(Strategy)
+    def warmup(self, time, receiver, content):
+        source = self.view.content_source(content)
+        path_caches = self.view.path_caches(receiver, source)
+        serving_node = source
+        for v, hop in zip(path_caches.caches, path_caches.hops):
+            if hop > 0:
+                if self.controller.get_content(v, content):
+                    serving_node = v
+                    break
+                # As in process_event, caches missing the content are looked
+                # up twice
+                self.controller.get_content(v, content)
+        for v in reversed(self.view.path_caches(receiver, serving_node).caches):
+            if v != serving_node:
+                self.controller.put_content(v, content)
+
 
 @register_strategy('LCD')
 class LeaveCopyDown(Strategy):
@@ -193,17 +261,30 @@ class LeaveCopyDown(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
+        path_caches = self.view.path_caches(receiver, serving_node)
+        self.controller.forward_content_path(serving_node, receiver,
+                                             path_caches.reversed_path)
         # Leave a copy of the content only in the cache one level down the hit
         # caching node
-        copied = False
-        for u, v in path_links(path):
-            self.controller.forward_content_hop(u, v)
-            if not copied and v != receiver and self.view.has_cache(v):
+        last = len(path_caches.path) - 1
+        for v, hop in zip(reversed(path_caches.caches),
+                          reversed(path_caches.hops)):
+            if 0 < hop < last:
                 self.controller.put_content(v)
-                copied = True
+                break
         self.controller.end_session()
 
+    @inheritdoc(Strategy)
+    def warmup(self, time, receiver, content):
+        serving_node = on_path_lookup(self.view, self.controller, receiver, content)
+        path_caches = self.view.path_caches(receiver, serving_node)
+        last = len(path_caches.path) - 1
+        for v, hop in zip(reversed(path_caches.caches),
+                          reversed(path_caches.hops)):
+            if 0 < hop < last:
+                self.controller.put_content(v, content)
+                break
+
 
 @register_strategy('PROB_CACHE')
 class ProbCache(Strategy):
@@ -233,7 +314,50 @@ class ProbCache(Strategy):
     def __init__(self, view, controller, t_tw=10):
         super(ProbCache, self).__init__(view, controller)
         self.t_tw = t_tw
-        self.cache_size = view.cache_nodes(size=True)
+
+    def insertion_probabilities(self, receiver, serving_node):
+        """Return the caches on the delivery path of a content, each with the
+        probability of inserting the content
+
+        Parameters
+        ----------
+        receiver : any hashable type
+            The receiver of the content
+        serving_node : any hashable type
+            The node serving the content
+
+        Returns
+        -------
+        insert_prob : list of tuples
+            List of (cache, probability) tuples, ordered from the serving node
+            to the receiver
+        """
+        path_caches = self.view.path_caches(receiver, serving_node)
+        caches = path_caches.caches
+        hops = path_caches.hops
+        capacity = path_caches.capacity
+        c = len(caches)
+        last = len(path_caches.path) - 1
+        x = 0.0
+        insert_prob = []
+        # Caches are visited from the serving node to the receiver. Since
+        # capacity is cumulated from the receiver, the capacity of the caches
+        # from the node preceding a cache down to the receiver is the
+        # cumulative capacity up to that node
+        for j in range(c - 1, -1, -1):
+            if hops[j] == last:
+                # Serving node
+                continue
+            x += 1
+            v = caches[j]
+            if v != receiver:
+                N = capacity[j + 1] if j + 1 < c and hops[j + 1] == hops[j] + 1 \
+                    else capacity[j]
+                size = capacity[j] - capacity[j - 1] if j > 0 else capacity[j]
+                # The (x/c) factor raised to the power of "c" according to the
+                # extended version of ProbCache published in IEEE TPDS
+                insert_prob.append((v, float(N) / (self.t_tw * size) * (x / c) ** c))
+        return insert_prob
 
     @inheritdoc(Strategy)
     def process_event(self, time, receiver, content, log):
@@ -255,25 +379,20 @@ class ProbCache(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
-        c = len([v for v in path if self.view.has_cache(v)])
-        x = 0.0
-        for hop in range(1, len(path)):
-            u = path[hop - 1]
-            v = path[hop]
-            N = sum([self.cache_size[n] for n in path[hop - 1:]
-                     if n in self.cache_size])
-            if v in self.cache_size:
-                x += 1
-            self.controller.forward_content_hop(u, v)
-            if v != receiver and v in self.cache_size:
-                # The (x/c) factor raised to the power of "c" according to the
-                # extended version of ProbCache published in IEEE TPDS
-                prob_cache = float(N) / (self.t_tw * self.cache_size[v]) * (x / c) ** c
-                if random.random() < prob_cache:
-                    self.controller.put_content(v)
+        path = self.view.path_caches(receiver, serving_node).reversed_path
+        self.controller.forward_content_path(serving_node, receiver, path)
+        for v, prob_cache in self.insertion_probabilities(receiver, serving_node):
+            if random.random() < prob_cache:
+                self.controller.put_content(v)
         self.controller.end_session()
 
+    @inheritdoc(Strategy)
+    def warmup(self, time, receiver, content):
+        serving_node = on_path_lookup(self.view, self.controller, receiver, content)
+        for v, prob_cache in self.insertion_probabilities(receiver, serving_node):
+            if random.random() < prob_cache:
+                self.controller.put_content(v, content)
+
 
 @register_strategy('CL4M')
 class CacheLessForMore(Strategy):
@@ -302,6 +421,32 @@ class CacheLessForMore(Strategy):
         else:
             self.betw = nx.betweenness_centrality(topology)
 
+    def designated_cache(self, receiver, serving_node):
+        """Return the cache where a content is inserted, i.e. the cache with
+        maximum betweenness centrality on the delivery path, excluding the
+        serving node. If more caches have the maximum betweenness centrality,
+        the one closest to the receiver is returned.
+
+        Parameters
+        ----------
+        receiver : any hashable type
+            The receiver of the content
+        serving_node : any hashable type
+            The node serving the content
+
+        Returns
+        -------
+        designated_cache : any hashable type
+            The designated cache or *None* if there are no caches on the path
+        """
+        max_betw = -1
+        designated_cache = None
+        for v in self.view.path_caches(receiver, serving_node).caches:
+            if v != serving_node and self.betw[v] > max_betw:
+                max_betw = self.betw[v]
+                designated_cache = v
+        return designated_cache
+
     @inheritdoc(Strategy)
     def process_event(self, time, receiver, content, log):
         # get all required data
@@ -320,24 +465,22 @@ class CacheLessForMore(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
-        # get the cache with maximum betweenness centrality
-        # if there are more than one cache with max betw then pick the one
-        # closer to the receiver
-        max_betw = -1
-        designated_cache = None
-        for v in path[1:]:
-            if self.view.has_cache(v):
-                if self.betw[v] >= max_betw:
-                    max_betw = self.betw[v]
-                    designated_cache = v
+        path_caches = self.view.path_caches(receiver, serving_node)
+        designated_cache = self.designated_cache(receiver, serving_node)
         # Forward content
-        for u, v in path_links(path):
-            self.controller.forward_content_hop(u, v)
-            if v == designated_cache:
-                self.controller.put_content(v)
+        self.controller.forward_content_path(serving_node, receiver,
+                                             path_caches.reversed_path)
+        if designated_cache is not None:
+            self.controller.put_content(designated_cache)
         self.controller.end_session()
 
+    @inheritdoc(Strategy)
+    def warmup(self, time, receiver, content):
+        serving_node = on_path_lookup(self.view, self.controller, receiver, content)
+        designated_cache = self.designated_cache(receiver, serving_node)
+        if designated_cache is not None:
+            self.controller.put_content(designated_cache, content)
+
 
 @register_strategy('RAND_BERNOULLI')
 class RandomBernoulli(Strategy):
@@ -370,14 +513,26 @@ class RandomBernoulli(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
-        for u, v in path_links(path):
-            self.controller.forward_content_hop(u, v)
-            if v != receiver and self.view.has_cache(v):
-                if random.random() < self.p:
-                    self.controller.put_content(v)
+        path_caches = self.view.path_caches(receiver, serving_node)
+        self.controller.forward_content_path(serving_node, receiver,
+                                             path_caches.reversed_path)
+        last = len(path_caches.path) - 1
+        for v, hop in zip(reversed(path_caches.caches),
+                          reversed(path_caches.hops)):
+            if 0 < hop < last and random.random() < self.p:
+                self.controller.put_content(v)
         self.controller.end_session()
 
+    @inheritdoc(Strategy)
+    def warmup(self, time, receiver, content):
+        serving_node = on_path_lookup(self.view, self.controller, receiver, content)
+        path_caches = self.view.path_caches(receiver, serving_node)
+        last = len(path_caches.path) - 1
+        for v, hop in zip(reversed(path_caches.caches),
+                          reversed(path_caches.hops)):
+            if 0 < hop < last and random.random() < self.p:
+                self.controller.put_content(v, content)
+
 @register_strategy('RAND_CHOICE')
 class RandomChoice(Strategy):
     """Random choice strategy
@@ -408,20 +563,39 @@ class RandomChoice(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
-        caches = [v for v in path[1:-1] if self.view.has_cache(v)]
+        path_caches = self.view.path_caches(receiver, serving_node)
+        last = len(path_caches.path) - 1
+        caches = [v for v, hop in zip(reversed(path_caches.caches),
+                                      reversed(path_caches.hops))
+                  if 0 < hop < last]
         designated_cache = random.choice(caches) if len(caches) > 0 else None
-        for u, v in path_links(path):
-            self.controller.forward_content_hop(u, v)
-            if v == designated_cache:
-                self.controller.put_content(v)
+        self.controller.forward_content_path(serving_node, receiver,
+                                             path_caches.reversed_path)
+        if designated_cache is not None:
+            self.controller.put_content(designated_cache)
         self.controller.end_session()
 
+    @inheritdoc(Strategy)
+    def warmup(self, time, receiver, content):
+        serving_node = on_path_lookup(self.view, self.controller, receiver, content)
+        path_caches = self.view.path_caches(receiver, serving_node)
+        last = len(path_caches.path) - 1
+        caches = [v for v, hop in zip(reversed(path_caches.caches),
+                                      reversed(path_caches.hops))
+                  if 0 < hop < last]
+        if len(caches) > 0:
+            self.controller.put_content(random.choice(caches), content)
+
 
 @register_strategy('POP_CACHE')
 class PopCache(Strategy):
     """PopCache
 
+    The probability of inserting a content in a cache only depends on the
+    path over which the content is delivered. Therefore it is computed only
+    once per path, using the cumulative distribution of content popularity,
+    and then memoised until paths change.
+
         Reference:
         [1] Suksomboon K, Tarnoi S, Ji Y, et al. Popcache: Cache more or less based on content
         popularity for information-centric networking[C]//Local Computer Networks (LCN), 2013
@@ -435,7 +609,51 @@ class PopCache(Strategy):
         self.zipf = zipf
         self.average = average
         self.cache_size = view.cache_nodes(size=True)
-
+        # Probability that a content is among the X most popular ones
+        self.cdf = np.concatenate(([0.0], np.cumsum(zipf.pdf)))
+        # Insertion probabilities keyed by (receiver, serving node)
+        self.insert_prob = {}
+
+    def insertion_probabilities(self, receiver, serving_node):
+        """Return the caches on the delivery path of a content, each with the
+        probability of inserting the content
+
+        Parameters
+        ----------
+        receiver : any hashable type
+            The receiver of the content
+        serving_node : any hashable type
+            The node serving the content
+
+        Returns
+        -------
+        insert_prob : list of tuples
+            List of (cache, probability) tuples, ordered from the serving node
+            to the receiver
+        """
+        path_caches = self.view.path_caches(receiver, serving_node)
+        # Entries are recomputed if paths changed since they were computed
+        entry = self.insert_prob.get((receiver, serving_node))
+        if entry is not None and entry[0] is path_caches:
+            return entry[1]
+        path = path_caches.reversed_path
+        N = len(path_caches.caches)
+        i = N
+        insert_prob = []
+        for hop in range(1, len(path)):
+            v = path[hop]
+            if v in self.cache_size:
+                i -= 1
+                if i == 1:
+                    W = 1.0
+                else:
+                    W = (N - i) * i / N / N
+                X = sum([self.cache_size[k]//self.average for k in path[hop:] if k in self.cache_size])
+                X = min(X, len(self.cdf) - 1)
+                pop_cache = W * (1 - math.exp(0 - self.rate / self.average * self.cdf[X]))
+                insert_prob.append((v, pop_cache))
+        self.insert_prob[(receiver, serving_node)] = (path_caches, insert_prob)
+        return insert_prob
 
     @inheritdoc(Strategy)
     def process_event(self, time, receiver, content, log):
@@ -457,41 +675,41 @@ class PopCache(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
-        N = len([v for v in path if self.view.has_cache(v)])
-        i = N
-        for hop in range(1, len(path)):
-            u = path[hop - 1]
-            v = path[hop]
-            self.controller.forward_content_hop(u, v)
-            if v in self.cache_size:
-                i -= 1
-                if i == 1:
-                    W = 1.0
-                else:
-                    W = (N - i) * i / N / N
-                pdf = self.zipf.pdf
-                X = sum([self.cache_size[k]//self.average for k in path[hop:] if k in self.cache_size])
-                pop_cache = W * (1 - math.exp(0 - self.rate / self.average * sum([pdf[c] for c in range(X)])))
-                if random.random() < pop_cache:
-                    self.controller.put_content(v)
+        path = self.view.path_caches(receiver, serving_node).reversed_path
+        self.controller.forward_content_path(serving_node, receiver, path)
+        for v, pop_cache in self.insertion_probabilities(receiver, serving_node):
+            if random.random() < pop_cache:
+                self.controller.put_content(v)
         self.controller.end_session()
 
+    @inheritdoc(Strategy)
+    def warmup(self, time, receiver, content):
+        serving_node = on_path_lookup(self.view, self.controller, receiver, content)
+        for v, pop_cache in self.insertion_probabilities(receiver, serving_node):
+            if random.random() < pop_cache:
+                self.controller.put_content(v, content)
+
 
 @register_strategy('MUS')
 class MostUtilitarianStay(Strategy):
     """CentralizedMostUtilitarianStay
+
+    If *lazy_freq* is *True*, the time windows over which caches count
+    requests are closed lazily, i.e. each cache closes a window only when it
+    is accessed afterwards. This yields the same results but the cost of
+    closing a window does not depend on the number of caches.
     """
 
     @inheritdoc(Strategy)
-    def __init__(self, view, controller, t_tw=10):
+    def __init__(self, view, controller, t_tw=10, lazy_freq=False):
         super(MostUtilitarianStay, self).__init__(view, controller)
         self.t_tw = t_tw
+        self.lazy_freq = lazy_freq
 
     @inheritdoc(Strategy)
     def process_event(self, time, receiver, content, log):
         if time % self.t_tw == 0:
-            self.controller.update_freq()
+            self.controller.update_freq(lazy=self.lazy_freq)
         if receiver == None:
             return
         # get all required data
@@ -513,15 +731,33 @@ class MostUtilitarianStay(Strategy):
             self.controller.get_content(v)
             serving_node = v
         # Return content
-        path = list(reversed(self.view.shortest_path(receiver, serving_node)))
-        for hop in range(1, len(path)):
-            u = path[hop - 1]
-            v = path[hop]
-            self.controller.forward_content_hop(u, v)
-            if self.view.has_cache(v):
-                self.controller.update_dist(v, hop)
+        path_caches = self.view.path_caches(receiver, serving_node)
+        self.controller.forward_content_path(serving_node, receiver,
+                                             path_caches.reversed_path)
+        last = len(path_caches.path) - 1
+        for v, hop in zip(reversed(path_caches.caches),
+                          reversed(path_caches.hops)):
+            if hop < last:
+                # Distance of the cache from the serving node
+                self.controller.update_dist(v, last - hop)
                 self.controller.put_content(v)
         self.controller.end_session()
 
+    @inheritdoc(Strategy)
+    def warmup(self, time, receiver, content):
+        if time % self.t_tw == 0:
+            self.controller.update_freq(lazy=self.lazy_freq)
+        if receiver == None:
+            return
+        serving_node = on_path_lookup(self.view, self.controller, receiver, content)
+        path_caches = self.view.path_caches(receiver, serving_node)
+        last = len(path_caches.path) - 1
+        for v, hop in zip(reversed(path_caches.caches),
+                          reversed(path_caches.hops)):
+            if hop < last:
+                # Distance of the cache from the serving node
+                self.controller.update_dist(v, last - hop, content)
+                self.controller.put_content(v, content)
+
 
 
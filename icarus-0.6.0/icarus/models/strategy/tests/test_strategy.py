@@ -1,8 +1,12 @@
+from __future__ import division
 import unittest
+import random
+import math
 
 import fnss
 
 from icarus.scenarios import IcnTopology
+from icarus.tools import TruncatedZipfDist
 import icarus.models as strategy
 from icarus.execution import NetworkModel, NetworkView, NetworkController, TestCollector
 
@@ -1331,6 +1335,48 @@ class TestOnPath(unittest.TestCase):
         self.assertSetEqual(exp_req_hops, set(req_hops))
         self.assertSetEqual(exp_cont_hops, set(cont_hops))
 
+    def test_lce_insertion_order(self):
+        # Caches are filled from the serving node to the receiver, as the
+        # content traverses them, which matters to policies evicting randomly
+        topology = self.on_path_topology()
+        fnss.add_stack(topology, 4, 'source', {'contents': range(1, 9)})
+        for v in (1, 2, 3):
+            fnss.add_stack(topology, v, 'router', {'cache_size': 2})
+        dumps = []
+        for mode in ('reference', 'process_event', 'warmup'):
+            model = NetworkModel(topology, cache_policy={'name': 'RAND'})
+            view = NetworkView(model)
+            controller = NetworkController(model)
+            controller.attach_collector(TestCollector(view))
+            hr = strategy.LeaveCopyEverywhere(view, controller)
+            random.seed(0)
+            rand = random.Random(0)
+            dump = []
+            for time in range(1, 200):
+                receiver, content = rand.choice((0, 5)), rand.randint(1, 8)
+                if mode == 'process_event':
+                    hr.process_event(time, receiver, content, True)
+                elif mode == 'warmup':
+                    hr.warmup(time, receiver, content)
+                else:
+                    controller.start_session(time, receiver, content, True)
+                    path = view.shortest_path(receiver,
+                                              view.content_source(content))
+                    serving_node = path[-1]
+                    for v in path[1:-1]:
+                        if view.has_cache(v) and controller.get_content(v):
+                            serving_node = v
+                            break
+                    path = view.shortest_path(serving_node, receiver)
+                    for v in path[1:]:
+                        if view.has_cache(v):
+                            controller.put_content(v)
+                    controller.end_session()
+                dump.append([view.cache_dump(v) for v in (1, 2, 3)])
+            dumps.append(dump)
+        self.assertEqual(dumps[0], dumps[1])
+        self.assertEqual(dumps[0], dumps[2])
+
     def test_lce_different_content(self):
         hr = strategy.LeaveCopyEverywhere(self.view, self.controller)
         # receiver 0 requests 2, expect miss
@@ -1630,6 +1676,106 @@ class TestOnPath(unittest.TestCase):
         summary = self.collector.session_summary()
         self.assertEqual(1, summary['serving_node'])
 
+    def test_prob_cache(self):
+        hr = strategy.ProbCache(self.view, self.controller, t_tw=1e-6)
+        hr.process_event(1, 0, 2, True)
+        summary = self.collector.session_summary()
+        self.assertEqual(4, summary['serving_node'])
+        self.assertEqual({1, 2, 3, 4}, self.view.content_locations(2))
+        hr = strategy.ProbCache(self.view, self.controller, t_tw=1e6)
+        hr.process_event(1, 0, 3, True)
+        summary = self.collector.session_summary()
+        self.assertEqual(4, summary['serving_node'])
+        self.assertEqual({4}, self.view.content_locations(3))
+        self.assertEqual({1, 2, 3, 4}, self.view.content_locations(2))
+
+    def test_pop_cache(self):
+        zipf = TruncatedZipfDist(0.8, 3)
+        hr = strategy.PopCache(self.view, self.controller, rate=2.0,
+                               zipf=zipf, average=1)
+        insert_prob = hr.insertion_probabilities(0, 4)
+        self.assertEqual([3, 2, 1], [v for v, _ in insert_prob])
+        expected = [2 / 9 * (1 - math.exp(-2.0)),
+                    1 - math.exp(-2.0 * (zipf.pdf[0] + zipf.pdf[1])),
+                    0.0]
+        for (_, p), exp_p in zip(insert_prob, expected):
+            self.assertAlmostEqual(exp_p, p)
+        self.assertIs(insert_prob, hr.insertion_probabilities(0, 4))
+        hr.process_event(1, 0, 2, True)
+        summary = self.collector.session_summary()
+        self.assertEqual(4, summary['serving_node'])
+        self.assertNotIn(1, self.view.content_locations(2))
+
+    def test_mus_lazy_freq(self):
+        topology = self.on_path_topology()
+        fnss.add_stack(topology, 4, 'source', {'contents': range(1, 9)})
+        for v in (1, 2, 3):
+            fnss.add_stack(topology, v, 'router', {'cache_size': 2})
+        views, strategies, collectors = [], [], []
+        for lazy_freq in (False, True):
+            model = NetworkModel(topology, cache_policy={'name': 'MUS'})
+            view = NetworkView(model)
+            controller = NetworkController(model)
+            collector = TestCollector(view)
+            controller.attach_collector(collector)
+            views.append(view)
+            collectors.append(collector)
+            strategies.append(strategy.MostUtilitarianStay(
+                view, controller, t_tw=5, lazy_freq=lazy_freq))
+        rand = random.Random(0)
+        for time in range(1, 300):
+            if time % 5 == 0:
+                event = (time, None, None, None)
+            else:
+                event = (time + 0.5, rand.choice((0, 5)), rand.randint(1, 8), True)
+            for hr in strategies:
+                hr.process_event(*event)
+            if event[1] is not None:
+                self.assertEqual(collectors[0].session_summary()['serving_node'],
+                                 collectors[1].session_summary()['serving_node'])
+            for v in (1, 2, 3):
+                self.assertEqual(set(views[0].cache_dump(v)),
+                                 set(views[1].cache_dump(v)))
+        # Caches are only rolled over on access if windows are closed lazily
+        self.assertEqual([False, True], [view.model.lazy_freq for view in views])
+
+    def test_warmup(self):
+        topology = self.on_path_topology()
+        fnss.add_stack(topology, 4, 'source', {'contents': range(1, 9)})
+        for v in (1, 2, 3):
+            fnss.add_stack(topology, v, 'router', {'cache_size': 2})
+        topology.graph['cache_assignment'] = {0: 1, 5: 2}
+        zipf = TruncatedZipfDist(0.8, 8)
+        for name, params in [('LeaveCopyEverywhere', {}),
+                             ('LeaveCopyDown', {}),
+                             ('ProbCache', {}),
+                             ('CacheLessForMore', {}),
+                             ('RandomBernoulli', {'p': 0.5}),
+                             ('RandomChoice', {}),
+                             ('PopCache', {'rate': 2.0, 'zipf': zipf, 'average': 1}),
+                             ('MostUtilitarianStay', {'t_tw': 5}),
+                             ('Partition', {}),
+                             ('Edge', {})]:
+            dumps = []
+            for warmup in (False, True):
+                policy = 'MUS' if name == 'MostUtilitarianStay' else 'PERFECT_LFU'
+                model = NetworkModel(topology, cache_policy={'name': policy})
+                view = NetworkView(model)
+                controller = NetworkController(model)
+                controller.attach_collector(TestCollector(view))
+                hr = getattr(strategy, name)(view, controller, **params)
+                random.seed(0)
+                rand = random.Random(0)
+                dump = []
+                for time in range(1, 200):
+                    receiver, content = rand.choice((0, 5)), rand.randint(1, 8)
+                    if warmup:
+                        hr.warmup(time, receiver, content)
+                    else:
+                        hr.process_event(time, receiver, content, False)
+                    dump.append([view.cache_dump(v) for v in (1, 2, 3)])
+                dumps.append(dump)
+            self.assertEqual(dumps[0], dumps[1], name)
 
 class TestPartition(unittest.TestCase):
 
@@ -1833,6 +1979,29 @@ class TestNrr(unittest.TestCase):
         self.assertEqual(3, summary['serving_node'])
 
 
+    def test_approx(self):
+        for implementation in ('approx_1', 'approx_2'):
+            self.setUp()
+            hr = strategy.NearestReplicaRouting(self.view, self.controller,
+                                                metacaching='LCE',
+                                                implementation=implementation,
+                                                radius=1)
+            # receiver 0 requests 2, expect miss
+            hr.process_event(1, 0, 2, True)
+            self.assertSetEqual({2, 4, "s"}, self.view.content_locations(2))
+            # receiver 1 requests 2, replicas at 2 and 4 are beyond the radius
+            hr.process_event(1, 1, 2, True)
+            self.assertSetEqual({2, 3, 4, 5, "s"},
+                                self.view.content_locations(2))
+            summary = self.collector.session_summary()
+            exp_req_hops = [(1, 3), (3, 5), (5, "s")]
+            self.assertSetEqual(set(exp_req_hops), set(summary['request_hops']))
+            self.assertEqual("s", summary['serving_node'])
+            hr.process_event(1, 1, 2, True)
+            summary = self.collector.session_summary()
+            self.assertSetEqual({(1, 3)}, set(summary['request_hops']))
+            self.assertEqual(3, summary['serving_node'])
+
     def test_lcd(self):
         hr = strategy.NearestReplicaRouting(self.view, self.controller, metacaching='LCD')
         # receiver 0 requests 2, expect miss
@@ -4,7 +4,9 @@ The orchestrator is responsible for scheduling experiments specified in the
 user-provided settings.
 """
 from __future__ import division
+import os
 import time
+import hashlib
 import collections
 import multiprocessing as mp
 import logging
@@ -13,7 +15,9 @@ import sys
 import signal
 import traceback
 
-from icarus.execution import exec_experiment
+from icarus.execution import exec_experiment, exec_sharded_experiment, \
+                             DataCollector
+from icarus.models import Strategy
 from icarus.registry import TOPOLOGY_FACTORY, CACHE_PLACEMENT, CONTENT_PLACEMENT, \
                             CACHE_POLICY, WORKLOAD, DATA_COLLECTOR, STRATEGY
 from icarus.results import ResultSet
@@ -155,6 +159,28 @@ class Orchestrator(object):
                         self.n_success, self.n_fail, n_scheduled, eta)
 
 
+def warmup_key(params):
+    """Return a key identifying the network state at the end of the warmup
+    phase of an experiment.
+
+    The key depends on all experiment parameters except the number of
+    measured requests and the description of the experiment.
+
+    Parameters
+    ----------
+    params : Tree
+        experiment parameters tree
+
+    Returns
+    -------
+    key : str
+        The hexadecimal digest of the parameters
+    """
+    paths = sorted((k, v) for k, v in params.paths().items()
+                   if k not in (('workload', 'n_measured'), ('desc',)))
+    return hashlib.sha1(repr(paths).encode('utf-8')).hexdigest()
+
+
 def run_scenario(settings, params, curr_exp, n_exp):
     """Run a single scenario experiment
 
@@ -258,8 +284,32 @@ def run_scenario(settings, params, curr_exp, n_exp):
 
         collectors = {m: {} for m in metrics}
 
+        # Experiments with the same parameters and workload seed reach the
+        # same network state at the end of warmup, which can then be shared
+        warmup_snapshot = None
+        if 'WARMUP_SNAPSHOT_DIR' in settings and \
+                params['workload'].get('seed') is not None:
+            warmup_snapshot = os.path.join(settings.WARMUP_SNAPSHOT_DIR,
+                                           '%s.pkl.gz' % warmup_key(params))
+
+        # Experiments run sequentially can split their workload in shards
+        # executed by multiple processes, if the strategy supports it and
+        # the measurements of all data collectors can be merged
+        sharded = 'N_SHARD_PROCESSES' in settings and \
+                  not settings.PARALLEL_EXECUTION and \
+                  STRATEGY[strategy['name']].shard != Strategy.shard and \
+                  all(DATA_COLLECTOR[m].merge != DataCollector.merge
+                      for m in metrics)
+
         logger.info('Experiment %d/%d | Start simulation', curr_exp, n_exp)
-        results = exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors)
+        if sharded:
+            results = exec_sharded_experiment(topology, workload, netconf,
+                                              strategy, cache_policy,
+                                              collectors,
+                                              settings.N_SHARD_PROCESSES)
+        else:
+            results = exec_experiment(topology, workload, netconf, strategy,
+                                      cache_policy, collectors, warmup_snapshot)
 
         duration = time.time() - start_time
         logger.info('Experiment %d/%d | End simulation | Duration %s.',